@@ -2,145 +2,449 @@
 """
 Calculate anchor points for serpentine minecart path.
 Anchor points are where ramps transition to curves.
+
+The path is `ramps` straight ramps along X, alternating direction, joined
+by flat 180° curves. Every curve is a U-turn at one of two turn columns
+(the far one, in the direction of travel, and the near one) that shifts
+the track north or south by its width. So a layout is:
+  - the X of the two turn columns, which fixes every ramp's length and
+    makes the X of the path close on the end point by construction,
+  - the signed Z shift of every curve (width 2*radius up to 2*radius +
+    slack), which has to add up to the end point's Z,
+  - how the climb is split over the ramps: in proportion to ramp length,
+    rounded to whole blocks, which keeps the steepest ramp as flat as it
+    can be.
+Every ramp runs at least `min_run` blocks, and curves at the same column
+whose Z spans overlap have to be at least HEADROOM blocks apart in Y.
+Curve layouts grow exponentially with the number of curves, so they are
+built one curve at a time, dropping partial layouts that can no longer
+close; past EXACT_CURVES of them, only the narrowest BEAM partial layouts
+are kept at each curve, so long serpentines get a good layout rather than
+a proven best one. Curve layouts with the same overlaps and widest curves
+fit the same column layouts, so only the shortest of them is scored.
+
+The column and curve choices are scored separately (ramp length and grade
+only depend on the columns, curve length and Z only on the curves) and
+then combined by broadcasting, so the whole layout grid is searched with a
+few array operations. The layout with the shortest total track, or the
+lowest max grade, that keeps every ramp within the grade limit wins.
+
+Usage:
+  python calculate_anchors.py                     # the layout below
+  python calculate_anchors.py --ramps 7 --radius 6 --objective grade
+  python calculate_anchors.py --start -226 130 326 --end -324 214 318 --x-range -335 -215
 """
 
+import argparse
+import time
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+Coord = Tuple[int, int, int]
+
 # Start and end points
 start = (-226, 130, 326)
 end = (-324, 214, 318)
 
-# Total distances
-total_x = end[0] - start[0]  # -98 (west)
-total_y = end[1] - start[1]  # 84 (up)
-total_z = end[2] - start[2]  # -8 (north)
-
-print(f"Start: {start}")
-print(f"End: {end}")
-print(f"Total distance: X={total_x}, Y={total_y}, Z={total_z}")
-print()
-
 # Constants
+RAMPS = 5
 CURVE_RADIUS = 8
-CURVE_Z_SHIFT = 16  # How much Z changes during a 180° turn
-Y_INCREMENT = total_y / 5  # Each ramp climbs 1/5 of total
-
-# For X: we go west, east, west, east, west
-# Net movement should be total_x (-98 west)
-# If each west segment is W and each east segment is E:
-# -W + E - W + E - W = -98
-# -3W + 2E = -98
-# We want W = E for symmetry, so: -3W + 2W = -W = -98, thus W = 98
-# But we said 2/3 of total, so let's use that: W = 65.33
-
-LONG_RAMP_DISTANCE = abs(total_x) * 3 / 4  # 2/3 of total X distance per ramp
-SHORT_RAMP_DISTANCE = abs(total_x) * 2 / 3  # 1/3 of total X distance per ramp
-
-print(f"Y increment per ramp: {Y_INCREMENT}")
-print(f"Long ramp distance per ramp: {LONG_RAMP_DISTANCE}")
-print(f"Short ramp distance per ramp: {SHORT_RAMP_DISTANCE}")
-print()
-
-# Calculate anchor points
-anchors = []
-
-# Starting position
-current_x = start[0]
-current_y = start[1]
-current_z = start[2]
-direction = -1  # -1 = west, +1 = east
-
-print("ANCHOR POINTS (end of ramp, start of curve):")
-print("=" * 60)
-
-# Ramp 1 -> Curve 1 (going WEST)
-current_x += direction * LONG_RAMP_DISTANCE
-current_y += Y_INCREMENT
-anchor1 = (int(current_x), int(current_y), current_z)
-anchors.append(("After Ramp 1", anchor1))
-print(f"Anchor 1 (after Ramp 1, before Curve 1): {anchor1}")
-
-# After Curve 1 (turn north, now facing EAST)
-current_z -= CURVE_Z_SHIFT+8  # 24 blocks north
-direction *= -1  # Now going east
-after_curve1 = (int(current_x), int(current_y), current_z)
-print(f"  After Curve 1: {after_curve1}")
-print()
-
-# Ramp 2 -> Curve 2 (going EAST)
-current_x += direction * SHORT_RAMP_DISTANCE
-current_y += Y_INCREMENT
-# Z stays the same (0 north/south change)
-anchor2 = (int(current_x), int(current_y), current_z)
-anchors.append(("After Ramp 2", anchor2))
-print(f"Anchor 2 (after Ramp 2, before Curve 2): {anchor2}")
-
-# After Curve 2 (turn south, now facing WEST)
-current_z += CURVE_Z_SHIFT+4  # 20 blocks south
-direction *= -1  # Now going west
-after_curve2 = (int(current_x), int(current_y), current_z)
-print(f"  After Curve 2: {after_curve2}")
-print()
-
-# Ramp 3 -> Curve 3 (going WEST)
-current_x += direction * SHORT_RAMP_DISTANCE
-current_y += Y_INCREMENT
-# Z stays the same (0 north/south change)
-anchor3 = (int(current_x), int(current_y), current_z)
-anchors.append(("After Ramp 3", anchor3))
-print(f"Anchor 3 (after Ramp 3, before Curve 3): {anchor3}")
-
-# After Curve 3 (turn south again, now facing EAST)
-current_z += CURVE_Z_SHIFT+4  # 20 blocks south
-direction *= -1  # Now going east
-after_curve3 = (int(current_x), int(current_y), current_z)
-print(f"  After Curve 3: {after_curve3}")
-print()
-
-# Ramp 4 -> Curve 4 (going EAST)
-current_x += direction * SHORT_RAMP_DISTANCE
-current_y += Y_INCREMENT
-# Z stays the same (0 north/south change)
-anchor4 = (int(current_x), int(current_y), current_z)
-anchors.append(("After Ramp 4", anchor4))
-print(f"Anchor 4 (after Ramp 4, before Curve 4): {anchor4}")
-
-# After Curve 4 (turn north, now facing WEST)
-current_z -= CURVE_Z_SHIFT+8  # 24 blocks north
-direction *= -1  # Now going west
-after_curve4 = (int(current_x), int(current_y), current_z)
-print(f"  After Curve 4: {after_curve4}")
-print()
-
-# Ramp 5 -> End (going WEST to end point)
-# Calculate how far west we need to go
-remaining_x = end[0] - current_x
-current_x = end[0]
-current_y += Y_INCREMENT
-# Z should already be at target from the curves (0 change on this ramp)
-final_z = current_z
-anchor5 = (int(current_x), int(current_y), int(final_z))
-print(f"Anchor 5 (End point): {anchor5}")
-print(f"Expected end: {end}")
-print(f"Remaining X for ramp 5: {remaining_x}")
-print()
-
-# Check Z alignment
-print(f"Current Z after curve 4: {after_curve4[2]}")
-print(f"Final Z after ramp 5: {final_z}")
-print(f"Target Z: {end[2]}")
-print(f"Z difference from target: {end[2] - final_z}")
-print()
-
-# Summary for visualization
-print("=" * 60)
-print("COPY THESE COORDINATES FOR VISUALIZATION:")
-print("=" * 60)
-print(f"{start}")
-print(f"{anchor1}")
-print(f"{after_curve1}")
-print(f"{anchor2}")
-print(f"{after_curve2}")
-print(f"{anchor3}")
-print(f"{after_curve3}")
-print(f"{anchor4}")
-print(f"{after_curve4}")
-print(f"{end}")
+MAX_GRADE = 1.0       # 45°: never climb more than one block per block
+COLUMN_MARGIN = 32    # how far past start/end X the turn columns may go
+MIN_ROW_GAP = 2       # parallel ramps at least this many blocks apart in Z
+HEADROOM = 3          # Y between stacked curves: rail, cart, and a block above
+
+LENGTH = "length"
+GRADE = "grade"
+OBJECTIVES = (LENGTH, GRADE)
+
+# Curve layouts enumerated outright up to this many, beam searched past it
+EXACT_CURVES = 1 << 26
+BEAM = 2048
+
+# Curve layouts evaluated per array chunk
+_CHUNK = 1 << 18
+
+@dataclass
+class AnchorLayout:
+    anchors: List[Coord]     # start, (end of ramp, after curve) pairs, end
+    columns: Tuple[int, int]  # X of the far and near turn columns
+    climbs: List[int]        # blocks climbed by each ramp
+    shifts: List[int]        # Z shift of each curve (negative is north)
+    max_grade: float         # steepest ramp
+    length: float            # ramps (3D) plus curves (semicircles)
+
+@dataclass
+class SolveStats:
+    layouts: int = 0      # column x curve layout pairs checked against each other
+    columns: int = 0      # column layouts within the grade limit
+    curves: int = 0       # curve layouts that close on the end Z
+    feasible: int = 0     # column and curve layout pairs that fit together
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        rate = self.layouts / self.seconds if self.seconds else float("inf")
+        return (
+            f"Searched {self.layouts} layouts ({self.columns} column x {self.curves} "
+            f"curve layouts fit, {self.feasible} combined) in {self.seconds:.2f}s, "
+            f"{rate:,.0f} layouts/s"
+        )
+
+def _column_layouts(
+    start: Coord,
+    end: Coord,
+    ramps: int,
+    max_grade: float,
+    margin: int,
+    min_run: int
+):
+    """
+    Every (far, near) turn column pair with its climbs, the Y of every
+    curve, ramp length and max grade. Pairs that make a ramp run backwards
+    or shorter than min_run are left out.
+    """
+    sx, sy, _ = start
+    ex, ey, _ = end
+    direction = -1 if ex < sx else 1
+    cols = np.arange(min(sx, ex) - margin, max(sx, ex) + margin + 1)
+    far, near = (a.ravel() for a in np.meshgrid(cols, cols, indexing="ij"))
+
+    # Ramp i ends at the far column (even i), the near one (odd i), or the end
+    ends = np.where(np.arange(ramps) % 2 == 0, far[:, None], near[:, None])
+    ends[:, -1] = ex
+    begins = np.concatenate([np.full((len(far), 1), sx), ends[:, :-1]], axis=1)
+    heading = direction * np.where(np.arange(ramps) % 2 == 0, 1, -1)
+    runs = (ends - begins) * heading
+
+    ok = (runs >= max(min_run, 1)).all(axis=1)
+    far, near, runs = far[ok], near[ok], runs[ok]
+
+    # Climb in proportion to run, largest remainders get the spare blocks
+    total_y = ey - sy
+    ideal = abs(total_y) * runs / runs.sum(axis=1, keepdims=True)
+    climbs = np.floor(ideal).astype(np.int64)
+    spare = abs(total_y) - climbs.sum(axis=1)
+    rank = np.argsort(np.argsort(climbs - ideal, axis=1, kind="stable"), axis=1)
+    climbs += rank < spare[:, None]
+    climbs *= 1 if total_y >= 0 else -1
+
+    grade = (np.abs(climbs) / runs).max(axis=1)
+    length = np.hypot(runs, climbs).sum(axis=1)
+    keep = grade <= max_grade + 1e-9
+    heights = sy + np.cumsum(climbs[keep], axis=1)[:, :-1]
+    return far[keep], near[keep], climbs[keep], heights, grade[keep], length[keep]
+
+def _rows(start: Coord, shifts: np.ndarray) -> np.ndarray:
+    """Z of every ramp row, for each row of curve shifts."""
+    zero = np.zeros((len(shifts), 1), dtype=np.int64)
+    return start[2] + np.concatenate([zero, np.cumsum(shifts, axis=1)], axis=1)
+
+def _reachable(remaining: np.ndarray, curves: int, radius: int, slack: int) -> np.ndarray:
+    """Whether `curves` more curves can still shift Z by `remaining`."""
+    if curves == 0:
+        return remaining == 0
+    # With j of them going south the total lies in one interval
+    j = np.arange(curves + 1)
+    lo = j * 2 * radius - (curves - j) * (2 * radius + slack)
+    hi = j * (2 * radius + slack) - (curves - j) * 2 * radius
+    return ((remaining[:, None] >= lo) & (remaining[:, None] <= hi)).any(axis=1)
+
+def _curve_shifts(
+    start: Coord,
+    end: Coord,
+    turns: int,
+    radius: int,
+    slack: int,
+    min_row_gap: int
+) -> Iterator[np.ndarray]:
+    """
+    Chunks of signed curve shifts (widths 2*radius..2*radius + slack) that
+    close on the end Z with ramp rows at least min_row_gap apart. All of
+    them up to EXACT_CURVES combinations, built one curve at a time from
+    the end and dropping partial layouts that can no longer close or that
+    crowd a row; past that, the BEAM narrowest partial layouts are carried
+    from one curve to the next.
+    """
+    target = end[2] - start[2]
+    if (2 * (slack + 1)) ** turns > EXACT_CURVES:
+        yield _beam_shifts(start, target, turns, radius, slack, min_row_gap)
+        return
+
+    widths = np.arange(2 * radius, 2 * radius + slack + 1)
+    options = np.stack([-widths, widths], axis=1).ravel()
+    pending = [np.zeros((1, 0), dtype=np.int64)]
+    while pending:
+        shifts = _extend(start, target, pending.pop(), options, turns, radius, slack, min_row_gap)
+        if shifts.shape[1] == turns:
+            yield shifts
+        else:
+            # Depth first in chunks, so memory stays at a few chunks and the
+            # layouts come out in the same order as counting through them
+            pending.extend(np.array_split(shifts, max(1, -(-len(shifts) * len(options) // _CHUNK)))[::-1])
+
+def _extend(
+    start: Coord,
+    target: int,
+    shifts: np.ndarray,
+    options: np.ndarray,
+    turns: int,
+    radius: int,
+    slack: int,
+    min_row_gap: int
+) -> np.ndarray:
+    """
+    Every partial layout in `shifts` (the last curves of the path) with one
+    more curve in front that can still close. Rows are measured from the
+    end, which leaves their gaps the same.
+    """
+    shifts = np.concatenate([
+        np.tile(options, len(shifts))[:, None],
+        np.repeat(shifts, len(options), axis=0),
+    ], axis=1)
+    rows = _rows(start, shifts)
+    ok = _reachable(target - shifts.sum(axis=1), turns - shifts.shape[1], radius, slack)
+    ok &= (np.abs(rows[:, :1] - rows[:, 1:]) >= min_row_gap).all(axis=1)
+    return shifts[ok]
+
+def _beam_shifts(
+    start: Coord,
+    target: int,
+    turns: int,
+    radius: int,
+    slack: int,
+    min_row_gap: int
+) -> np.ndarray:
+    """Beam searched curve shifts."""
+    widths = np.arange(2 * radius, 2 * radius + slack + 1)
+    options = np.stack([-widths, widths], axis=1).ravel()
+
+    shifts = np.zeros((1, 0), dtype=np.int64)
+    for _ in range(turns):
+        shifts = _extend(start, target, shifts, options, turns, radius, slack, min_row_gap)
+        shifts = shifts[np.argsort(np.abs(shifts).sum(axis=1), kind="stable")[:BEAM]]
+    return shifts
+
+def _curve_layouts(start: Coord, shifts: np.ndarray, turns: int):
+    """
+    Curve length, widest far / near curve and which pairs of curves at the
+    same column overlap in Z (see _stacked_pairs) for each row of shifts.
+    """
+    widths = np.abs(shifts)
+    length = (np.pi * widths / 2).sum(axis=1)
+    far_width = widths[:, 0::2].max(axis=1, initial=0)
+    near_width = widths[:, 1::2].max(axis=1, initial=0)
+
+    rows = _rows(start, shifts)
+    a, b = _stacked_pairs(turns)
+    low = np.minimum(rows[:, :-1], rows[:, 1:])
+    high = np.maximum(rows[:, :-1], rows[:, 1:])
+    overlap = (low[:, a] <= high[:, b]) & (low[:, b] <= high[:, a])
+    return length, far_width, near_width, overlap
+
+def _distinct_curves(
+    curve_length: np.ndarray,
+    far_width: np.ndarray,
+    near_width: np.ndarray,
+    overlap: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Index of the shortest curve layout (the first, on ties) among those with
+    the same overlaps and widest curves, in index order, and how many
+    layouts each stands for. Those fit the same column layouts, so only the
+    shortest can win.
+    """
+    _, group, counts = np.unique(
+        np.column_stack([overlap, far_width, near_width]), axis=0, return_inverse=True, return_counts=True
+    )
+    group = group.ravel()
+    order = np.lexsort((curve_length, group))
+    first = order[np.r_[True, group[order][1:] != group[order][:-1]]]
+    return np.sort(first), counts[group[np.sort(first)]]
+
+def _stacked_pairs(turns: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Index pairs of curves at the same column (every second curve)."""
+    a, b = np.triu_indices(turns, k=1)
+    same = (b - a) % 2 == 0
+    return a[same], b[same]
+
+def solve_anchors(
+    start: Coord,
+    end: Coord,
+    ramps: int = RAMPS,
+    radius: int = CURVE_RADIUS,
+    max_grade: float = MAX_GRADE,
+    objective: str = LENGTH,
+    slack: Optional[int] = None,
+    x_range: Optional[Tuple[int, int]] = None,
+    margin: int = COLUMN_MARGIN,
+    min_row_gap: int = MIN_ROW_GAP,
+    min_run: Optional[int] = None
+) -> Tuple[Optional[AnchorLayout], SolveStats]:
+    """
+    Best anchor layout from start to end, or None if no layout closes
+    within max_grade. `slack` is how much wider than 2*radius a curve may
+    be (default: radius) and `min_run` the shortest ramp (default:
+    2*radius). With `x_range` every curve has to stay between those X
+    values, curves bulging half their width past their column.
+    """
+    if ramps < 1:
+        raise ValueError("Need at least one ramp")
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {objective}")
+    slack = radius if slack is None else slack
+    min_run = 2 * radius if min_run is None else min_run
+    turns = ramps - 1
+    stats = SolveStats()
+    began = time.perf_counter()
+
+    far, near, climbs, heights, grade, ramp_length = _column_layouts(
+        start, end, ramps, max_grade, margin, min_run
+    )
+    stats.columns = len(far)
+
+    # Curve pairs at the same column too close in Y to stack (float so the
+    # clash check below is a BLAS matrix product)
+    a, b = _stacked_pairs(turns)
+    cramped = (np.abs(heights[:, a] - heights[:, b]) < HEADROOM).astype(np.float32)
+
+    direction = -1 if end[0] < start[0] else 1
+    best = None  # (key, column index, shifts)
+    for shifts in _curve_shifts(start, end, turns, radius, slack, min_row_gap):
+        stats.layouts += len(far) * len(shifts)
+        stats.curves += len(shifts)
+        if not len(shifts) or not len(far):
+            continue
+        curve_length, far_width, near_width, overlap = _curve_layouts(start, shifts, turns)
+        keep, counts = _distinct_curves(curve_length, far_width, near_width, overlap)
+        shifts, curve_length, far_width, near_width, overlap = (
+            shifts[keep], curve_length[keep], far_width[keep], near_width[keep], overlap[keep]
+        )
+
+        # A column layout and a curve layout clash if any cramped pair overlaps
+        ok = cramped @ overlap.T.astype(np.float32) == 0
+        if x_range is not None:
+            # Far curves bulge further along the travel direction, near ones back
+            x_min, x_max = x_range
+            far_edge = far[:, None] + direction * far_width[None, :] / 2
+            near_edge = near[:, None] - direction * near_width[None, :] / 2
+            ok &= (far_edge >= x_min) & (far_edge <= x_max)
+            ok &= (near_edge >= x_min) & (near_edge <= x_max)
+        stats.feasible += int((ok @ counts).sum())
+        if not ok.any():
+            continue
+
+        length = np.where(ok, ramp_length[:, None] + curve_length[None, :], np.inf)
+        if objective == GRADE:
+            # Shortest among the flattest
+            length[grade > grade[ok.any(axis=1)].min() + 1e-12] = np.inf
+        i, j = np.unravel_index(np.argmin(length), length.shape)
+        key = (grade[i], length[i, j]) if objective == GRADE else (length[i, j], grade[i])
+        if best is None or key < best[0]:
+            best = (key, i, shifts[j])
+
+    stats.seconds = time.perf_counter() - began
+    if best is None:
+        return None, stats
+
+    _, i, shifts = best
+    return _layout(start, end, int(far[i]), int(near[i]), climbs[i].tolist(), shifts.tolist(),
+                   float(grade[i]), float(best[0][1] if objective == GRADE else best[0][0])), stats
+
+def _layout(
+    start: Coord,
+    end: Coord,
+    far: int,
+    near: int,
+    climbs: List[int],
+    shifts: List[int],
+    max_grade: float,
+    length: float
+) -> AnchorLayout:
+    """Walks a solved layout into its anchor list."""
+    x, y, z = start
+    anchors = [tuple(start)]
+    for i, climb in enumerate(climbs):
+        x = end[0] if i == len(climbs) - 1 else (far if i % 2 == 0 else near)
+        y += climb
+        anchors.append((x, y, z))
+        if i < len(shifts):
+            z += shifts[i]
+            anchors.append((x, y, z))
+    return AnchorLayout(anchors, (far, near), climbs, shifts, max_grade, length)
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve serpentine anchor points from start to end.")
+    parser.add_argument("--start", type=int, nargs=3, default=start, metavar=("X", "Y", "Z"))
+    parser.add_argument("--end", type=int, nargs=3, default=end, metavar=("X", "Y", "Z"))
+    parser.add_argument("--ramps", type=int, default=RAMPS, help=f"number of ramps (default: {RAMPS})")
+    parser.add_argument("--radius", type=int, default=CURVE_RADIUS,
+                        help=f"curve radius; a curve shifts Z by at least twice this (default: {CURVE_RADIUS})")
+    parser.add_argument("--slack", type=int,
+                        help="how much wider than 2*radius a curve may be (default: radius)")
+    parser.add_argument("--min-run", type=int,
+                        help="shortest ramp, in blocks along X (default: 2*radius)")
+    parser.add_argument("--max-grade", type=float, default=MAX_GRADE,
+                        help=f"steepest allowed ramp, rise over run (default: {MAX_GRADE})")
+    parser.add_argument("--objective", choices=OBJECTIVES, default=LENGTH,
+                        help="minimize total track length or the steepest ramp (default: length)")
+    parser.add_argument("--x-range", type=int, nargs=2, metavar=("MIN", "MAX"),
+                        help="keep every curve between these X values")
+    args = parser.parse_args()
+    begin, finish = tuple(args.start), tuple(args.end)
+
+    print(f"Start: {begin}")
+    print(f"End: {finish}")
+    print(f"Total distance: X={finish[0] - begin[0]}, Y={finish[1] - begin[1]}, Z={finish[2] - begin[2]}")
+    print()
+
+    layout, stats = solve_anchors(
+        begin, finish, ramps=args.ramps, radius=args.radius, max_grade=args.max_grade,
+        objective=args.objective, slack=args.slack, min_run=args.min_run,
+        x_range=tuple(args.x_range) if args.x_range else None
+    )
+    print(stats.summary())
+    if layout is None:
+        print("No layout closes on the end point within the grade limit. "
+              "Try more ramps, a smaller radius or more slack.")
+        return
+
+    far, near = layout.columns
+    print(f"Turn columns: far X={far}, near X={near}")
+    print(f"Climb per ramp: {layout.climbs}")
+    print(f"Curve Z shifts: {layout.shifts}")
+    print(f"Max grade: {layout.max_grade:.3f}")
+    print(f"Total length: {layout.length:.1f}")
+    print()
+
+    print("ANCHOR POINTS (end of ramp, start of curve):")
+    print("=" * 60)
+    anchors = layout.anchors
+    for k in range(1, args.ramps):
+        print(f"Anchor {k} (after Ramp {k}, before Curve {k}): {anchors[2 * k - 1]}")
+        print(f"  After Curve {k}: {anchors[2 * k]}")
+        print()
+    print(f"Anchor {args.ramps} (End point): {anchors[-1]}")
+    print(f"Expected end: {finish}")
+    print()
+
+    # Summary for visualization
+    print("=" * 60)
+    print("COPY THESE COORDINATES FOR VISUALIZATION:")
+    print("=" * 60)
+    for anchor in anchors:
+        print(f"{anchor}")
+    print()
+
+    print("ANCHORS = [")
+    print(f"    {anchors[0]},  # Start")
+    for k in range(1, args.ramps):
+        shift = layout.shifts[k - 1]
+        print(f"    {anchors[2 * k - 1]},  # End of Ramp {k}")
+        print(f"    {anchors[2 * k]},  # After Curve {k} ({abs(shift)} blocks {'north' if shift < 0 else 'south'})")
+    print(f"    {anchors[-1]},  # End (Ramp {args.ramps})")
+    print("]")
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,71 @@
 #!/usr/bin/env python3
 """
 Check for duplicate coordinates between curves/ and curves_north/ directories.
+With --near, look for near-duplicate pairs instead.
 """
 
 import os
-import re
-import hashlib
+import argparse
 from pathlib import Path
 from collections import defaultdict
 
+import numpy as np
+
+from curve_files import read_curve_file
+from curve_index import INDEX_FILE, DigestIndex
+from curve_similarity import HAUSDORFF, MEAN, load_signatures, near_pairs
+
 def extract_coordinates(filepath):
-    """Extract all coordinates from a curve file."""
-    coords = []
-
-    with open(filepath, 'r') as f:
-        for line in f:
-            line = line.strip()
-
-            # Skip comments and empty lines
-            if not line or line.startswith('#'):
-                continue
-
-            # Parse coordinate line: [x, y, z]
-            match = re.match(r'\[(-?\d+),\s*(-?\d+),\s*(-?\d+)\]', line)
-            if match:
-                x = int(match.group(1))
-                y = int(match.group(2))
-                z = int(match.group(3))
-                coords.append((x, y, z))
-
-    if not coords:
+    """
+    Extract all coordinates from a curve file.
+    Returns an (n, 3) int array, or None if no coordinates found.
+    """
+    coords = read_curve_file(filepath).coords
+    if not len(coords):
+        return None
+
+    return coords
+
+def digest_curve_file(filepath):
+    """Digest of a file's coordinates, or None if no coordinates found."""
+    curve = read_curve_file(filepath)
+    if not len(curve.coords):
         return None
 
-    return tuple(coords)
+    return curve.digest
 
-def get_coord_hash(coords):
-    """Generate a hash from coordinate sequence."""
-    coord_str = str(coords)
-    return hashlib.md5(coord_str.encode()).hexdigest()
+def report_near_duplicates(south_files, north_files, threshold, metric):
+    """Prints south/north pairs within `threshold` blocks of each other."""
+    south_paths, south_sigs, _ = load_signatures(south_files)
+    north_paths, north_sigs, _ = load_signatures(north_files)
+    paths = south_paths + north_paths
+    sigs = np.concatenate([south_sigs, north_sigs])
+
+    pairs = near_pairs(sigs, threshold, metric, split=len(south_paths))
+    for i, j, dist in pairs:
+        print(f"≈ NEAR DUPLICATE ({metric} deviation {dist:.2f}):")
+        print(f"   South: {paths[i].name}")
+        print(f"   North: {paths[j].name}")
+        print()
+
+    print("=" * 80)
+    print(f"\nSummary:")
+    print(f"  Total south curves: {len(south_files)}")
+    print(f"  Total north curves: {len(north_files)}")
+    print(f"  Near duplicates found: {len(pairs)} (within {threshold} blocks)")
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--index", default=INDEX_FILE, metavar="PATH",
+                        help=f"digest index reused for unchanged files (default: {INDEX_FILE})")
+    parser.add_argument("--no-index", action="store_true",
+                        help="parse every file instead of using the digest index")
+    parser.add_argument("--near", type=float, metavar="BLOCKS",
+                        help="report south/north pairs within BLOCKS of each other instead")
+    parser.add_argument("--metric", choices=[MEAN, HAUSDORFF], default=MEAN,
+                        help="how --near measures the distance between two curves (default: mean)")
+    args = parser.parse_args()
+
     south_dir = Path('curves')
     north_dir = Path('curves_north')
 
@@ -60,26 +86,40 @@ def main():
     print(f"  North-first curves: {len(north_files)}")
     print("=" * 80)
 
+    if args.near is not None:
+        report_near_duplicates(south_files, north_files, args.near, args.metric)
+        return
+
+    if args.no_index:
+        south_digests = [digest_curve_file(filepath) for filepath in south_files]
+        north_digests = [digest_curve_file(filepath) for filepath in north_files]
+    else:
+        index = DigestIndex(args.index)
+        digests = index.refresh(south_files + north_files)
+        index.save()
+        south_digests = [digests[index.key(filepath)] for filepath in south_files]
+        north_digests = [digests[index.key(filepath)] for filepath in north_files]
+        print(f"Digest index: {len(digests) - index.parsed} files unchanged, "
+              f"{index.parsed} parsed")
+
     # Build hash map for south curves
     south_map = {}
-    for filepath in south_files:
-        coords = extract_coordinates(filepath)
-        if coords:
-            coord_hash = get_coord_hash(coords)
-            south_map[coord_hash] = (filepath, coords)
+    for filepath, digest in zip(south_files, south_digests):
+        if digest is not None:
+            south_map[digest] = filepath
 
     # Check north curves against south curves
     duplicates = []
 
-    for north_file in north_files:
-        north_coords = extract_coordinates(north_file)
-        if not north_coords:
+    for north_file, north_digest in zip(north_files, north_digests):
+        if north_digest is None:
             continue
 
-        north_hash = get_coord_hash(north_coords)
-
-        if north_hash in south_map:
-            south_file, south_coords = south_map[north_hash]
+        south_file = south_map.get(north_digest)
+        # Digest matches are rare, so reading both files again to compare is cheap
+        if south_file is not None and np.array_equal(
+            extract_coordinates(south_file), extract_coordinates(north_file)
+        ):
             duplicates.append((south_file, north_file))
             print(f"❌ DUPLICATE FOUND:")
             print(f"   South: {south_file.name}")
@@ -2,46 +2,57 @@
 """
 Analyze curve files to find those that go too far south.
 Rule: Curves are ineligible if they go to chunk Z >= 30 (e.g., [-12, 30])
+With --claims, curves entering an 'unavailable' chunk are ineligible too.
 """
 
 import os
-import re
+import argparse
+from functools import partial
 from pathlib import Path
 
+from chunk_claims import parse_claims
+from curve_files import map_curve_files, read_curve_file
+
 def get_chunk_z(z_coord):
     """Convert Z coordinate to chunk Z coordinate."""
     return z_coord // 16
 
-def analyze_curve_file(filepath):
+def analyze_curve_file(filepath, forbidden=None):
     """
-    Analyze a curve file and return the maximum chunk Z it reaches.
-    Returns: (max_chunk_z, max_z_coord, is_eligible)
+    Analyze a curve file and return the maximum chunk Z it reaches, and
+    with a ForbiddenChunks constraint the first forbidden chunk it enters.
+    Returns: (max_chunk_z, max_z_coord, is_eligible, blocked_chunk)
     """
-    max_z = float('-inf')
-
-    with open(filepath, 'r') as f:
-        for line in f:
-            line = line.strip()
-
-            # Skip comments and empty lines
-            if not line or line.startswith('#'):
-                continue
-
-            # Parse coordinate line: [x, y, z]
-            match = re.match(r'\[(-?\d+),\s*(-?\d+),\s*(-?\d+)\]', line)
-            if match:
-                z = int(match.group(3))
-                max_z = max(max_z, z)
-
-    if max_z == float('-inf'):
-        return None, None, None
+    coords = read_curve_file(filepath).coords
+    if not len(coords):
+        return None, None, None, None
 
+    max_z = int(coords[:, 2].max())
     max_chunk_z = get_chunk_z(max_z)
     is_eligible = max_chunk_z < 30  # Must be less than 30 to be eligible
 
-    return max_chunk_z, max_z, is_eligible
+    blocked_chunk = None
+    if forbidden is not None:
+        hits = forbidden.hits(coords[:, 0], coords[:, 2])
+        if hits.any():
+            x, _, z = coords[hits.argmax()]
+            blocked_chunk = (get_chunk_z(int(x)), get_chunk_z(int(z)))
+            is_eligible = False
+
+    return max_chunk_z, max_z, is_eligible, blocked_chunk
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of processes to analyze files with (default: 1)")
+    parser.add_argument("--claims", metavar="SOURCE",
+                        help="chunk claims export or SQLite file (see chunk_claims.py); "
+                             "curves entering an 'unavailable' chunk are ineligible")
+    parser.add_argument("--claims-set", type=int, metavar="ID",
+                        help="only use claims of this coordinate_set_id")
+    args = parser.parse_args()
+    forbidden = parse_claims(parser, args.claims, args.claims_set).constraint() if args.claims else None
+
     curves_dir = Path('curves')
 
     if not curves_dir.exists():
@@ -57,19 +68,26 @@ def main():
 
     print(f"Analyzing {len(curve_files)} curve files...")
     print(f"Rule: Curves must stay in chunk Z < 30 (Z coordinate < 480)")
+    if forbidden is not None:
+        print(f"Rule: Curves must stay out of {len(forbidden.chunks)} unavailable chunks")
     print("=" * 80)
 
     ineligible = []
+    claimed = []
     eligible = []
 
-    for filepath in curve_files:
-        max_chunk_z, max_z, is_eligible = analyze_curve_file(filepath)
+    analyze = partial(analyze_curve_file, forbidden=forbidden)
+    results = map_curve_files(analyze, curve_files, args.jobs)
+    for filepath, (max_chunk_z, max_z, is_eligible, blocked) in zip(curve_files, results):
 
         if max_chunk_z is None:
             print(f"⚠️  {filepath.name}: No coordinates found")
             continue
 
-        if is_eligible:
+        if blocked is not None and max_chunk_z < 30:
+            claimed.append((filepath.name, blocked))
+            print(f"❌ {filepath.name}: enters unavailable chunk {list(blocked)} - INELIGIBLE")
+        elif is_eligible:
             eligible.append((filepath.name, max_chunk_z, max_z))
         else:
             ineligible.append((filepath.name, max_chunk_z, max_z))
@@ -79,6 +97,8 @@ def main():
     print(f"\nSummary:")
     print(f"  ✅ Eligible curves: {len(eligible)}")
     print(f"  ❌ Ineligible curves: {len(ineligible)}")
+    if forbidden is not None:
+        print(f"  ❌ Curves in unavailable chunks: {len(claimed)}")
 
     if ineligible:
         print(f"\n📋 Ineligible files (going to chunk Z >= 30):")
@@ -90,6 +110,16 @@ def main():
         for filename, _, _ in ineligible:
             print(f"  mv {filename} ../curves_deleted/")
 
+    if claimed:
+        print(f"\n📋 Files entering unavailable chunks:")
+        for filename, (chunk_x, chunk_z) in claimed:
+            print(f"  {filename} (chunk [{chunk_x}, {chunk_z}])")
+
+        print(f"\n💡 To delete these files, run:")
+        print(f"  cd curves")
+        for filename, _ in claimed:
+            print(f"  mv {filename} ../curves_deleted/")
+
     # Show some eligible examples for verification
     if eligible:
         print(f"\n✅ Sample eligible files (staying in chunk Z < 30):")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Chunk claims from the `chunks` table (db_schemas/02_mc_coords/create_chunks.sql).
+
+Claims are loaded from a local export or from a SQLite file standing in for
+the MySQL database:
+  .json         the response of wwwroot/api/load-coords.php, or a bare list
+                of {"chunk_x", "chunk_z", "chunk_type"} objects
+  .csv / .tsv   chunk_x, chunk_z, chunk_type columns with a header row
+                (e.g. `mysql -B -e "SELECT chunk_x, chunk_z, chunk_type ..."`)
+  .db / .sqlite a SQLite file with a `chunks` table shaped like the MySQL one
+A coordinate set is picked from a SQLite file or from an export with a
+coordinate_set_id column; a load-coords.php response holds one set, and has
+to be the one asked for.
+
+The 'unavailable' chunks become a ForbiddenChunks constraint, so the search
+drops any curve whose rounded path enters one.
+
+Usage:
+  python chunk_claims.py SOURCE [--set ID]              # summarize claims
+  python chunk_claims.py SOURCE --sqlite OUT.db [--set ID]  # write a SQLite stand-in
+"""
+
+import argparse
+import csv
+import errno
+import json
+import os
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional, Set, Tuple
+
+from curve_constraints import ForbiddenChunks
+
+MINE = "mine"
+UNAVAILABLE = "unavailable"
+CHUNK_TYPES = (MINE, UNAVAILABLE)
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+# The MySQL chunks table without the InnoDB-only parts
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chunks (
+    chunk_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    coordinate_set_id INTEGER NOT NULL,
+    chunk_x INTEGER NOT NULL,
+    chunk_z INTEGER NOT NULL,
+    chunk_type TEXT NOT NULL CHECK (chunk_type IN ('mine', 'unavailable')),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (coordinate_set_id, chunk_x, chunk_z)
+)
+"""
+
+Chunk = Tuple[int, int]
+
+class NoSetColumn(ValueError):
+    """An export without coordinate_set_id was asked for one set."""
+
+@dataclass
+class ChunkClaims:
+    mine: Set[Chunk] = field(default_factory=set)
+    unavailable: Set[Chunk] = field(default_factory=set)
+
+    def add(self, chunk_x: int, chunk_z: int, chunk_type: str):
+        if chunk_type == MINE:
+            self.mine.add((int(chunk_x), int(chunk_z)))
+        elif chunk_type == UNAVAILABLE:
+            self.unavailable.add((int(chunk_x), int(chunk_z)))
+        else:
+            raise ValueError(f"Invalid chunk_type: {chunk_type!r}")
+
+    def constraint(self) -> ForbiddenChunks:
+        """Constraint rejecting curves that enter an 'unavailable' chunk."""
+        return ForbiddenChunks(self.unavailable)
+
+    def rows(self) -> List[Tuple[int, int, str]]:
+        return (
+            [(x, z, MINE) for x, z in sorted(self.mine)]
+            + [(x, z, UNAVAILABLE) for x, z in sorted(self.unavailable)]
+        )
+
+def _from_rows(rows: Iterable) -> ChunkClaims:
+    claims = ChunkClaims()
+    for row in rows:
+        claims.add(row["chunk_x"], row["chunk_z"], row["chunk_type"])
+    return claims
+
+def _in_set(rows: List[dict], path: str, coordinate_set_id: Optional[int]) -> List[dict]:
+    """The rows of one coordinate set, by their coordinate_set_id column."""
+    if coordinate_set_id is None:
+        return rows
+    if any("coordinate_set_id" not in row for row in rows):
+        raise NoSetColumn(
+            f"{path} has no coordinate_set_id column to pick set {coordinate_set_id} by; "
+            f"leave out the set, or store the export as that set first "
+            f"(python chunk_claims.py {path} --sqlite OUT.db --set {coordinate_set_id})"
+        )
+    return [row for row in rows if int(row["coordinate_set_id"]) == coordinate_set_id]
+
+def load_export(path: str, coordinate_set_id: Optional[int] = None) -> ChunkClaims:
+    """Claims from a .json or .csv/.tsv export, optionally from one coordinate set only."""
+    if path.endswith(".json"):
+        with open(path) as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            return _from_rows(_in_set(data, path, coordinate_set_id))
+
+        # A load-coords.php response is the chunks of the set it names
+        exported = data.get("set", {}).get("coordinate_set_id")
+        if coordinate_set_id is not None and exported is not None:
+            if int(exported) != coordinate_set_id:
+                raise ValueError(f"{path} holds coordinate set {exported}, not {coordinate_set_id}")
+            return _from_rows(data["chunks"])
+        return _from_rows(_in_set(data["chunks"], path, coordinate_set_id))
+
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f, delimiter="\t" if path.endswith(".tsv") else ","))
+    return _from_rows(_in_set(rows, path, coordinate_set_id))
+
+def load_sqlite(path: str, coordinate_set_id: Optional[int] = None) -> ChunkClaims:
+    """Claims from a SQLite stand-in, optionally from one coordinate set only."""
+    if not os.path.exists(path):
+        # sqlite3.connect would create an empty database instead
+        raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), path)
+
+    query = "SELECT chunk_x, chunk_z, chunk_type FROM chunks"
+    params: tuple = ()
+    if coordinate_set_id is not None:
+        query += " WHERE coordinate_set_id = ?"
+        params = (coordinate_set_id,)
+
+    with sqlite3.connect(path) as db:
+        db.row_factory = sqlite3.Row
+        return _from_rows(db.execute(query, params))
+
+def load_claims(source: str, coordinate_set_id: Optional[int] = None) -> ChunkClaims:
+    """Claims from an export or SQLite file, picked by file extension."""
+    if source.endswith(SQLITE_SUFFIXES):
+        return load_sqlite(source, coordinate_set_id)
+    return load_export(source, coordinate_set_id)
+
+def parse_claims(parser: argparse.ArgumentParser, source: str, coordinate_set_id: Optional[int] = None) -> ChunkClaims:
+    """
+    load_claims for a command line: a set the source can't pick, or a source
+    that can't be read, is a usage error.
+    """
+    try:
+        return load_claims(source, coordinate_set_id)
+    except ValueError as e:
+        parser.error(str(e))
+    except (OSError, sqlite3.DatabaseError) as e:
+        parser.error(f"Can't read claims from {source}: {e}")
+
+def write_sqlite(claims: ChunkClaims, path: str, coordinate_set_id: int = 1):
+    """Writes claims into a SQLite stand-in, replacing that set's rows."""
+    with sqlite3.connect(path) as db:
+        db.execute(SQLITE_SCHEMA)
+        db.execute("DELETE FROM chunks WHERE coordinate_set_id = ?", (coordinate_set_id,))
+        db.executemany(
+            "INSERT INTO chunks (coordinate_set_id, chunk_x, chunk_z, chunk_type) "
+            "VALUES (?, ?, ?, ?)",
+            [(coordinate_set_id, x, z, t) for x, z, t in claims.rows()]
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize or convert chunk claims.")
+    parser.add_argument("source", help="claims export (.json/.csv/.tsv) or SQLite file")
+    parser.add_argument("--set", type=int, metavar="ID",
+                        help="coordinate_set_id to read; with --sqlite also the set to write "
+                             "(an export without a coordinate_set_id column is written whole)")
+    parser.add_argument("--sqlite", metavar="OUT",
+                        help="write the claims into a SQLite stand-in at OUT")
+    args = parser.parse_args()
+
+    try:
+        claims = load_claims(args.source, args.set)
+    except NoSetColumn as e:
+        if not args.sqlite:
+            parser.error(str(e))
+        # An export of one set is written as the set asked for
+        claims = load_claims(args.source)
+    except ValueError as e:
+        parser.error(str(e))
+    except (OSError, sqlite3.DatabaseError) as e:
+        parser.error(f"Can't read claims from {args.source}: {e}")
+    print(f"{len(claims.mine)} 'mine' chunks, {len(claims.unavailable)} 'unavailable' chunks")
+
+    if args.sqlite:
+        try:
+            write_sqlite(claims, args.sqlite, args.set if args.set is not None else 1)
+        except (OSError, sqlite3.DatabaseError) as e:
+            parser.error(f"Can't write claims to {args.sqlite}: {e}")
+        print(f"Wrote {len(claims.rows())} claims to {args.sqlite}")
+
+if __name__ == "__main__":
+    main()
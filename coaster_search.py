@@ -0,0 +1,521 @@
+#!/usr/bin/env python3
+"""
+Coaster curve search shared by coaster_coordination.py (south-first) and
+coaster_coordination_north.py (north-first).
+
+Everything that differs between the two lives in a CoasterConfig: the bulge
+direction, the output directory, the header wording and the constraints a
+curve has to satisfy (see curve_constraints.py). The entry points only
+build a config and call main() with it.
+"""
+
+import argparse
+import os
+from dataclasses import asdict, dataclass, field, replace
+from functools import partial
+from typing import AbstractSet, Dict, List, Sequence, Tuple, Optional
+
+import numpy as np
+
+from chunk_claims import parse_claims
+from curve_cache import CurveCache
+from curve_constraints import DEFAULT_CONSTRAINTS, Constraint
+from curve_ranking import DEFAULT_OBJECTIVES, Ranking, parse_objectives
+from curve_refine import refine_search
+from curve_files import ALIAS_FILE, CurveDeduper, CurveWriter, coord_digest, format_txt, write_atomic
+from curve_index import DigestIndex
+from curve_store import CurveStore
+from rail_path import count_rails, rail_path
+from search_manifest import SearchManifest, search_incremental
+from curve_engine import (
+    SOUTH, OK_NOTE, curve_arrays, analyze_arrays, as_points, round_arrays,
+    search_grid, equivalent_shapes, SearchStats, SAMPLED, ANALYTIC
+)
+
+Vec3 = Tuple[float, float, float]
+
+# Shared by save_curve_to_file calls that don't bring their own cache
+DEFAULT_CACHE = CurveCache()
+
+# Curves generated at once for saving (well within the cache's max_entries)
+SAVE_BATCH = 256
+
+@dataclass
+class CoasterConfig:
+    description: str          # argparse description of the entry point
+    bulge: float              # SOUTH or NORTH: which way the curve leaves
+    bulge_name: str           # "south" / "north", for headers
+    output_dir: str           # where the .txt files go
+    title: str = "Curve Parameters"
+    constraints: Tuple[Constraint, ...] = DEFAULT_CONSTRAINTS
+    report_chunk_z: bool = False  # show min_chunk_z in headers and the top 20
+
+    # Search space knobs
+    start: Vec3 = (-199.0, 98.0, 410.0)
+    end_xz: Tuple[float, float] = (-330.0, 352.0)
+    y_end_min: int = 222
+    y_end_max: int = 270
+    loops_range: range = range(0, 9)
+    A_values: Sequence[float] = (40, 60, 80, 100, 120, 140)
+    B_values: Sequence[float] = (0, 10, 20, 30, 40, 60, 80)
+    samples: int = 900
+    coord_samples: int = 350  # points written per saved curve
+
+@dataclass
+class CurveParams:
+    y_end: int
+    loops: int        # number of lateral circuits
+    A: float          # bulge amplitude in Z (blocks)
+    B: float          # lateral wiggle amplitude in X (blocks)
+    samples: int      # number of sample points
+
+@dataclass
+class CurveReport:
+    params: CurveParams
+    ok: bool
+    max_grade: float
+    length3d: float
+    length2d: float
+    min_horiz_step: float
+    min_chunk_z: int  # minimum chunk Z (northernmost point)
+    notes: str
+    # Other grid params that draw exactly this curve (see equivalent_shapes)
+    aliases: List[CurveParams] = field(default_factory=list)
+    # Objective values the curve was ranked by (see curve_ranking)
+    scores: Dict[str, float] = field(default_factory=dict)
+
+def generate_curve_points(
+    start: Vec3,
+    end_xz: Tuple[float, float],
+    y_end: float,
+    loops: int,
+    A: float,
+    B: float,
+    samples: int = 600,
+    bulge: float = SOUTH
+) -> List[Vec3]:
+    """
+    Generates a smooth curve that:
+      - starts moving South (+Z) and ends moving North (-Z), or the other
+        way round with bulge=NORTH
+      - dx/dt = 0 at endpoints, so heading is purely along Z at both ends
+      - includes 'loops' lateral oscillations to create circuits (adds horizontal distance)
+    """
+
+    x, y, z = curve_arrays(start, end_xz, y_end, loops, A, B, samples, bulge=bulge)
+    return as_points(x, y, z)
+
+def analyze_curve(
+    points: List[Vec3],
+    constraints: Sequence[Constraint] = DEFAULT_CONSTRAINTS
+) -> Tuple[bool, float, float, float, float, int, str]:
+    """
+    Checks `constraints` (by default the 45° grade, |dy| <= horizontal
+    distance) segment-by-segment.
+    Returns:
+        ok, max_grade, length3d, length2d, min_horiz_step, min_chunk_z, notes
+    """
+    if len(points) < 2:
+        chunk_z = int(points[0][2] // 16) if points else 0
+        return (True, 0.0, 0.0, 0.0, float("inf"), chunk_z, "OK")
+
+    x, y, z = np.asarray(points, dtype=float).T
+    ok, max_grade, L3, L2, min_h, notes, n = analyze_arrays(x, y, z, constraints)
+
+    # Only the points of the segments that were examined count towards min Z
+    min_chunk_z = int(z[:n + 1].min() // 16)
+    return (ok, max_grade, L3, L2, min_h, min_chunk_z, notes)
+
+def curve_filename(p: CurveParams) -> str:
+    return f"curve_y{p.y_end}_loops{p.loops}_A{int(p.A)}_B{int(p.B)}.txt"
+
+def search(
+    start: Vec3,
+    end_xz: Tuple[float, float],
+    y_end_min: int,
+    y_end_max: int,
+    loops_range: range,
+    A_values: List[float],
+    B_values: List[float],
+    samples: int = 800,
+    bulge: float = SOUTH,
+    constraints: Sequence[Constraint] = DEFAULT_CONSTRAINTS,
+    max_batch_mb: int = 256,
+    workers: int = 1,
+    prune: bool = True,
+    stats: Optional[SearchStats] = None,
+    grade_solver: str = SAMPLED,
+    manifest: Optional[SearchManifest] = None,
+    merge_equivalent: bool = True,
+    ranking: Optional[Ranking] = None
+) -> List[CurveReport]:
+    """
+    Evaluates the whole (y_end, loops, A, B) grid in batches of at most
+    max_batch_mb MB and returns the curves that satisfy `constraints`,
+    best first. `ranking` decides what "best" means and how many curves
+    are kept (all of them by lowest max_grade, then shortest length, if not
+    given); feasible curves stream into it, so only the kept ones are ever
+    held in memory. The constraints are checked during the same pass over the
+    samples as the grade, so a curve is dropped as soon as it breaks one.
+    With workers > 1 the grid is spread over that many processes.
+    prune skips (loops, A, B) combinations at every y_end above one where
+    they already failed; pass a SearchStats to see how much was skipped.
+    grade_solver="analytic" decides the 45° rule from the exact max grade
+    before any samples are taken.
+    With a manifest, only cells it has no record of are evaluated; the rest
+    are read back from it.
+    merge_equivalent evaluates the loops=0 / B=0 combinations, which all
+    draw the same curve, once per (y_end, A) and lists the others in the
+    report's aliases.
+    """
+    y_ends = list(range(y_end_min, y_end_max + 1, 2))
+    loops_values = list(loops_range)
+    A_values = list(A_values)
+    B_values = list(B_values)
+
+    equivalent = equivalent_shapes(loops_values, B_values) if merge_equivalent else {}
+    ranking = ranking if ranking is not None else Ranking()
+    grid_search = search_grid if manifest is None else partial(search_incremental, manifest)
+    grid_search(
+        start, end_xz, y_ends, loops_values, A_values, B_values, samples,
+        bulge=bulge, max_bytes=max_batch_mb * 1024 * 1024, workers=workers,
+        prune=prune, stats=stats, grade_solver=grade_solver,
+        skip_shapes=set(equivalent), constraints=constraints, ranking=ranking
+    )
+
+    def aliases_of(iy: int, il: int, ia: int, ib: int) -> List[CurveParams]:
+        return [
+            CurveParams(
+                y_end=y_ends[iy], loops=loops_values[jl],
+                A=A_values[ia], B=B_values[jb], samples=samples
+            )
+            for (jl, jb), shape in equivalent.items() if shape == (il, ib)
+        ]
+
+    # Already best first
+    return [
+        CurveReport(
+            params=CurveParams(
+                y_end=y_ends[iy], loops=loops_values[il],
+                A=A_values[ia], B=B_values[ib], samples=samples
+            ),
+            ok=True,
+            max_grade=max_grade,
+            length3d=L3,
+            length2d=L2,
+            min_horiz_step=min_h,
+            min_chunk_z=int(min_z // 16),
+            notes=OK_NOTE,
+            aliases=aliases_of(iy, il, ia, ib),
+            scores=scores
+        )
+        for (iy, il, ia, ib, max_grade, L3, L2, min_h, min_z), scores in ranking.results()
+    ]
+
+def curve_header(
+    report: CurveReport,
+    config: CoasterConfig,
+    rails: Optional[Tuple[int, int, int]] = None
+) -> str:
+    """
+    Metadata header written above the coordinates of a saved curve.
+    `rails` is the (rails, powered rails, steep steps) count of a curve
+    saved as a rail path.
+    """
+    p = report.params
+    chunk_z = f"# min_chunk_z: {report.min_chunk_z}\n" if config.report_chunk_z else ""
+    if rails is not None:
+        chunk_z += (
+            f"# rails: {rails[0]}\n"
+            f"# powered_rails: {rails[1]}\n"
+            f"# steep_steps: {rails[2]}\n"
+        )
+    return (
+        f"# {config.title}\n"
+        f"# y_end: {p.y_end}\n"
+        f"# loops: {p.loops}\n"
+        f"# A ({config.bulge_name} bulge): {p.A}\n"
+        f"# B (lateral wiggle): {p.B}\n"
+        f"# samples: {config.coord_samples}\n"
+        f"#\n"
+        f"# Analysis Results\n"
+        f"# max_grade: {report.max_grade:.6f}\n"
+        f"# length_3d: {report.length3d:.2f}\n"
+        f"# length_2d: {report.length2d:.2f}\n"
+        f"# min_horiz_step: {report.min_horiz_step:.6f}\n"
+        f"{chunk_z}"
+        f"# status: {report.notes}\n"
+        f"#\n"
+        f"# Coordinates (x, y, z)\n"
+        f"#" + "="*50 + "\n\n"
+    )
+
+def save_curve_to_file(
+    report: CurveReport,
+    config: CoasterConfig,
+    cache: Optional[CurveCache] = None,
+    store: Optional[CurveStore] = None,
+    writer: Optional[CurveWriter] = None,
+    dedupe: Optional[CurveDeduper] = None,
+    rails: bool = False
+) -> str:
+    """
+    Save a curve's coordinates and metadata to a file named with its
+    parameters, in config.output_dir.
+    The coordinates come from `cache` (DEFAULT_CACHE if not given). With a
+    `store` the curve goes into the packed store instead of output_dir. The
+    file is replaced atomically, by `writer` in the background if given.
+    With `dedupe`, a curve whose points were already saved under another
+    name is recorded as an alias of it instead. With `rails` the points are
+    saved as the rail path (see rail_path) and the header gets its rail
+    counts; steep_steps counts the steps a curve climbing faster than it
+    moves still has. Returns the name of the file that holds the curve.
+    """
+    p = report.params
+    filename = curve_filename(p)
+
+    # Generate the curve points
+    curve = (cache or DEFAULT_CACHE).get(
+        config.start, config.end_xz, p, samples=config.coord_samples, bulge=config.bulge,
+        constraints=config.constraints
+    )
+    rounded = round_arrays(curve.x, curve.y, curve.z)
+    counts = None
+    if rails:
+        rounded = rail_path(rounded)
+        counts = tuple(int(c[0]) for c in count_rails(rounded, np.zeros(len(rounded), dtype=np.intp), 1))
+    header = curve_header(report, config, counts)
+
+    if dedupe is not None:
+        original = dedupe.original(filename, rounded)
+        if original is not None:
+            return original
+
+    if store is not None:
+        store.put(filename, header, rounded, asdict(p))
+        return filename
+
+    os.makedirs(config.output_dir, exist_ok=True)
+    filepath = os.path.join(config.output_dir, filename)
+    text = format_txt(header, rounded)
+    if writer is not None:
+        writer.write(filepath, text)
+    else:
+        write_atomic(filepath, text)
+    return filename
+
+def saved_digests(
+    output_dir: str,
+    store: Optional[CurveStore] = None,
+    skip: AbstractSet[str] = frozenset()
+) -> Dict[str, Optional[str]]:
+    """
+    {name: coord_digest} of the curves already saved in `store`, or in
+    output_dir (read through the digest index), except the names in `skip`.
+    """
+    if store is not None:
+        return {name: coord_digest(store.points(name)) for name in store.names() if name not in skip}
+    if not os.path.isdir(output_dir):
+        return {}
+
+    paths = [
+        os.path.join(output_dir, name) for name in sorted(os.listdir(output_dir))
+        if name.endswith(".txt") and name not in skip
+    ]
+    index = DigestIndex()
+    digests = index.refresh(paths)
+    index.save()
+    return {os.path.basename(path): digests[index.key(path)] for path in paths}
+
+def main(config: CoasterConfig):
+    parser = argparse.ArgumentParser(description=config.description)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes to spread the search over (default: 1)")
+    parser.add_argument("--no-prune", action="store_true",
+                        help="evaluate every y_end even after a lower one already failed")
+    parser.add_argument("--grade-solver", choices=[SAMPLED, ANALYTIC], default=SAMPLED,
+                        help="check the 45° rule on the samples or with the exact max grade")
+    parser.add_argument("--refine", type=int, metavar="LEVELS",
+                        help="refine continuous A/B over the A_values/B_values ranges "
+                             "and print the Pareto front instead of saving curves")
+    parser.add_argument("--cache-dir",
+                        help="keep generated curves in this directory between runs")
+    parser.add_argument("--manifest", metavar="PATH",
+                        help="record evaluated cells in PATH; re-runs only evaluate "
+                             "cells it doesn't have and only write their curve files")
+    parser.add_argument("--store", metavar="DIR",
+                        help="save curves into a packed curve store in DIR instead of .txt files "
+                             "(python curve_store.py export turns it back into .txt)")
+    parser.add_argument("--keep-duplicates", action="store_true",
+                        help="evaluate and save every grid cell, even ones that draw "
+                             "the same curve as another")
+    parser.add_argument("--claims", metavar="SOURCE",
+                        help="chunk claims export or SQLite file (see chunk_claims.py); "
+                             "curves entering an 'unavailable' chunk are rejected")
+    parser.add_argument("--claims-set", type=int, metavar="ID",
+                        help="only use claims of this coordinate_set_id")
+    parser.add_argument("--rank-by", type=parse_objectives, default=DEFAULT_OBJECTIVES,
+                        metavar="OBJECTIVES",
+                        help="comma-separated objectives to rank curves by, in order: "
+                             "max_grade, length, lateral, chunks, rails, powered; prefix with - to "
+                             "maximize (default: max_grade,length)")
+    parser.add_argument("--top", type=int, metavar="K",
+                        help="only keep (and save) the K best curves")
+    parser.add_argument("--pareto", action="store_true",
+                        help="keep (and save) the Pareto front of the --rank-by objectives")
+    parser.add_argument("--rails", action="store_true",
+                        help="save each curve as a rail path (no repeated blocks, one block "
+                             "per step, at most one block up or down per step) with its rail, "
+                             "powered rail and steep step counts")
+    args = parser.parse_args()
+    ranking = Ranking(args.rank_by, k=args.top, pareto=args.pareto, samples=config.coord_samples)
+    if args.claims:
+        claims = parse_claims(parser, args.claims, args.claims_set)
+        config = replace(config, constraints=tuple(config.constraints) + (claims.constraint(),))
+        print(f"Avoiding {len(claims.unavailable)} unavailable chunks from {args.claims}")
+    manifest = SearchManifest(args.manifest) if args.manifest else None
+    store = CurveStore(args.store) if args.store else None
+    cache = CurveCache(directory=args.cache_dir)
+    output_dir = config.output_dir
+
+    if args.refine is not None:
+        front, refine_stats = refine_search(
+            config.start, config.end_xz,
+            y_ends=list(range(config.y_end_min, config.y_end_max + 1, 2)),
+            loops_values=list(config.loops_range),
+            A_range=(min(config.A_values), max(config.A_values)),
+            B_range=(min(config.B_values), max(config.B_values)),
+            levels=args.refine,
+            samples=config.samples,
+            bulge=config.bulge,
+            grade_solver=args.grade_solver,
+            constraints=config.constraints,
+        )
+        print(refine_stats.summary())
+        print(f"\nPareto front: {len(front)} curves. First 20 (lowest max grade first):\n")
+        for i, c in enumerate(front[:20], 1):
+            print(
+                f"{i:2d}) y_end={c.y_end} loops={c.loops} A={c.A:.2f} B={c.B:.2f} | "
+                f"max_grade={c.max_grade:.3f} | L2={c.length2d:.1f} L3={c.length3d:.1f}"
+            )
+        return
+
+    stats = SearchStats()
+    all_curves = search(
+        start=config.start,
+        end_xz=config.end_xz,
+        y_end_min=config.y_end_min,
+        y_end_max=config.y_end_max,
+        loops_range=config.loops_range,
+        A_values=config.A_values,
+        B_values=config.B_values,
+        samples=config.samples,
+        bulge=config.bulge,
+        constraints=config.constraints,
+        workers=args.workers,
+        prune=not args.no_prune,
+        stats=stats,
+        grade_solver=args.grade_solver,
+        manifest=manifest,
+        merge_equivalent=not args.keep_duplicates,
+        ranking=ranking
+    )
+
+    print(stats.summary())
+    if args.pareto:
+        print(f"Pareto front of {', '.join(args.rank_by)}: {len(all_curves)} of {ranking.seen} curves")
+    elif args.top is not None:
+        print(f"Kept the {len(all_curves)} best of {ranking.seen} curves by {', '.join(args.rank_by)}")
+    if manifest is not None:
+        manifest.save()
+
+    if not all_curves:
+        print("No feasible curves found in this search space. Try increasing loops/A/B or samples.")
+        return
+
+    def already_saved(p: CurveParams) -> bool:
+        if store is not None:
+            return curve_filename(p) in store
+        return os.path.exists(os.path.join(output_dir, curve_filename(p)))
+
+    # Curves from earlier manifest runs are already on disk
+    to_save = [
+        r for r in all_curves
+        if manifest is None
+        or manifest.is_new(r.params.y_end, r.params.loops, r.params.A, r.params.B)
+        or not already_saved(r.params)
+    ]
+    if manifest is None:
+        print(f"Found {len(all_curves)} valid curves. Saving to files...\n")
+    else:
+        print(f"Found {len(all_curves)} valid curves, {len(to_save)} not on disk yet. Saving to files...\n")
+
+    # Curves that round to the same points as an earlier one become aliases
+    dedupe = None if args.keep_duplicates else CurveDeduper(
+        os.path.join(args.store or output_dir, ALIAS_FILE)
+    )
+    if dedupe is not None:
+        # Including the ones earlier runs saved, unless they are saved again now
+        dedupe.seed(saved_digests(output_dir, store, {curve_filename(r.params) for r in to_save}))
+    written = 0
+
+    # Files are written in the background while the next curves are generated,
+    # a batch at a time at the resolution they are saved at
+    with CurveWriter() as writer:
+        for i, curve in enumerate(to_save, 1):
+            if (i - 1) % SAVE_BATCH == 0:
+                cache.fill(
+                    config.start, config.end_xz, [r.params for r in to_save[i - 1:i - 1 + SAVE_BATCH]],
+                    config.coord_samples, config.bulge, config.constraints
+                )
+            saved_as = save_curve_to_file(
+                curve, config, cache=cache, store=store, writer=writer, dedupe=dedupe,
+                rails=args.rails
+            )
+            if saved_as == curve_filename(curve.params):
+                written += 1
+            for alias in curve.aliases:
+                dedupe.alias(curve_filename(alias), saved_as)
+            if i % 50 == 0:
+                print(f"Saved {i}/{len(to_save)} curves...")
+
+    if dedupe is not None:
+        dedupe.save()
+
+    if store is not None:
+        store.flush()
+        print(f"\nAll {written} curves saved to store '{args.store}/'")
+    else:
+        print(f"\nAll {written} curves saved to '{output_dir}/' directory")
+    if dedupe is not None and dedupe.recorded:
+        print(f"{dedupe.recorded} duplicate curves recorded as aliases in {dedupe.alias_path}")
+    if args.cache_dir:
+        print(cache.summary())
+
+    # Print summary of top 20 curves
+    if tuple(args.rank_by) == DEFAULT_OBJECTIVES and not args.pareto:
+        print("\nTop 20 curves (sorted by lowest max grade, then shortest length):\n")
+    else:
+        print(f"\nTop 20 curves (sorted by {', '.join(args.rank_by)}):\n")
+    for i, r in enumerate(all_curves[:20], 1):
+        p = r.params
+        extra = (
+            f"min_chunk_z={r.min_chunk_z}" if config.report_chunk_z
+            else f"min_h_step={r.min_horiz_step:.3f}"
+        )
+        for name, value in r.scores.items():
+            if name not in DEFAULT_OBJECTIVES:
+                extra += f" {name}={value:g}"
+        print(
+            f"{i:2d}) y_end={p.y_end} loops={p.loops} A={p.A} B={p.B} | "
+            f"max_grade={r.max_grade:.3f} | L2={r.length2d:.1f} L3={r.length3d:.1f} | {extra}"
+        )
+
+    # Show the best curve filename
+    best = all_curves[0]
+    bp = best.params
+    best_filename = curve_filename(bp)
+    if dedupe is not None:
+        best_filename = dedupe.aliases.get(best_filename, best_filename)
+    where = args.store if store is not None else output_dir
+    print(f"\nBest curve saved as: {where}/{best_filename}")
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of generated curves.
+
+Entries are keyed by (start, end_xz, y_end, loops, A, B, samples, bulge),
+the constraints the curve was analyzed against, and a fingerprint of the
+generator source in curve_engine and curve_constraints, so editing the curve
+formula or the analysis automatically invalidates everything cached before.
+Each entry holds the curve's x/y/z arrays and its analysis. The cache is an
+in-memory LRU and can be backed by a directory of .npz files, which is
+itself capped and evicted least-recently-used first. fill() generates a
+whole list of curves in one batch, so a search can cache the curves it is
+about to save at the resolution they are saved at.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+import curve_constraints
+import curve_engine
+from curve_constraints import DEFAULT_CONSTRAINTS, Constraint, describe_all
+from curve_engine import SOUTH, Vec3, analyze_arrays, curve_arrays, curve_batch
+
+def _code_fingerprint() -> str:
+    """Hash of the functions whose output is cached."""
+    source = "".join(
+        inspect.getsource(fn) for fn in (
+            curve_engine.sample_t,
+            curve_engine.smoothstep,
+            curve_engine.curve_arrays,
+            curve_engine.curve_batch,
+            curve_engine.segment_arrays,
+            curve_engine.first_violation,
+            curve_engine.constraint_violations,
+            curve_engine.analyze_segments,
+            curve_engine.analyze_arrays,
+            curve_constraints,
+        )
+    )
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+CODE_VERSION = _code_fingerprint()
+
+@dataclass
+class CachedCurve:
+    x: np.ndarray
+    y: np.ndarray
+    z: np.ndarray
+    ok: bool
+    max_grade: float
+    length3d: float
+    length2d: float
+    min_horiz_step: float
+    min_z: float       # lowest Z over the examined points
+    notes: str
+
+    def analysis(self) -> Tuple[bool, float, float, float, float, str]:
+        """Same tuple analyze_curve returns."""
+        return (self.ok, self.max_grade, self.length3d, self.length2d,
+                self.min_horiz_step, self.notes)
+
+class CurveCache:
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        directory: Optional[str] = None,
+        max_disk_entries: int = 100_000
+    ):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, CachedCurve]" = OrderedDict()
+        self._disk_count = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._disk_count = sum(1 for name in os.listdir(directory) if name.endswith(".npz"))
+
+    @staticmethod
+    def key(
+        start: Vec3,
+        end_xz: Tuple[float, float],
+        params,
+        samples: Optional[int] = None,
+        bulge: float = SOUTH,
+        constraints: Sequence[Constraint] = DEFAULT_CONSTRAINTS
+    ) -> str:
+        """
+        Content address of a curve. `params` is any object with y_end, loops,
+        A and B (CurveParams from either search script); `samples` defaults
+        to params.samples.
+        """
+        if samples is None:
+            samples = params.samples
+        fields = [
+            CODE_VERSION,
+            [float(v) for v in start],
+            [float(v) for v in end_xz],
+            float(params.y_end), int(params.loops), float(params.A), float(params.B),
+            int(samples), float(bulge),
+            describe_all(constraints),
+        ]
+        return hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+    def get(
+        self,
+        start: Vec3,
+        end_xz: Tuple[float, float],
+        params,
+        samples: Optional[int] = None,
+        bulge: float = SOUTH,
+        constraints: Sequence[Constraint] = DEFAULT_CONSTRAINTS
+    ) -> CachedCurve:
+        """
+        Returns the cached curve, generating and storing it on a miss. Its
+        ok / notes say whether it satisfies `constraints`.
+        """
+        if samples is None:
+            samples = params.samples
+        key = self.key(start, end_xz, params, samples, bulge, constraints)
+
+        curve = self._memory.get(key)
+        if curve is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return curve
+
+        curve = self._load(key)
+        if curve is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            x, y, z = curve_arrays(
+                start, end_xz, params.y_end, params.loops, params.A, params.B, samples, bulge=bulge
+            )
+            curve = self._analyzed(x, y, z, constraints)
+            self._store(key, curve)
+
+        self._remember(key, curve)
+        return curve
+
+    def fill(
+        self,
+        start: Vec3,
+        end_xz: Tuple[float, float],
+        params_list: Sequence,
+        samples: int,
+        bulge: float = SOUTH,
+        constraints: Sequence[Constraint] = DEFAULT_CONSTRAINTS
+    ) -> int:
+        """
+        Generates every curve of `params_list` that isn't cached yet in one
+        batch (see curve_batch), so the get() calls that follow are hits.
+        Keep the list within max_entries. Returns how many were generated.
+        """
+        keys = [self.key(start, end_xz, p, samples, bulge, constraints) for p in params_list]
+        missing = [
+            (key, p) for key, p in zip(keys, params_list)
+            if key not in self._memory and (self.directory is None or not os.path.exists(self._path(key)))
+        ]
+        missing = list(dict(missing).items())
+        if not missing:
+            return 0
+
+        x, y, z = curve_batch(
+            start, end_xz,
+            np.array([float(p.y_end) for _, p in missing]),
+            np.array([int(p.loops) for _, p in missing]),
+            np.array([float(p.A) for _, p in missing]),
+            np.array([float(p.B) for _, p in missing]),
+            samples, bulge
+        )
+        self.misses += len(missing)
+        for row, (key, _) in enumerate(missing):
+            curve = self._analyzed(x[row], y[row], z[row], constraints)
+            self._store(key, curve)
+            self._remember(key, curve)
+        return len(missing)
+
+    def summary(self) -> str:
+        return f"Curve cache: {self.hits} hits, {self.misses} misses"
+
+    @staticmethod
+    def _analyzed(x, y, z, constraints) -> CachedCurve:
+        ok, max_grade, L3, L2, min_h, notes, n = analyze_arrays(x, y, z, constraints)
+        return CachedCurve(
+            x=x, y=y, z=z, ok=ok, max_grade=max_grade, length3d=L3, length2d=L2,
+            min_horiz_step=min_h, min_z=float(z[:n + 1].min()), notes=notes
+        )
+
+    def _remember(self, key: str, curve: CachedCurve):
+        self._memory[key] = curve
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + ".npz")
+
+    def _load(self, key: str) -> Optional[CachedCurve]:
+        if self.directory is None:
+            return None
+
+        path = self._path(key)
+        try:
+            with np.load(path) as data:
+                curve = CachedCurve(
+                    x=data["x"], y=data["y"], z=data["z"],
+                    ok=bool(data["ok"]),
+                    max_grade=float(data["max_grade"]),
+                    length3d=float(data["length3d"]),
+                    length2d=float(data["length2d"]),
+                    min_horiz_step=float(data["min_horiz_step"]),
+                    min_z=float(data["min_z"]),
+                    notes=str(data["notes"])
+                )
+        except (OSError, KeyError, ValueError):
+            return None
+
+        # mtime doubles as the last-used time for disk eviction
+        os.utime(path)
+        return curve
+
+    def _store(self, key: str, curve: CachedCurve):
+        if self.directory is None:
+            return
+
+        # Write to a temp file first so a crash never leaves a torn entry
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(
+                f, x=curve.x, y=curve.y, z=curve.z, ok=curve.ok,
+                max_grade=curve.max_grade, length3d=curve.length3d,
+                length2d=curve.length2d, min_horiz_step=curve.min_horiz_step,
+                min_z=curve.min_z, notes=curve.notes
+            )
+        os.replace(tmp, self._path(key))
+
+        self._disk_count += 1
+        if self._disk_count > self.max_disk_entries:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """Drops the least recently used tenth of the disk entries."""
+        entries = [
+            entry for entry in os.scandir(self.directory) if entry.name.endswith(".npz")
+        ]
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        excess = len(entries) - self.max_disk_entries + self.max_disk_entries // 10
+
+        for entry in entries[:max(excess, 0)]:
+            os.remove(entry.path)
+        self._disk_count = len(entries) - max(excess, 0)
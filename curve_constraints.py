@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Vectorized rules a curve has to satisfy.
+
+A constraint looks at a block of candidate curves at once: (rows, points)
+x/z arrays and the matching (rows, points - 1) |dy| and horizontal step
+arrays. It returns a (rows, segments) mask of the segments that break it.
+evaluate_batch computes those arrays once per window and runs every
+constraint over them, so adding a rule never adds a pass over the curve.
+
+A point rule (chunk bounds, forbidden chunks) flags both segments touching
+a bad point. Every rule here only depends on x/z, or gets harder as
+|y_end - y0| grows, which keeps the y_end pruning in search_grid valid.
+"""
+
+import hashlib
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+CHUNK = 16
+
+# Largest bounding box (in chunks) ForbiddenChunks keeps as a bitmap
+_BITMAP_CELLS = 1 << 24
+
+class Constraint:
+    note = "Violated a constraint."
+
+    def violations(
+        self,
+        x: np.ndarray,
+        z: np.ndarray,
+        dy: np.ndarray,
+        horiz: np.ndarray
+    ) -> np.ndarray:
+        raise NotImplementedError
+
+    def describe(self) -> list:
+        """JSON-able identity, used to bind search manifests to a setup."""
+        raise NotImplementedError
+
+def _touching(bad_points: np.ndarray) -> np.ndarray:
+    """Segment mask from a point mask: a segment is bad if either end is."""
+    return bad_points[:, :-1] | bad_points[:, 1:]
+
+class MaxGrade(Constraint):
+    """|dy| <= limit * horizontal step on every segment (limit 1 is 45°)."""
+    note = "Exceeded 45° grade on at least one segment."
+
+    def __init__(self, limit: float = 1.0):
+        self.limit = float(limit)
+        if self.limit != 1.0:
+            self.note = f"Exceeded grade {self.limit:g} on at least one segment."
+
+    def violations(self, x, z, dy, horiz):
+        return dy > self.limit * horiz + 1e-9
+
+    def describe(self) -> list:
+        return ["max_grade", self.limit]
+
+class ChunkZBounds(Constraint):
+    """Every point stays within chunk Z min_chunk..max_chunk (inclusive)."""
+    note = "Left the allowed chunk-Z range."
+
+    def __init__(self, min_chunk: Optional[int] = None, max_chunk: Optional[int] = None):
+        self.min_chunk = min_chunk
+        self.max_chunk = max_chunk
+
+    def violations(self, x, z, dy, horiz):
+        # Same as the min_chunk_z reported for saved curves: z // 16 of the samples
+        chunk_z = np.floor_divide(z, CHUNK)
+        bad = np.zeros(z.shape, dtype=bool)
+        if self.min_chunk is not None:
+            bad |= chunk_z < self.min_chunk
+        if self.max_chunk is not None:
+            bad |= chunk_z > self.max_chunk
+        return _touching(bad)
+
+    def describe(self) -> list:
+        return ["chunk_z_bounds", self.min_chunk, self.max_chunk]
+
+class ForbiddenChunks(Constraint):
+    """
+    No point lands in one of the given (chunk_x, chunk_z) chunks. The
+    chunks go into a bitmap over their bounding box, or a sorted key array
+    when that box would be too big, so a lookup is a few array operations
+    whatever the number of chunks.
+    """
+    note = "Entered a forbidden chunk."
+
+    def __init__(self, chunks: Iterable[Tuple[int, int]]):
+        pairs = np.asarray(sorted(set(chunks)), dtype=np.int64).reshape(-1, 2)
+        self.chunks = pairs
+        self._keys = np.sort(self._key(pairs[:, 0], pairs[:, 1]))
+        # Flattened bitmap with one extra False cell that points outside map to
+        self._grid: Optional[np.ndarray] = None
+        self._origin = np.zeros(2, dtype=np.int64)
+        self._shape = (0, 0)
+
+        if len(pairs):
+            self._origin = pairs.min(axis=0)
+            w, h = pairs.max(axis=0) - self._origin + 1
+            if w * h <= _BITMAP_CELLS:
+                self._shape = (int(w), int(h))
+                self._grid = np.zeros(w * h + 1, dtype=bool)
+                self._grid[(pairs[:, 0] - self._origin[0]) * h + pairs[:, 1] - self._origin[1]] = True
+
+    @staticmethod
+    def _key(chunk_x: np.ndarray, chunk_z: np.ndarray) -> np.ndarray:
+        # Chunk coordinates are far below 2^31, so one int64 holds both
+        return (chunk_x << 32) + chunk_z
+
+    def hits(self, x: np.ndarray, z: np.ndarray) -> np.ndarray:
+        """Mask of the points whose rounded block is in a forbidden chunk."""
+        if not len(self.chunks):
+            return np.zeros(np.shape(x), dtype=bool)
+
+        # The rail lands on the rounded block, so that block's chunk counts
+        chunk_x = np.rint(x)
+        chunk_x //= CHUNK
+        chunk_z = np.rint(z)
+        chunk_z //= CHUNK
+
+        if self._grid is not None:
+            # Bitmap cell index, worked out in float to save int conversions
+            w, h = self._shape
+            chunk_x -= self._origin[0]
+            chunk_z -= self._origin[1]
+            cell = chunk_x * h + chunk_z
+            cell[(chunk_x < 0) | (chunk_x >= w) | (chunk_z < 0) | (chunk_z >= h)] = w * h
+            return self._grid[cell.astype(np.intp)]
+
+        keys = self._key(chunk_x.astype(np.int64), chunk_z.astype(np.int64))
+        at = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+        return self._keys[at] == keys
+
+    def violations(self, x, z, dy, horiz):
+        return _touching(self.hits(x, z))
+
+    def describe(self) -> list:
+        # A digest keeps manifests small however many chunks are claimed
+        digest = hashlib.sha256(self._keys.tobytes()).hexdigest()[:16]
+        return ["forbidden_chunks", len(self.chunks), digest]
+
+# What the search checks when no constraints are given
+DEFAULT_CONSTRAINTS: Tuple[Constraint, ...] = (MaxGrade(),)
+
+def grade_limit(constraints: Sequence[Constraint]) -> float:
+    """Tightest MaxGrade limit among `constraints` (inf without one)."""
+    return min((c.limit for c in constraints if isinstance(c, MaxGrade)), default=np.inf)
+
+def describe_all(constraints: Sequence[Constraint]) -> list:
+    return [c.describe() for c in constraints]
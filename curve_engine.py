@@ -0,0 +1,876 @@
+#!/usr/bin/env python3
+"""
+Array-backed curve engine behind coaster_search.py.
+
+Each curve is computed as whole NumPy arrays (x, y, z) instead of a list of
+tuples, and the 45° grade check and any other constraints (see
+curve_constraints.py) run over the segment arrays in one pass.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import AbstractSet, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from curve_constraints import DEFAULT_CONSTRAINTS, Constraint, MaxGrade, grade_limit
+
+Vec3 = Tuple[float, float, float]
+
+# Compact feasible-candidate record passed back from search workers:
+# (iy, il, ia, ib, max_grade, length3d, length2d, min_horiz_step, min_z)
+# where iy/il/ia/ib index into the y_end/loops/A/B value lists
+GridRow = Tuple[int, int, int, int, float, float, float, float, float]
+
+# Z bulge direction: +1 bulges south first (+Z), -1 bulges north first (-Z)
+SOUTH = 1.0
+NORTH = -1.0
+
+ZERO_STEP_NOTE = "Found zero horizontal step (vertical move)."
+STEEP_NOTE = "Exceeded 45° grade on at least one segment."
+OK_NOTE = "OK"
+
+# Default memory cap for one batch of candidates (see evaluate_grid)
+DEFAULT_BATCH_BYTES = 256 * 1024 * 1024
+
+# Samples per streaming window in evaluate_batch; rows that fail inside a
+# window are retired before the next window is computed
+DEFAULT_WINDOW = 128
+
+# Roughly how many float64 (candidates x window) arrays evaluate_batch
+# keeps alive at its peak; used to turn the memory cap into a row count
+_BATCH_ARRAYS = 16
+
+# Grade solvers understood by search_grid
+SAMPLED = "sampled"
+ANALYTIC = "analytic"
+
+# Coarse bracketing points per lateral circuit and golden-section steps
+# used by grade_factor; 60 steps shrink each bracket by ~1e-13
+_COARSE_PER_LOOP = 64
+_GOLDEN_STEPS = 60
+
+def sample_t(samples: int) -> np.ndarray:
+    """Sample positions t = i / (samples - 1), matching the scalar generator."""
+    return np.arange(samples) / (samples - 1)
+
+def smoothstep(t: np.ndarray) -> np.ndarray:
+    # C1 continuous, flat derivatives at endpoints
+    return t * t * (3 - 2 * t)
+
+def curve_arrays(
+    start: Vec3,
+    end_xz: Tuple[float, float],
+    y_end: float,
+    loops: int,
+    A: float,
+    B: float,
+    samples: int = 600,
+    bulge: float = SOUTH
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Array version of generate_curve_points.
+    Returns x, y, z arrays of length `samples`.
+    """
+    x0, y0, z0 = start
+    x1, z1 = end_xz
+
+    t = sample_t(samples)
+    s = smoothstep(t)
+    sin_pi = np.sin(np.pi * t)
+
+    x = x0 + (x1 - x0) * s
+    if loops > 0:
+        # sin^2(πt) gate keeps both value and derivative at 0 on the endpoints
+        x = x + B * (sin_pi ** 2) * np.sin(2 * np.pi * loops * t)
+
+    # bulge*A*sin(πt) gives dz/dt = bulge*Aπ at t=0 and -bulge*Aπ at t=1,
+    # so the curve leaves heading south (or north) and comes back the other way
+    z = z0 + (z1 - z0) * s + bulge * A * sin_pi
+    y = y0 + (y_end - y0) * s
+
+    return x, y, z
+
+def curve_batch(
+    start: Vec3,
+    end_xz: Tuple[float, float],
+    y_end: np.ndarray,
+    loops: np.ndarray,
+    A: np.ndarray,
+    B: np.ndarray,
+    samples: int,
+    bulge: float = SOUTH
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    curve_arrays for many candidates at once: (rows, samples) x, y, z
+    arrays, equal to curve_arrays row by row.
+    """
+    x0, y0, z0 = start
+    x1, z1 = end_xz
+
+    t = sample_t(samples)
+    s = smoothstep(t)
+    sin_pi = np.sin(np.pi * t)
+
+    loops = np.asarray(loops)[:, None]
+    x = x0 + (x1 - x0) * s + np.asarray(B, dtype=float)[:, None] * (sin_pi ** 2) * np.sin(2 * np.pi * loops * t)
+    z = z0 + (z1 - z0) * s + bulge * np.asarray(A, dtype=float)[:, None] * sin_pi
+    y = y0 + (np.asarray(y_end, dtype=float)[:, None] - y0) * s
+
+    return x, y, z
+
+def segment_arrays(
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-segment |dy|, horizontal distance and 3D length."""
+    dy = np.abs(np.diff(y))
+    horiz = np.hypot(np.diff(x), np.diff(z))
+    seg3 = np.hypot(horiz, dy)
+    return dy, horiz, seg3
+
+def first_violation(dy: np.ndarray, horiz: np.ndarray) -> int:
+    """
+    Index of the first segment that is vertical or steeper than 45°,
+    or -1 when every segment passes.
+    """
+    bad = (horiz == 0) | (dy > horiz + 1e-9)
+    if not bad.any():
+        return -1
+    return int(np.argmax(bad))
+
+def constraint_violations(
+    constraints: Sequence[Constraint],
+    x: np.ndarray,
+    z: np.ndarray,
+    dy: np.ndarray,
+    horiz: np.ndarray,
+    check_grade: bool = True
+) -> Tuple[np.ndarray, List[Optional[np.ndarray]]]:
+    """
+    Runs every constraint over (rows, points) x/z and (rows, segments)
+    dy/horiz arrays. Returns the mask of segments that are vertical or break
+    any constraint, and each constraint's own mask (None when skipped:
+    MaxGrade with check_grade=False).
+    """
+    bad = horiz == 0
+    masks: List[Optional[np.ndarray]] = []
+    for c in constraints:
+        if not check_grade and isinstance(c, MaxGrade):
+            masks.append(None)
+            continue
+        mask = c.violations(x, z, dy, horiz)
+        bad |= mask
+        masks.append(mask)
+    return bad, masks
+
+def analyze_segments(
+    dy: np.ndarray,
+    horiz: np.ndarray,
+    seg3: np.ndarray,
+    bad: Optional[np.ndarray] = None,
+    note: str = STEEP_NOTE
+) -> Tuple[bool, float, float, float, float, str, int]:
+    """
+    Reduces segment arrays the way analyze_curve walks them: stops at the
+    first failing segment and only counts the segments up to and including it.
+    Segments fail the 45° rule unless a `bad` mask is given; `note` is then
+    the note for a failure that is not a vertical move.
+    Returns:
+        ok, max_grade, length3d, length2d, min_horiz_step, notes, n_segments
+    where n_segments is how many segments were taken into account.
+    """
+    if len(horiz) == 0:
+        return (True, 0.0, 0.0, 0.0, float("inf"), OK_NOTE, 0)
+
+    if bad is None:
+        k = first_violation(dy, horiz)
+    else:
+        k = int(np.argmax(bad)) if bad.any() else -1
+    n = len(horiz) if k < 0 else k + 1
+
+    dy, horiz, seg3 = dy[:n], horiz[:n], seg3[:n]
+
+    # cumsum accumulates left to right like the scalar loop did
+    length2d = float(np.cumsum(horiz)[-1])
+    length3d = float(np.cumsum(seg3)[-1])
+    min_h = float(horiz.min())
+
+    if k >= 0 and horiz[k] == 0:
+        return (False, float("inf"), length3d, length2d, min_h, ZERO_STEP_NOTE, n)
+
+    max_grade = max(0.0, float((dy / horiz).max()))
+
+    if k >= 0:
+        return (False, max_grade, length3d, length2d, min_h, note, n)
+
+    return (True, max_grade, length3d, length2d, min_h, OK_NOTE, n)
+
+def analyze_arrays(
+    x: np.ndarray,
+    y: np.ndarray,
+    z: np.ndarray,
+    constraints: Sequence[Constraint] = DEFAULT_CONSTRAINTS
+) -> Tuple[bool, float, float, float, float, str, int]:
+    """
+    Array version of analyze_curve, checking `constraints` instead of just
+    the 45° rule.
+    Returns:
+        ok, max_grade, length3d, length2d, min_horiz_step, notes, n_segments
+    """
+    dy, horiz, seg3 = segment_arrays(x, y, z)
+    bad, masks = constraint_violations(
+        constraints, x[None], z[None], dy[None], horiz[None]
+    )
+    bad = bad[0]
+
+    note = STEEP_NOTE
+    if bad.any():
+        k = int(np.argmax(bad))
+        note = next((c.note for c, m in zip(constraints, masks) if m[0, k]), STEEP_NOTE)
+    return analyze_segments(dy, horiz, seg3, bad=bad, note=note)
+
+def as_points(x: np.ndarray, y: np.ndarray, z: np.ndarray):
+    """Converts coordinate arrays back to the list-of-tuples form."""
+    return list(zip(x.tolist(), y.tolist(), z.tolist()))
+
+def round_arrays(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> np.ndarray:
+    """Rounds to block coordinates; returns an (n, 3) int array."""
+    # np.rint rounds half to even, exactly like Python's round()
+    return np.rint(np.stack([x, y, z], axis=1)).astype(np.int64)
+
+def _grade_factor_at(
+    t: np.ndarray,
+    dx: float,
+    dz: float,
+    loops: np.ndarray,
+    A: np.ndarray,
+    B: np.ndarray,
+    bulge: float
+) -> np.ndarray:
+    """
+    ds/dt divided by |d(x, z)/dt| at t. Multiplying by |y_end - y0| gives
+    the exact grade |dy/dt| / |d(x,z)/dt| of the curve at t.
+    """
+    ds = 6 * t * (1 - t)
+
+    # d/dt [B sin^2(πt) sin(2π·loops·t)]
+    two_pi_l = 2 * np.pi * loops
+    wiggle = np.pi * np.sin(2 * np.pi * t) * np.sin(two_pi_l * t) \
+        + two_pi_l * np.sin(np.pi * t) ** 2 * np.cos(two_pi_l * t)
+
+    xp = dx * ds + B * wiggle
+    zp = dz * ds + bulge * A * np.pi * np.cos(np.pi * t)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        g = ds / np.hypot(xp, zp)
+    # A horizontal standstill is a vertical move: treat it as infinitely steep
+    return np.where(np.isnan(g), np.inf, g)
+
+def grade_factor(
+    start: Vec3,
+    end_xz: Tuple[float, float],
+    loops: np.ndarray,
+    A: np.ndarray,
+    B: np.ndarray,
+    bulge: float = SOUTH,
+    refine: int = 4
+) -> np.ndarray:
+    """
+    Per candidate, the maximum over t of ds/dt / |d(x,z)/dt|.
+
+    The curve's y only depends on y_end through the factor (y_end - y0), so
+    the true max grade of a candidate is |y_end - y0| * grade_factor and one
+    solve covers every y_end. The maximum is bracketed on a coarse grid
+    (_COARSE_PER_LOOP points per circuit) and the `refine` highest local
+    maxima are polished with a golden-section search, i.e. the root of the
+    derivative is located to ~1e-13 in t without sampling the curve.
+    """
+    x0, _, z0 = start
+    x1, z1 = end_xz
+    dx, dz = x1 - x0, z1 - z0
+
+    loops = np.asarray(loops, dtype=float)[:, None]
+    A = np.asarray(A, dtype=float)[:, None]
+    B = np.asarray(B, dtype=float)[:, None]
+    if not len(loops):
+        return np.zeros(0)
+
+    # Open interval: at A == 0 both derivatives vanish at the endpoints
+    m = _COARSE_PER_LOOP * (int(loops.max()) + 1) + 1
+    t = np.linspace(1e-9, 1 - 1e-9, m)
+    g = _grade_factor_at(t[None, :], dx, dz, loops, A, B, bulge)
+
+    # Local maxima of the coarse samples (ends count when they are highest)
+    padded = np.pad(g, ((0, 0), (1, 1)), constant_values=-np.inf)
+    peaks = (g >= padded[:, :-2]) & (g >= padded[:, 2:])
+    k = min(refine, m)
+    best = np.argpartition(np.where(peaks, g, -np.inf), m - k, axis=1)[:, m - k:]
+
+    a = t[np.maximum(best - 1, 0)]
+    b = t[np.minimum(best + 1, m - 1)]
+
+    inv_phi = (np.sqrt(5) - 1) / 2
+    c = b - inv_phi * (b - a)
+    d = a + inv_phi * (b - a)
+    gc = _grade_factor_at(c, dx, dz, loops, A, B, bulge)
+    gd = _grade_factor_at(d, dx, dz, loops, A, B, bulge)
+
+    for _ in range(_GOLDEN_STEPS):
+        left = gc >= gd
+        # Keep the bracket around the larger of the two interior values
+        b = np.where(left, d, b)
+        a = np.where(left, a, c)
+        new_c = b - inv_phi * (b - a)
+        new_d = a + inv_phi * (b - a)
+        c, d = np.where(left, new_c, d), np.where(left, c, new_d)
+        gc, gd = (
+            np.where(left, _grade_factor_at(c, dx, dz, loops, A, B, bulge), gd),
+            np.where(left, gc, _grade_factor_at(d, dx, dz, loops, A, B, bulge))
+        )
+
+    refined = np.maximum(gc, gd).max(axis=1)
+    return np.maximum(refined, g.max(axis=1))
+
+def analytic_max_grade(
+    start: Vec3,
+    end_xz: Tuple[float, float],
+    y_end: float,
+    loops: int,
+    A: float,
+    B: float,
+    bulge: float = SOUTH
+) -> float:
+    """Exact max grade of one curve, independent of any sample count."""
+    G = grade_factor(start, end_xz, [loops], [A], [B], bulge)[0]
+    return abs(y_end - start[1]) * float(G)
+
+@dataclass
+class BatchResult:
+    """Per-candidate reductions of one batch; every array has one entry per row."""
+    ok: np.ndarray
+    max_grade: np.ndarray
+    length3d: np.ndarray
+    length2d: np.ndarray
+    min_horiz_step: np.ndarray
+    min_z: np.ndarray         # lowest Z over the points that were examined
+    zero_step: np.ndarray     # failed on a vertical move rather than a constraint
+    failed_by: np.ndarray     # index of the constraint that failed, -1 if none did
+    constraints: Sequence[Constraint] = DEFAULT_CONSTRAINTS
+    segments_used: int = 0    # segments actually computed, summed over rows
+
+    def notes(self, row: int) -> str:
+        if self.ok[row]:
+            return OK_NOTE
+        if self.zero_step[row] or self.failed_by[row] < 0:
+            return ZERO_STEP_NOTE
+        return self.constraints[self.failed_by[row]].note
+
+@dataclass
+class SearchStats:
+    """How much of a grid search was evaluated, pruned or cut short."""
+    candidates: int = 0      # cells in the grid
+    evaluated: int = 0       # cells that were actually evaluated
+    feasible: int = 0        # evaluated cells that passed
+    pruned: int = 0          # cells skipped because a lower y_end already failed
+    solved: int = 0          # cells rejected by the analytic grade before sampling
+    reused: int = 0          # cells taken from a search manifest instead
+    merged: int = 0          # cells that draw the same curve as an evaluated one
+    segments_total: int = 0  # segments a full evaluation of the evaluated cells needs
+    segments_used: int = 0   # segments computed before the early exits kicked in
+
+    def merge(self, other: "SearchStats"):
+        self.candidates += other.candidates
+        self.evaluated += other.evaluated
+        self.feasible += other.feasible
+        self.pruned += other.pruned
+        self.solved += other.solved
+        self.reused += other.reused
+        self.merged += other.merged
+        self.segments_total += other.segments_total
+        self.segments_used += other.segments_used
+
+    def summary(self) -> str:
+        saved = 1 - self.segments_used / self.segments_total if self.segments_total else 0.0
+        reused = f"{self.reused} reused from the manifest, " if self.reused else ""
+        reused += f"{self.merged} equivalent to another cell, " if self.merged else ""
+        return (
+            f"Evaluated {self.evaluated}/{self.candidates} candidates "
+            f"({reused}{self.pruned} pruned by lower y_end failures, "
+            f"{self.solved} rejected by the analytic grade), "
+            f"{self.feasible} feasible; early exit skipped {saved:.0%} of segments"
+        )
+
+def evaluate_batch(
+    start: Vec3,
+    end_xz: Tuple[float, float],
+    y_end: np.ndarray,
+    loops: np.ndarray,
+    A: np.ndarray,
+    B: np.ndarray,
+    samples: int,
+    bulge: float = SOUTH,
+    window: int = DEFAULT_WINDOW,
+    check_grade: bool = True,
+    constraints: Sequence[Constraint] = DEFAULT_CONSTRAINTS
+) -> BatchResult:
+    """
+    Evaluates many candidates at once as (candidates x samples) arrays.
+
+    y_end, loops, A and B hold one value per candidate. The smoothstep and
+    gate terms only depend on t, so they are computed once and broadcast over
+    every row; the lateral wiggle is computed once per distinct loops value.
+
+    Samples are streamed in windows of `window` segments. Every constraint
+    runs over each window's arrays; a row that breaks one (or makes a
+    vertical move) is finalized and dropped, so no later samples are
+    computed for it. Each row is reduced exactly like analyze_segments
+    reduces a single curve. check_grade=False skips the MaxGrade
+    constraints, for when the grade was already solved exactly.
+    """
+    x0, y0, z0 = start
+    x1, z1 = end_xz
+    n_rows = len(y_end)
+
+    y_end = np.asarray(y_end, dtype=float)
+    A = np.asarray(A, dtype=float)
+    B = np.asarray(B, dtype=float)
+    loops = np.asarray(loops)
+
+    t = sample_t(samples)
+    s = smoothstep(t)
+    sin_pi = np.sin(np.pi * t)
+    gate = sin_pi ** 2
+    x_base = x0 + (x1 - x0) * s
+    z_base = z0 + (z1 - z0) * s
+
+    unique_loops, loop_row = np.unique(loops, return_inverse=True)
+    wiggle = np.sin(2 * np.pi * unique_loops[:, None] * t)
+
+    res = BatchResult(
+        ok=np.ones(n_rows, dtype=bool),
+        max_grade=np.zeros(n_rows),
+        length3d=np.zeros(n_rows),
+        length2d=np.zeros(n_rows),
+        min_horiz_step=np.full(n_rows, np.inf),
+        min_z=np.full(n_rows, np.inf),
+        zero_step=np.zeros(n_rows, dtype=bool),
+        failed_by=np.full(n_rows, -1),
+        constraints=constraints
+    )
+
+    # Running reductions for the rows that are still alive
+    active = np.arange(n_rows)
+    L2 = res.length2d.copy()
+    L3 = res.length3d.copy()
+    min_h = res.min_horiz_step.copy()
+    min_z = res.min_z.copy()
+    max_grade = res.max_grade.copy()
+
+    def upto(acc: np.ndarray, last: np.ndarray) -> np.ndarray:
+        return np.take_along_axis(acc, last[:, None], axis=1)[:, 0]
+
+    for lo in range(0, samples - 1, window):
+        hi = min(lo + window, samples - 1)
+        cols = slice(lo, hi + 1)
+        res.segments_used += len(active) * (hi - lo)
+
+        x = x_base[cols] + B[active, None] * gate[cols] * wiggle[:, cols][loop_row[active]]
+        z = z_base[cols] + (bulge * A[active, None]) * sin_pi[cols]
+        y = y0 + (y_end[active, None] - y0) * s[cols]
+
+        dy = np.abs(np.diff(y, axis=1))
+        horiz = np.hypot(np.diff(x, axis=1), np.diff(z, axis=1))
+        seg3 = np.hypot(horiz, dy)
+        bad, masks = constraint_violations(constraints, x, z, dy, horiz, check_grade)
+        del x, y
+        failed = bad.any(axis=1)
+        # Last segment that counts: the first failing one, or the window's end
+        last = np.where(failed, np.argmax(bad, axis=1), hi - lo - 1)
+
+        # Prepending the carried totals keeps cumsum strictly left to right
+        L2 = upto(np.cumsum(np.concatenate([L2[:, None], horiz], axis=1), axis=1), last + 1)
+        L3 = upto(np.cumsum(np.concatenate([L3[:, None], seg3], axis=1), axis=1), last + 1)
+        min_h = np.minimum(min_h, upto(np.minimum.accumulate(horiz, axis=1), last))
+        min_z = np.minimum(min_z, upto(np.minimum.accumulate(z, axis=1), last + 1))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            grade = dy / horiz
+        # Anything after `last` is never looked at, so NaN/inf there is harmless
+        max_grade = np.maximum(max_grade, upto(np.maximum.accumulate(grade, axis=1), last))
+
+        zero = failed & (upto(horiz, last) == 0)
+        max_grade[zero] = np.inf
+
+        if failed.any():
+            gone = active[failed]
+            res.ok[gone] = False
+            res.zero_step[gone] = zero[failed]
+            # Report the first constraint broken on the failing segment
+            rows, at = np.flatnonzero(failed), last[failed]
+            for k in reversed(range(len(masks))):
+                if masks[k] is not None:
+                    res.failed_by[gone[masks[k][rows, at]]] = k
+            res.max_grade[gone] = max_grade[failed]
+            res.length3d[gone] = L3[failed]
+            res.length2d[gone] = L2[failed]
+            res.min_horiz_step[gone] = min_h[failed]
+            res.min_z[gone] = min_z[failed]
+
+            keep = ~failed
+            active = active[keep]
+            L2, L3, min_h, min_z, max_grade = (
+                L2[keep], L3[keep], min_h[keep], min_z[keep], max_grade[keep]
+            )
+            if not len(active):
+                break
+
+    res.max_grade[active] = max_grade
+    res.length3d[active] = L3
+    res.length2d[active] = L2
+    res.min_horiz_step[active] = min_h
+    res.min_z[active] = min_z
+
+    return res
+
+def evaluate_candidates(
+    start: Vec3,
+    end_xz: Tuple[float, float],
+    y_end: np.ndarray,
+    loops: np.ndarray,
+    A: np.ndarray,
+    B: np.ndarray,
+    samples: int,
+    bulge: float = SOUTH,
+    grade_solver: str = SAMPLED,
+    constraints: Sequence[Constraint] = DEFAULT_CONSTRAINTS
+) -> BatchResult:
+    """
+    evaluate_batch for an arbitrary list of candidates with a choice of
+    grade solver. With ANALYTIC, rows that fail the exact grade are not
+    sampled at all: they come back with ok=False, their exact max_grade and
+    zero lengths.
+    """
+    if grade_solver == SAMPLED:
+        return evaluate_batch(
+            start, end_xz, y_end, loops, A, B, samples, bulge, constraints=constraints
+        )
+    if grade_solver != ANALYTIC:
+        raise ValueError(f"Unknown grade solver: {grade_solver}")
+
+    y_end = np.asarray(y_end, dtype=float)
+    loops = np.asarray(loops)
+    A = np.asarray(A, dtype=float)
+    B = np.asarray(B, dtype=float)
+    n_rows = len(y_end)
+
+    exact_grade = np.abs(y_end - start[1]) * grade_factor(start, end_xz, loops, A, B, bulge)
+    limit = grade_limit(constraints)
+    passed = np.flatnonzero(exact_grade <= limit + 1e-9)
+
+    res = BatchResult(
+        ok=np.zeros(n_rows, dtype=bool),
+        max_grade=exact_grade,
+        length3d=np.zeros(n_rows),
+        length2d=np.zeros(n_rows),
+        min_horiz_step=np.zeros(n_rows),
+        min_z=np.zeros(n_rows),
+        zero_step=np.zeros(n_rows, dtype=bool),
+        failed_by=np.full(n_rows, -1),
+        constraints=constraints
+    )
+    # Rows that fail the exact grade fail the tightest MaxGrade
+    tightest = [
+        k for k, c in enumerate(constraints) if isinstance(c, MaxGrade) and c.limit == limit
+    ]
+    if tightest:
+        res.failed_by[:] = tightest[0]
+
+    sampled = evaluate_batch(
+        start, end_xz, y_end[passed], loops[passed], A[passed], B[passed],
+        samples, bulge, check_grade=False, constraints=constraints
+    )
+    res.ok[passed] = sampled.ok
+    res.zero_step[passed] = sampled.zero_step
+    res.failed_by[passed] = sampled.failed_by
+    res.max_grade[passed[sampled.zero_step]] = np.inf
+    res.length3d[passed] = sampled.length3d
+    res.length2d[passed] = sampled.length2d
+    res.min_horiz_step[passed] = sampled.min_horiz_step
+    res.min_z[passed] = sampled.min_z
+    res.segments_used = sampled.segments_used
+
+    return res
+
+def batch_rows(
+    samples: int,
+    max_bytes: int = DEFAULT_BATCH_BYTES,
+    window: int = DEFAULT_WINDOW
+) -> int:
+    """How many candidates fit in one batch under the memory cap."""
+    return max(1, max_bytes // (_BATCH_ARRAYS * 8 * (min(window, samples) + 1)))
+
+def evaluate_grid(
+    start: Vec3,
+    end_xz: Tuple[float, float],
+    y_ends: Sequence[float],
+    loops_values: Sequence[int],
+    A_values: Sequence[float],
+    B_values: Sequence[float],
+    samples: int,
+    bulge: float = SOUTH,
+    max_bytes: int = DEFAULT_BATCH_BYTES
+) -> Iterator[Tuple[np.ndarray, BatchResult]]:
+    """
+    Evaluates the full (y_end, loops, A, B) grid in batches that stay under
+    `max_bytes`, in the same order as the nested loops used to run.
+
+    Yields (index, result) per batch, where index is an (m, 4) array of
+    positions into y_ends, loops_values, A_values and B_values.
+    """
+    shape = (len(y_ends), len(loops_values), len(A_values), len(B_values))
+    total = int(np.prod(shape))
+    rows = batch_rows(samples, max_bytes)
+
+    y_arr = np.asarray(y_ends, dtype=float)
+    loops_arr = np.asarray(loops_values)
+    A_arr = np.asarray(A_values, dtype=float)
+    B_arr = np.asarray(B_values, dtype=float)
+
+    # Index arrays are built per batch so a huge grid never exists in full
+    for lo in range(0, total, rows):
+        iy, il, ia, ib = np.unravel_index(np.arange(lo, min(lo + rows, total)), shape)
+        result = evaluate_batch(
+            start, end_xz, y_arr[iy], loops_arr[il], A_arr[ia], B_arr[ib], samples, bulge
+        )
+        yield np.stack([iy, il, ia, ib], axis=1), result
+
+def equivalent_shapes(
+    loops_values: Sequence[int],
+    B_values: Sequence[float]
+) -> Dict[Tuple[int, int], Tuple[int, int]]:
+    """
+    The wiggle B * sin(2*pi*loops*t) vanishes when loops=0 or B=0, so every
+    such (loops, B) pair draws the same curve for a given y_end and A.
+    Maps the (il, ib) indices of each of those pairs to the first one in
+    grid order, which is the only one that needs evaluating.
+    """
+    flat = [
+        (il, ib)
+        for il, loops in enumerate(loops_values)
+        for ib, B in enumerate(B_values)
+        if loops == 0 or B == 0
+    ]
+    return {pair: flat[0] for pair in flat[1:]}
+
+def _search_block(
+    start: Vec3,
+    end_xz: Tuple[float, float],
+    y_ends: Sequence[float],
+    loops_values: Sequence[int],
+    A_values: Sequence[float],
+    B_values: Sequence[float],
+    samples: int,
+    bulge: float,
+    max_bytes: int,
+    prune: bool,
+    grade_solver: str = SAMPLED,
+    offset: Tuple[int, int] = (0, 0),
+    skip_shapes: AbstractSet[Tuple[int, int]] = frozenset(),
+    constraints: Sequence[Constraint] = DEFAULT_CONSTRAINTS,
+    ranking=None
+) -> Tuple[List[GridRow], SearchStats]:
+    """
+    Evaluates a (y_end, loops, A, B) block and keeps only the feasible rows.
+
+    dy scales with |y_end - y0| while the horizontal steps do not depend on
+    y_end, so once a (loops, A, B) combination fails at some y_end it fails
+    at every y_end that is further from the start height. y_ends are visited
+    in that order and, with prune=True, failed combinations are skipped.
+
+    With grade_solver=ANALYTIC the grade is decided up front from
+    grade_factor (one solve per (loops, A, B) for all y_end), only passing
+    candidates are sampled, and their max_grade is the exact one. The other
+    constraints are checked on the samples either way.
+
+    (il, ib) pairs in skip_shapes (grid indices, offset included) are never
+    evaluated; see equivalent_shapes.
+
+    With a ranking (curve_ranking.Ranking) feasible rows are offered to it
+    batch by batch instead of being returned.
+    """
+    ol, oa = offset
+    y0 = start[1]
+    stats = SearchStats()
+    rows: List[GridRow] = []
+
+    inner_shape = (len(loops_values), len(A_values), len(B_values))
+    il, ia, ib = np.unravel_index(np.arange(int(np.prod(inner_shape))), inner_shape)
+    loops_arr = np.asarray(loops_values)[il]
+    A_arr = np.asarray(A_values, dtype=float)[ia]
+    B_arr = np.asarray(B_values, dtype=float)[ib]
+    dead = np.zeros(len(il), dtype=bool)
+    skipped = np.array([(int(l) + ol, int(b)) in skip_shapes for l, b in zip(il, ib)], dtype=bool)
+    per_batch = batch_rows(samples, max_bytes)
+
+    stats.candidates = len(y_ends) * len(il)
+    stats.merged = len(y_ends) * int(skipped.sum())
+
+    analytic = grade_solver == ANALYTIC
+    limit = grade_limit(constraints)
+    if analytic:
+        per_solve = batch_rows(samples, max_bytes, window=samples)
+        G = np.concatenate([np.zeros(0)] + [
+            grade_factor(
+                start, end_xz, loops_arr[lo:lo + per_solve],
+                A_arr[lo:lo + per_solve], B_arr[lo:lo + per_solve], bulge
+            )
+            for lo in range(0, len(il), per_solve)
+        ])
+    elif grade_solver != SAMPLED:
+        raise ValueError(f"Unknown grade solver: {grade_solver}")
+
+    for iy in sorted(range(len(y_ends)), key=lambda i: abs(y_ends[i] - y0)):
+        live = np.flatnonzero(~skipped & ~dead) if prune else np.flatnonzero(~skipped)
+        stats.pruned += int((~skipped).sum()) - len(live)
+
+        if analytic:
+            exact_grade = abs(y_ends[iy] - y0) * G
+            # Same tolerance as the sampled dy > limit * horiz + 1e-9 check
+            passed = exact_grade[live] <= limit + 1e-9
+            dead[live[~passed]] = True
+            stats.solved += int((~passed).sum())
+            live = live[passed]
+
+        for lo in range(0, len(live), per_batch):
+            sel = live[lo:lo + per_batch]
+            res = evaluate_batch(
+                start, end_xz, np.full(len(sel), float(y_ends[iy])),
+                loops_arr[sel], A_arr[sel], B_arr[sel], samples, bulge,
+                check_grade=not analytic, constraints=constraints
+            )
+            dead[sel[~res.ok]] = True
+            if analytic:
+                res.max_grade = exact_grade[sel]
+
+            stats.evaluated += len(sel)
+            stats.segments_total += len(sel) * (samples - 1)
+            stats.segments_used += res.segments_used
+
+            ok = np.flatnonzero(res.ok)
+            feasible = [
+                (
+                    iy, int(il[c]) + ol, int(ia[c]) + oa, int(ib[c]),
+                    float(res.max_grade[row]),
+                    float(res.length3d[row]),
+                    float(res.length2d[row]),
+                    float(res.min_horiz_step[row]),
+                    float(res.min_z[row])
+                )
+                for row, c in zip(ok, sel[ok])
+            ]
+            stats.feasible += len(feasible)
+
+            if ranking is None:
+                rows.extend(feasible)
+            else:
+                c = sel[ok]
+                ranking.add(
+                    feasible, start, end_xz, bulge, np.full(len(c), float(y_ends[iy])),
+                    loops_arr[c], A_arr[c], B_arr[c]
+                )
+
+    return rows, stats
+
+def _search_task(args):
+    """
+    Worker entry point: one (loops, A) slice of the grid, all y_end and B.
+    Returns (rows, stats, ranking); ranking is the task's own copy, if any.
+    """
+    (start, end_xz, y_ends, il, loops, ia, A, B_values,
+     samples, bulge, max_bytes, prune, grade_solver, skip_shapes, constraints, ranking) = args
+    rows, stats = _search_block(
+        start, end_xz, y_ends, [loops], [A], B_values,
+        samples, bulge, max_bytes, prune, grade_solver, offset=(il, ia),
+        skip_shapes=skip_shapes, constraints=constraints, ranking=ranking
+    )
+    return rows, stats, ranking
+
+def search_grid(
+    start: Vec3,
+    end_xz: Tuple[float, float],
+    y_ends: Sequence[float],
+    loops_values: Sequence[int],
+    A_values: Sequence[float],
+    B_values: Sequence[float],
+    samples: int,
+    bulge: float = SOUTH,
+    max_bytes: int = DEFAULT_BATCH_BYTES,
+    workers: int = 1,
+    prune: bool = True,
+    stats: Optional[SearchStats] = None,
+    grade_solver: str = SAMPLED,
+    skip_shapes: AbstractSet[Tuple[int, int]] = frozenset(),
+    constraints: Sequence[Constraint] = DEFAULT_CONSTRAINTS,
+    ranking=None
+) -> List[GridRow]:
+    """
+    Returns a GridRow for every candidate that satisfies `constraints`
+    (the 45° rule by default), in grid order.
+
+    With a ranking (curve_ranking.Ranking) the feasible rows are streamed
+    into it as they are found and only the rows it keeps are returned, best
+    first; nothing else is held in memory.
+
+    With workers > 1 the grid is split into one task per (loops, A) pair and
+    run on a process pool; each task sweeps all y_end values itself so the
+    y_end pruning still applies, and every worker gets its own max_bytes cap.
+    Rows are put back in grid order, so the list is identical to the serial
+    one. Pass a SearchStats to collect evaluated/pruned counts.
+
+    grade_solver picks how the 45° rule is checked: SAMPLED uses the
+    finite differences between samples, ANALYTIC the exact maximum from
+    grade_factor (see _search_block).
+
+    Cells whose (loops, B) index pair is in skip_shapes are not evaluated;
+    pass the keys of equivalent_shapes() to evaluate each distinct curve once.
+    """
+    y_ends = list(y_ends)
+    B_values = list(B_values)
+
+    rows: List[GridRow] = []
+
+    def collect(block_rows: List[GridRow], block_stats: SearchStats, block_ranking):
+        rows.extend(block_rows)
+        if stats is not None:
+            stats.merge(block_stats)
+        if block_ranking is not None and block_ranking is not ranking:
+            ranking.merge(block_ranking)
+
+    if workers <= 1:
+        collect(*_search_block(
+            start, end_xz, y_ends, loops_values, A_values, B_values,
+            samples, bulge, max_bytes, prune, grade_solver, skip_shapes=skip_shapes,
+            constraints=constraints, ranking=ranking
+        ), ranking)
+    else:
+        tasks = [
+            (start, end_xz, y_ends, il, loops, ia, A, B_values,
+             samples, bulge, max_bytes, prune, grade_solver,
+             frozenset(pair for pair in skip_shapes if pair[0] == il), tuple(constraints),
+             ranking.spawn() if ranking is not None else None)
+            for il, loops in enumerate(loops_values)
+            for ia, A in enumerate(A_values)
+        ]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunksize = max(1, len(tasks) // (workers * 4))
+            for result in pool.map(_search_task, tasks, chunksize=chunksize):
+                collect(*result)
+
+    if ranking is not None:
+        return ranking.rows()
+
+    # Grid indices lead each tuple and are unique, so this restores grid order
+    rows.sort()
+    return rows
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Reading and writing curve .txt files.
+
+A curve file is a block of `#` header lines, a blank line, then one
+`[x, y, z]` line per rounded point. read_curve_file loads one with a single
+read and a single regex pass. format_txt builds the whole file in one
+pass, write_atomic writes it through a temp file and a rename so a crash
+never leaves a half-written curve, and CurveWriter does the writing on a
+background thread pool so disk I/O overlaps with computing the next curves.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+
+# Written next to the curve files: {"aliases": {skipped name: name holding the curve}}
+ALIAS_FILE = "aliases.json"
+
+# A line starting with [x, y, z], as the checker scripts have always matched it
+COORD_LINE = re.compile(rb"^[^\S\n]*\[(-?\d+,[^\S\n]*-?\d+,[^\S\n]*-?\d+)\]", re.M)
+# `# key: value` header lines, same pattern as load-curve.php
+META_LINE = re.compile(rb"^[^\S\n]*#[^\S\n]*(\w+):[^\S\n]*(.*\S)", re.M)
+
+@dataclass
+class CurveFile:
+    coords: np.ndarray        # (n, 3) int64, in file order
+    metadata: Dict[str, str]  # parsed `# key: value` header lines
+    digest: str               # coord_digest(coords)
+
+def coord_digest(coords: np.ndarray) -> str:
+    """blake2b of the points packed as little-endian int32, row by row."""
+    packed = np.ascontiguousarray(coords, dtype="<i4").tobytes()
+    return hashlib.blake2b(packed, digest_size=16).hexdigest()
+
+def read_curve_file(path) -> CurveFile:
+    """
+    Reads a curve file in one call and parses every [x, y, z] line in one
+    regex pass. Lines that are not coordinates are skipped, so an empty
+    coords array means the file had none.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    first = COORD_LINE.search(data)
+    body_start = first.start() if first else len(data)
+
+    rows = COORD_LINE.findall(data, body_start)
+    if rows:
+        coords = np.array(b",".join(rows).split(b","), dtype=np.int64).reshape(-1, 3)
+    else:
+        coords = np.zeros((0, 3), dtype=np.int64)
+
+    # Only the lines above the first coordinate are searched for metadata
+    metadata = {
+        key.decode(): value.decode()
+        for key, value in META_LINE.findall(data, 0, body_start)
+    }
+    return CurveFile(coords=coords, metadata=metadata, digest=coord_digest(coords))
+
+def map_curve_files(fn: Callable[..., T], paths: Sequence, jobs: int = 1) -> Iterator[T]:
+    """
+    Yields fn(path) for every path, in the order of `paths`. With jobs > 1
+    the calls run on that many processes (fn must be a module-level
+    function); results still come back in order, so callers behave exactly
+    as with jobs=1.
+    """
+    if jobs <= 1:
+        yield from map(fn, paths)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        chunksize = max(1, min(64, len(paths) // (jobs * 4)))
+        yield from pool.map(fn, paths, chunksize=chunksize)
+
+def format_txt(header: str, points: np.ndarray) -> str:
+    """The .txt layout: header, then one [x, y, z] line per point."""
+    points = np.asarray(points)
+    return header + ("[%d, %d, %d]\n" * len(points)) % tuple(points.ravel().tolist())
+
+def write_atomic(path: str, text: str):
+    """Writes `text` to a temp file next to `path`, then renames it into place."""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+class CurveWriter:
+    """
+    Writes curve files on a thread pool. At most `max_pending` files wait in
+    memory; write() blocks beyond that. close() (or leaving the with block)
+    waits for everything and re-raises the first write error.
+    """
+
+    def __init__(self, threads: int = 4, max_pending: int = 64):
+        self._pool = ThreadPoolExecutor(max_workers=threads)
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._futures: List[Future] = []
+
+    def __enter__(self) -> "CurveWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, path: str, text: str):
+        self._slots.acquire()
+        future = self._pool.submit(write_atomic, path, text)
+        future.add_done_callback(lambda _: self._slots.release())
+        self._futures.append(future)
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+class CurveDeduper:
+    """
+    Remembers the digest of every curve saved in a run, and of the curves
+    earlier runs saved (see seed). A curve whose rounded points match an
+    earlier one is recorded as an alias of that file instead of being
+    written again. Aliases already in `alias_path` are kept, except for
+    names that get written for real.
+    """
+
+    def __init__(self, alias_path: Optional[str] = None):
+        self.alias_path = alias_path
+        self.aliases: Dict[str, str] = {}
+        self.recorded = 0  # aliases added in this run
+        self._seen: Dict[str, str] = {}
+
+        if alias_path is not None:
+            try:
+                with open(alias_path) as f:
+                    self.aliases = json.load(f)["aliases"]
+            except (OSError, KeyError, ValueError):
+                pass
+
+    def original(self, name: str, coords: np.ndarray) -> Optional[str]:
+        """
+        Name of an earlier curve with exactly these points (and records
+        `name` as its alias), or None if the points are new.
+        """
+        first = self._seen.setdefault(coord_digest(coords), name)
+        if first == name:
+            self.aliases.pop(name, None)
+            return None
+
+        self.alias(name, first)
+        return first
+
+    def seed(self, digests: Dict[str, Optional[str]]):
+        """
+        Registers curves that are already saved, as {name: coord_digest}
+        (None for a file without points), so a curve matching one of them
+        becomes its alias.
+        """
+        for name in sorted(digests):
+            if digests[name] is not None:
+                self._seen.setdefault(digests[name], name)
+
+    def alias(self, name: str, original: str):
+        self.aliases[name] = original
+        self.recorded += 1
+
+    def save(self):
+        if self.alias_path is not None:
+            write_atomic(self.alias_path, json.dumps({"aliases": self.aliases}, indent=1, sort_keys=True))
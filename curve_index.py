@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Persistent digest index of curve files.
+
+The index is one JSON file with an entry per curve file, keyed by its path
+relative to the index file's directory:
+  {"files": {"curves/curve_y222_loops1_A140_B20.txt":
+             {"size": 10911, "mtime_ns": ..., "digest": "...", "points": 351}}}
+
+refresh() stats every file it is given and only parses the ones whose size
+or mtime changed since they were indexed, so checking a few thousand files
+for duplicates is a directory listing plus a dictionary lookup. A file with
+no coordinates is indexed with a null digest. wwwroot/api/list-curves.php
+reads the same file.
+"""
+
+import json
+import os
+from typing import Dict, Optional, Sequence, Tuple
+
+from curve_files import map_curve_files, read_curve_file, write_atomic
+
+INDEX_FILE = "curve_index.json"
+
+def _index_entry(path) -> Tuple[Optional[str], int]:
+    """(digest, point count) of one file; digest is None without coordinates."""
+    curve = read_curve_file(path)
+    if not len(curve.coords):
+        return None, 0
+    return curve.digest, len(curve.coords)
+
+class DigestIndex:
+    def __init__(self, path: str = INDEX_FILE):
+        self.path = path
+        self.root = os.path.dirname(os.path.abspath(path))
+        self.files: Dict[str, dict] = {}
+        self.parsed = 0  # files (re)parsed by the last refresh
+        self._dirty = False
+
+        try:
+            with open(path) as f:
+                self.files = json.load(f)["files"]
+        except (OSError, KeyError, ValueError):
+            pass
+
+    def key(self, path) -> str:
+        """A file's entry key: its path from the index file's directory."""
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def refresh(self, paths: Sequence, jobs: int = 1) -> Dict[str, Optional[str]]:
+        """
+        Brings the entries for `paths` up to date and returns {key: digest}
+        for them. Entries of files that no longer exist are dropped.
+        """
+        stale = []
+        for path in paths:
+            st = os.stat(path)
+            entry = self.files.get(self.key(path))
+            if entry is None or entry["size"] != st.st_size or entry["mtime_ns"] != st.st_mtime_ns:
+                stale.append((path, st))
+
+        results = map_curve_files(_index_entry, [path for path, _ in stale], jobs)
+        for (path, st), (digest, points) in zip(stale, results):
+            self.files[self.key(path)] = {
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "digest": digest,
+                "points": points,
+            }
+        self.parsed = len(stale)
+        self._dirty |= bool(stale)
+
+        gone = [key for key in self.files if not os.path.exists(self._file(key))]
+        for key in gone:
+            del self.files[key]
+        self._dirty |= bool(gone)
+
+        return {self.key(path): self.files[self.key(path)]["digest"] for path in paths}
+
+    def forget(self, path):
+        """Drops a file's entry (after moving or deleting it)."""
+        if self.files.pop(self.key(path), None) is not None:
+            self._dirty = True
+
+    def save(self):
+        if self._dirty:
+            write_atomic(self.path, json.dumps({"files": self.files}, indent=1, sort_keys=True))
+            self._dirty = False
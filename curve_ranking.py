@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Streaming selection of the best search results.
+
+A Ranking is handed to search_grid / search_incremental and receives the
+feasible rows batch by batch, so memory grows with what it keeps instead of
+with the grid. It keeps either the K best rows by a list of objectives
+(compared in order, like a sort key) on a heap, or the Pareto front of
+those objectives.
+
+Objectives, all minimized unless prefixed with "-":
+  max_grade  steepest grade of the curve
+  length     3D length
+  lateral    total lateral deviation: the area (blocks^2) between the
+             path and the straight start-end chord, seen from above
+  chunks     number of distinct chunks the rounded path touches
+  rails      number of rail blocks the rounded path needs (see rail_path)
+  powered    how many of those have to be powered rails
+The last four are measured on the curve as it would be saved (`samples`
+points), computed for a whole batch of rows at once.
+"""
+
+import heapq
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from curve_engine import GridRow, Vec3, curve_batch
+from rail_path import rail_counts
+
+MAX_GRADE = "max_grade"
+LENGTH = "length"
+LATERAL = "lateral"
+CHUNKS = "chunks"
+RAILS = "rails"
+POWERED = "powered"
+OBJECTIVES = (MAX_GRADE, LENGTH, LATERAL, CHUNKS, RAILS, POWERED)
+
+# The order search() has always sorted by
+DEFAULT_OBJECTIVES = (MAX_GRADE, LENGTH)
+
+# Objectives that need the curve points, not just the search metrics
+_CURVE_OBJECTIVES = {LATERAL, CHUNKS, RAILS, POWERED}
+
+def parse_objectives(spec: str) -> Tuple[str, ...]:
+    """"max_grade,-length" -> ("max_grade", "-length"), checking the names."""
+    names = tuple(name.strip() for name in spec.split(",") if name.strip())
+    for name in names:
+        if name.lstrip("-") not in OBJECTIVES:
+            raise ValueError(f"Unknown objective: {name} (choose from {', '.join(OBJECTIVES)})")
+    return names
+
+def curve_objectives(
+    start: Vec3,
+    end_xz: Tuple[float, float],
+    y_end: np.ndarray,
+    loops: np.ndarray,
+    A: np.ndarray,
+    B: np.ndarray,
+    samples: int,
+    bulge: float,
+    names: Sequence[str]
+) -> Dict[str, np.ndarray]:
+    """LATERAL / CHUNKS / RAILS / POWERED (those in `names`) for every row."""
+    out: Dict[str, np.ndarray] = {}
+    if not len(y_end):
+        return {name: np.zeros(0) for name in names}
+
+    x, y, z = curve_batch(start, end_xz, y_end, loops, A, B, samples, bulge)
+
+    if LATERAL in names:
+        x0, _, z0 = start
+        x1, z1 = end_xz
+        chord = np.hypot(x1 - x0, z1 - z0)
+        # Perpendicular distance to the chord, integrated along the path
+        off = np.abs((x - x0) * (z1 - z0) - (z - z0) * (x1 - x0)) / chord
+        horiz = np.hypot(np.diff(x, axis=1), np.diff(z, axis=1))
+        out[LATERAL] = ((off[:, :-1] + off[:, 1:]) / 2 * horiz).sum(axis=1)
+
+    if CHUNKS in names:
+        bx, bz = np.rint(x), np.rint(z)
+        keys = np.sort(((bx // 16).astype(np.int64) << 32) + (bz // 16).astype(np.int64), axis=1)
+        out[CHUNKS] = 1 + (np.diff(keys, axis=1) != 0).sum(axis=1)
+
+    if RAILS in names or POWERED in names:
+        rails, powered, _ = rail_counts(x, y, z)
+        if RAILS in names:
+            out[RAILS] = rails
+        if POWERED in names:
+            out[POWERED] = powered
+
+    return out
+
+class Ranking:
+    def __init__(
+        self,
+        objectives: Sequence[str] = DEFAULT_OBJECTIVES,
+        k: Optional[int] = None,
+        pareto: bool = False,
+        samples: int = 350
+    ):
+        self.objectives = tuple(objectives)
+        self.k = k
+        self.pareto = pareto
+        self.samples = samples
+        self.seen = 0  # rows offered so far
+
+        self._names = [name.lstrip("-") for name in self.objectives]
+        self._signs = np.array([-1.0 if name.startswith("-") else 1.0 for name in self.objectives])
+        # Top-K: heap of (negated key, row) so the worst kept row is on top.
+        # Without k it is a plain list of (key, row).
+        self._heap: List[tuple] = []
+        # Pareto: front rows and their (signed) objective values
+        self._front: List[GridRow] = []
+        self._front_values = np.zeros((0, len(self.objectives)))
+
+    def spawn(self) -> "Ranking":
+        """An empty Ranking with the same settings (for worker processes)."""
+        return Ranking(self.objectives, self.k, self.pareto, self.samples)
+
+    def add(
+        self,
+        rows: Sequence[GridRow],
+        start: Vec3,
+        end_xz: Tuple[float, float],
+        bulge: float,
+        y_end: np.ndarray,
+        loops: np.ndarray,
+        A: np.ndarray,
+        B: np.ndarray
+    ):
+        """Offers a batch of feasible rows; y_end..B are their parameter values."""
+        if not len(rows):
+            return
+        self.seen += len(rows)
+
+        values = self._values(rows, start, end_xz, bulge, y_end, loops, A, B)
+        if self.pareto:
+            self._add_front(rows, values)
+        else:
+            self._add_top(rows, values)
+
+    def merge(self, other: "Ranking"):
+        """Folds in what another Ranking (e.g. from a worker) kept."""
+        self.seen += other.seen
+        if self.pareto:
+            self._add_front(other._front, other._front_values)
+            return
+        for entry in other._heap:
+            key, row = (tuple(-v for v in entry[0]), entry[1]) if self.k is not None else entry
+            self._push(key, row)
+
+    def results(self) -> List[Tuple[GridRow, Dict[str, float]]]:
+        """(row, objective values) of every kept row, best first."""
+        if self.pareto:
+            keyed = [
+                (tuple(values) + tuple(row[:4]), row, values)
+                for row, values in zip(self._front, self._front_values.tolist())
+            ]
+        else:
+            keyed = [
+                (tuple(-v for v in entry[0]) if self.k is not None else entry[0], entry[1])
+                for entry in self._heap
+            ]
+            keyed = [(key, row, key[:len(self.objectives)]) for key, row in keyed]
+
+        keyed.sort(key=lambda entry: entry[0])
+        return [
+            (row, {name: float(v * sign) for name, v, sign in zip(self._names, values, self._signs)})
+            for _, row, values in keyed
+        ]
+
+    def rows(self) -> List[GridRow]:
+        return [row for row, _ in self.results()]
+
+    def _values(self, rows, start, end_xz, bulge, y_end, loops, A, B) -> np.ndarray:
+        """(rows, objectives) array, sign-adjusted so that lower is better."""
+        columns: Dict[str, np.ndarray] = {
+            MAX_GRADE: np.array([row[4] for row in rows]),
+            LENGTH: np.array([row[5] for row in rows]),
+        }
+        needed = [name for name in self._names if name in _CURVE_OBJECTIVES]
+        if needed:
+            columns.update(curve_objectives(
+                start, end_xz, np.asarray(y_end, dtype=float), np.asarray(loops),
+                np.asarray(A, dtype=float), np.asarray(B, dtype=float),
+                self.samples, bulge, needed
+            ))
+        return np.stack([columns[name] for name in self._names], axis=1).astype(float) * self._signs
+
+    def _push(self, key: tuple, row: GridRow):
+        if self.k is None:
+            self._heap.append((key, row))
+            return
+
+        entry = (tuple(-v for v in key), row)
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def _add_top(self, rows: Sequence[GridRow], values: np.ndarray):
+        # Grid indices break ties, so the result matches a stable sort in grid order
+        for row, v in zip(rows, values.tolist()):
+            self._push(tuple(v) + tuple(row[:4]), row)
+
+    def _add_front(self, rows: Sequence[GridRow], values: np.ndarray):
+        """Merges rows into the front; a row equal to a kept one is dropped."""
+        rows = list(self._front) + list(rows)
+        values = np.concatenate([self._front_values, values])
+
+        # In lexicographic order no row can dominate one that comes before it
+        order = np.lexsort(
+            [np.array([row[k] for row in rows]) for k in (3, 2, 1, 0)] + list(values.T[::-1])
+        )
+        kept: List[int] = []
+        kept_values = np.zeros((len(order), values.shape[1]))
+        for i in order:
+            v = values[i]
+            if kept and (kept_values[:len(kept)] <= v).all(axis=1).any():
+                continue
+            kept_values[len(kept)] = v
+            kept.append(i)
+
+        self._front = [rows[i] for i in kept]
+        self._front_values = values[kept]
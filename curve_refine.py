@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Coarse-to-fine search over continuous A and B.
+
+Instead of a fixed A_values x B_values grid, every (y_end, loops) plane starts
+from a coarse grid of A/B cells. Each level splits only the cells that
+straddle the feasibility boundary or touch the current Pareto front of
+(max_grade, length3d), so the fine resolution is spent where it matters.
+"""
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from curve_constraints import DEFAULT_CONSTRAINTS, Constraint
+from curve_engine import (
+    SOUTH, SAMPLED, DEFAULT_BATCH_BYTES, Vec3, batch_rows, evaluate_candidates
+)
+
+# Node key inside the search: (y_end, loops, A, B)
+NodeKey = Tuple[float, int, float, float]
+
+@dataclass
+class RefinedCurve:
+    y_end: float
+    loops: int
+    A: float
+    B: float
+    ok: bool
+    max_grade: float
+    length3d: float
+    length2d: float
+    min_horiz_step: float
+    min_z: float
+
+@dataclass
+class RefineStats:
+    levels: int = 0
+    evaluations: int = 0         # curves actually evaluated
+    uniform_equivalent: int = 0  # curves a uniform grid at the finest step needs
+
+    def summary(self) -> str:
+        ratio = self.uniform_equivalent / self.evaluations if self.evaluations else 0.0
+        return (
+            f"Refined {self.levels} levels with {self.evaluations} curve evaluations "
+            f"(a uniform grid at the same resolution needs {self.uniform_equivalent}, "
+            f"{ratio:.0f}x more)"
+        )
+
+def pareto_front(curves: Sequence[RefinedCurve]) -> List[RefinedCurve]:
+    """Feasible curves not dominated in (max_grade, length3d), lowest grade first."""
+    front: List[RefinedCurve] = []
+    best_length = float("inf")
+
+    for c in sorted((c for c in curves if c.ok), key=lambda c: (c.max_grade, c.length3d)):
+        if c.length3d < best_length:
+            front.append(c)
+            best_length = c.length3d
+
+    return front
+
+def _evaluate_nodes(
+    start: Vec3,
+    end_xz: Tuple[float, float],
+    keys: List[NodeKey],
+    samples: int,
+    bulge: float,
+    grade_solver: str,
+    max_bytes: int,
+    constraints: Sequence[Constraint] = DEFAULT_CONSTRAINTS
+) -> List[RefinedCurve]:
+    """Evaluates a list of nodes in memory-capped batches."""
+    curves: List[RefinedCurve] = []
+    per_batch = batch_rows(samples, max_bytes)
+
+    for lo in range(0, len(keys), per_batch):
+        chunk = keys[lo:lo + per_batch]
+        y_end, loops, A, B = (np.asarray(col) for col in zip(*chunk))
+        res = evaluate_candidates(
+            start, end_xz, y_end, loops, A, B, samples, bulge, grade_solver, constraints
+        )
+        for row, (ky, kl, ka, kb) in enumerate(chunk):
+            curves.append(RefinedCurve(
+                y_end=ky, loops=kl, A=ka, B=kb,
+                ok=bool(res.ok[row]),
+                max_grade=float(res.max_grade[row]),
+                length3d=float(res.length3d[row]),
+                length2d=float(res.length2d[row]),
+                min_horiz_step=float(res.min_horiz_step[row]),
+                min_z=float(res.min_z[row])
+            ))
+
+    return curves
+
+def refine_search(
+    start: Vec3,
+    end_xz: Tuple[float, float],
+    y_ends: Sequence[float],
+    loops_values: Sequence[int],
+    A_range: Tuple[float, float],
+    B_range: Tuple[float, float],
+    coarse_A: int = 6,
+    coarse_B: int = 4,
+    levels: int = 5,
+    samples: int = 900,
+    bulge: float = SOUTH,
+    grade_solver: str = SAMPLED,
+    max_bytes: int = DEFAULT_BATCH_BYTES,
+    accept: Optional[Callable[[RefinedCurve], bool]] = None,
+    constraints: Sequence[Constraint] = DEFAULT_CONSTRAINTS
+) -> Tuple[List[RefinedCurve], RefineStats]:
+    """
+    Adaptive search over continuous A in A_range and B in B_range for every
+    (y_end, loops) pair.
+
+    The planes start as coarse_A x coarse_B cells. At each of `levels`
+    refinement steps a cell is split in four when its corners disagree on
+    feasibility or one of them is on the current Pareto front. Corners are
+    shared between cells, so every node is evaluated once. Curves have to
+    satisfy `constraints`; `accept` can veto curves that do.
+
+    Returns the Pareto front of (max_grade, length3d) and RefineStats.
+    """
+    (A_lo, A_hi), (B_lo, B_hi) = A_range, B_range
+    nodes: Dict[NodeKey, RefinedCurve] = {}
+    stats = RefineStats()
+
+    def evaluate(keys: List[NodeKey]):
+        new = [k for k in dict.fromkeys(keys) if k not in nodes]
+        for curve in _evaluate_nodes(
+            start, end_xz, new, samples, bulge, grade_solver, max_bytes, constraints
+        ):
+            if curve.ok and accept is not None and not accept(curve):
+                curve.ok = False
+            nodes[(curve.y_end, curve.loops, curve.A, curve.B)] = curve
+        stats.evaluations += len(new)
+
+    # Cell: (y_end, loops, A0, A1, B0, B1)
+    A_edges = np.linspace(A_lo, A_hi, coarse_A + 1).tolist()
+    B_edges = np.linspace(B_lo, B_hi, coarse_B + 1).tolist()
+    cells = [
+        (y_end, loops, A_edges[i], A_edges[i + 1], B_edges[j], B_edges[j + 1])
+        for y_end in y_ends
+        for loops in loops_values
+        for i in range(coarse_A)
+        for j in range(coarse_B)
+    ]
+
+    def corners(cell) -> List[NodeKey]:
+        y_end, loops, A0, A1, B0, B1 = cell
+        return [(y_end, loops, a, b) for a in (A0, A1) for b in (B0, B1)]
+
+    evaluate([k for cell in cells for k in corners(cell)])
+
+    for _ in range(levels):
+        on_front = {id(c) for c in pareto_front(list(nodes.values()))}
+
+        split = []
+        for cell in cells:
+            corner_curves = [nodes[k] for k in corners(cell)]
+            mixed = len({c.ok for c in corner_curves}) > 1
+            if mixed or any(id(c) in on_front for c in corner_curves):
+                split.append(cell)
+
+        if not split:
+            break
+
+        cells = []
+        for y_end, loops, A0, A1, B0, B1 in split:
+            Am, Bm = (A0 + A1) / 2, (B0 + B1) / 2
+            cells.extend([
+                (y_end, loops, A0, Am, B0, Bm), (y_end, loops, Am, A1, B0, Bm),
+                (y_end, loops, A0, Am, Bm, B1), (y_end, loops, Am, A1, Bm, B1),
+            ])
+        evaluate([k for cell in cells for k in corners(cell)])
+        stats.levels += 1
+
+    per_plane = (coarse_A * 2 ** stats.levels + 1) * (coarse_B * 2 ** stats.levels + 1)
+    stats.uniform_equivalent = len(y_ends) * len(loops_values) * per_plane
+
+    return pareto_front(list(nodes.values())), stats
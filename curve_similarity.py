@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection for saved curves.
+
+Every curve is resampled to SIGNATURE_POINTS points evenly spaced by arc
+length, so curves with a different number of points or a few shifted
+blocks still line up point for point. Two metrics compare signatures:
+
+  mean       mean distance between corresponding signature points
+  hausdorff  symmetric Hausdorff distance between the two signatures
+
+Comparing every pair does not scale, so candidates come from a grid hash
+with cells as wide as the threshold. Each metric has keys that can only be
+within the threshold when the curves are: averages of the points with
+weights of at most 1 in size for mean (the centroid, the two halves, ...),
+and the curve's extent along unit directions for hausdorff (the bounding
+box, then the diagonals). The first six keys are hashed (for hausdorff the
+whole bounding box: curves sharing their start and end share its minimum
+corner); the rest only filter the pairs of neighbouring cells. Before the
+full distance, cheaper lower bounds drop pairs that are provably too far
+apart, and everything runs in batches of bounded size.
+"""
+
+from collections import defaultdict
+from itertools import product
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from curve_files import map_curve_files, read_curve_file
+
+SIGNATURE_POINTS = 64
+MEAN = "mean"
+HAUSDORFF = "hausdorff"
+
+# Cap on the distance block per batch of pairs ((pairs, points, points)
+# for hausdorff)
+_BATCH_BYTES = 64 * 1024 * 1024
+
+# Cap on the candidate pairs expanded at once from the grid hash
+_PAIR_BATCH = 1 << 22
+
+# Odd multipliers hashing an integer cell vector to one int64 code. The
+# hash is linear, so a neighbour's code is the code plus a constant;
+# collisions only add candidates, which the key check drops.
+_CELL_HASH = np.random.default_rng(0x5EED).integers(1, 1 << 62, 8, dtype=np.int64) | 1
+
+# Bound on the rounding error of _directed_sq (coordinates up to ~1e4)
+_SQ_EPS = 1e-6
+
+# Key columns hashed into the grid (the rest are only compared)
+_HASHED_KEYS = 6
+
+# Hausdorff lower bounds tried before the full distance: the directed
+# distances of every 16th, then every 4th signature point
+_HAUSDORFF_STRIDES = (16, 4)
+
+# Mean lower bound: the mean distance of the centroids of this many
+# equal stretches of the signature
+_MEAN_BOUND_PARTS = 8
+
+def signature(coords: np.ndarray, points: int = SIGNATURE_POINTS) -> np.ndarray:
+    """(points, 3) resampling of a polyline at equal arc-length steps."""
+    coords = np.asarray(coords, dtype=float)
+    seg = np.linalg.norm(np.diff(coords, axis=0), axis=1)
+    s = np.concatenate([[0.0], np.cumsum(seg)])
+    if s[-1] == 0:
+        return np.repeat(coords[:1], points, axis=0)
+
+    at = np.linspace(0.0, s[-1], points)
+    return np.stack([np.interp(at, s, coords[:, k]) for k in range(3)], axis=1)
+
+def signature_of_file(path) -> Optional[np.ndarray]:
+    """Signature of a curve file, or None if it has no coordinates."""
+    coords = read_curve_file(path).coords
+    return signature(coords) if len(coords) else None
+
+def load_signatures(paths: Sequence, jobs: int = 1) -> Tuple[List, np.ndarray, List]:
+    """
+    Signatures of every file in `paths` (on `jobs` processes).
+    Returns (paths with coordinates, their (n, points, 3) signatures,
+    paths without coordinates).
+    """
+    kept, sigs, empty = [], [], []
+    for path, sig in zip(paths, map_curve_files(signature_of_file, paths, jobs)):
+        if sig is None:
+            empty.append(path)
+        else:
+            kept.append(path)
+            sigs.append(sig)
+
+    return kept, np.array(sigs).reshape(-1, SIGNATURE_POINTS, 3), empty
+
+def _walsh(points: int) -> np.ndarray:
+    """(8, points) +-1 weights: the Walsh patterns over 8 stretches of the curve."""
+    h = np.array([[1]])
+    while len(h) < 8:
+        h = np.block([[h, h], [h, -h]])
+    # Sequency order, so the first two are the mean and the two halves
+    h = h[np.argsort((np.diff(h, axis=1) != 0).sum(axis=1), kind="stable")]
+    stretch = np.repeat(np.arange(8), [len(a) for a in np.array_split(np.arange(points), 8)])
+    return h[:, stretch].astype(float)
+
+def _support_directions() -> np.ndarray:
+    """Unit vectors: the 3 axes, then the 6 face and 4 body diagonals."""
+    diagonals = [d for d in product((-1, 0, 1), repeat=3) if d > (0, 0, 0) and sum(map(abs, d)) > 1]
+    dirs = np.concatenate([np.eye(3), np.array(diagonals, dtype=float)])
+    return dirs / np.linalg.norm(dirs, axis=1, keepdims=True)
+
+def _check_keys(sigs: np.ndarray, metric: str) -> np.ndarray:
+    """
+    Per-curve key vectors that differ by <= threshold on every column for
+    any near pair; the first _HASHED_KEYS columns are hashed.
+      mean       averages of the points with +-1 weights (the Walsh
+                 patterns: the centroid first, then the two halves, ...)
+                 can't move further than the mean distance
+      hausdorff  the extent of the curve along any unit direction (the
+                 bounding box first) can't move further than the
+                 Hausdorff distance
+    """
+    if metric == MEAN:
+        walsh = _walsh(sigs.shape[1])
+        keys = np.einsum("wp,npk->nwk", walsh, sigs) / sigs.shape[1]
+        return keys.reshape(len(sigs), -1)
+    if metric == HAUSDORFF:
+        along = sigs @ _support_directions().T
+        low, high = along.min(axis=1), along.max(axis=1)
+        return np.concatenate([low[:, :3], high[:, :3], low[:, 3:], high[:, 3:]], axis=1)
+    raise ValueError(f"Unknown metric: {metric}")
+
+def _expand_runs(starts: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """starts[0] .. starts[0] + counts[0] - 1, starts[1] .., concatenated."""
+    return np.repeat(starts - (np.cumsum(counts) - counts), counts) + np.arange(int(counts.sum()))
+
+def _neighbour_pairs(cells: np.ndarray, accept: Callable[[np.ndarray, np.ndarray], np.ndarray]) -> np.ndarray:
+    """
+    (m, 2) pairs i < j of rows whose integer cells are equal or adjacent on
+    every axis, keeping those `accept(i, j)` passes. Neighbouring cells are
+    looked up once per occupied cell, and the row pairs of matched cells
+    are expanded and filtered in batches of at most _PAIR_BATCH.
+    """
+    n, dims = cells.shape
+    if not n:
+        return np.zeros((0, 2), dtype=np.int64)
+
+    mult = _CELL_HASH[:dims]
+    with np.errstate(over="ignore"):
+        code = (cells * mult).sum(axis=1)
+    cell_code, cell_of, size = np.unique(code, return_inverse=True, return_counts=True)
+    # Rows grouped by cell, cell c's rows at members[start[c]:start[c] + size[c]]
+    members = np.argsort(cell_of, kind="stable")
+    start = np.cumsum(size) - size
+    # The cell behind each code; two cells sharing a code is very unlikely,
+    # but then pairs can be found twice and have to be deduplicated
+    cell = cells[members[start]]
+    collided = bool((cells != cell[cell_of]).any())
+
+    found = []
+    for offset in product((-1, 0, 1), repeat=dims):
+        # An offset and its opposite find the same pairs: take the first
+        # half (and zero) only and order each pair afterwards
+        if offset > (0,) * dims:
+            continue
+        with np.errstate(over="ignore"):
+            target = cell_code + (np.array(offset, dtype=np.int64) * mult).sum()
+        at = np.minimum(np.searchsorted(cell_code, target), len(cell_code) - 1)
+        cu = np.flatnonzero(cell_code[at] == target)
+        cv = at[cu]
+        if not collided:
+            # Codes can also match for cells that aren't neighbours
+            real = (cell[cv] - cell[cu] == offset).all(axis=1)
+            cu, cv = cu[real], cv[real]
+        if not len(cu):
+            continue
+
+        work = np.cumsum(size[cu] * size[cv])
+        for k in np.split(np.arange(len(cu)), np.searchsorted(work, np.arange(_PAIR_BATCH, work[-1], _PAIR_BATCH))):
+            # Every row of cell cu against every row of cell cv
+            a, b = cu[k], cv[k]
+            rows_a = _expand_runs(start[a], size[a])
+            partners = np.repeat(size[b], size[a])
+            i = members[np.repeat(rows_a, partners)]
+            j = members[_expand_runs(np.repeat(start[b], size[a]), partners)]
+            if any(offset):
+                i, j = np.minimum(i, j), np.maximum(i, j)
+            keep = i < j
+            i, j = i[keep], j[keep]
+            keep = accept(i, j)
+            found.append(i[keep] * n + j[keep])
+
+    found = np.concatenate(found) if found else np.zeros(0, dtype=np.int64)
+    if collided:
+        found = np.unique(found)
+    return np.stack([found // n, found % n], axis=1)
+
+def candidate_pairs(
+    sigs: np.ndarray,
+    threshold: float,
+    metric: str = MEAN,
+    split: Optional[int] = None
+) -> np.ndarray:
+    """
+    (m, 2) array of index pairs i < j worth comparing. With `split`, only
+    pairs with i < split <= j are returned (one curve from each set).
+    """
+    keys = _check_keys(sigs, metric)
+    cells = np.floor(keys[:, :_HASHED_KEYS] / max(threshold, 1e-9)).astype(np.int64)
+
+    def accept(i: np.ndarray, j: np.ndarray) -> np.ndarray:
+        # Every key (not just the hashed cell) must be within the threshold
+        close = (np.abs(keys[i] - keys[j]) <= threshold).all(axis=1)
+        if split is not None:
+            close &= (i < split) & (j >= split)
+        return close
+
+    return _neighbour_pairs(cells, accept)
+
+def _directed_sq_exact(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Per pair, max over a's points of the squared distance to the nearest point of b."""
+    d = ((a[:, :, None, :] - b[:, None, :, :]) ** 2).sum(axis=3)
+    return d.min(axis=2).max(axis=1)
+
+def _directed_sq(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    _directed_sq_exact as |a|^2 + |b|^2 - 2 a.b (a matrix product per pair),
+    several times faster and within _SQ_EPS of it.
+    """
+    origin = a[:, :1]
+    a, b = a - origin, b - origin
+    d = (a * a).sum(axis=2)[:, :, None] + (b * b).sum(axis=2)[:, None, :] - 2 * (a @ b.transpose(0, 2, 1))
+    return np.maximum(d.min(axis=2).max(axis=1), 0)
+
+def _mean_distances(sigs: np.ndarray, pairs: np.ndarray, threshold: Optional[float]) -> np.ndarray:
+    """MEAN branch of pair_distances, in batches of at most _BATCH_BYTES."""
+    n, points, _ = sigs.shape
+    per_batch = max(1, _BATCH_BYTES // (points * 3 * 8 * 3))
+    out = np.empty(len(pairs))
+
+    # Mean of |centroid difference| over equal stretches <= mean distance
+    parts = _MEAN_BOUND_PARTS if points % _MEAN_BOUND_PARTS == 0 else 1
+    centroids = sigs.reshape(n, parts, points // parts, 3).mean(axis=2)
+
+    for lo in range(0, len(pairs), per_batch):
+        i, j = pairs[lo:lo + per_batch, 0], pairs[lo:lo + per_batch, 1]
+        todo = np.arange(len(i))
+        if threshold is not None:
+            bound = np.linalg.norm(centroids[i] - centroids[j], axis=2).mean(axis=1)
+            far = bound > threshold
+            out[lo + todo[far]] = bound[far]
+            todo = todo[~far]
+        out[lo + todo] = np.linalg.norm(sigs[i[todo]] - sigs[j[todo]], axis=2).mean(axis=1)
+
+    return out
+
+def pair_distances(
+    sigs: np.ndarray,
+    pairs: np.ndarray,
+    metric: str = MEAN,
+    threshold: Optional[float] = None
+) -> np.ndarray:
+    """
+    Distance of every (i, j) pair of signatures under `metric`. With a
+    threshold, pairs that are provably further apart than it only get a
+    lower bound (still > threshold), which is much cheaper.
+    """
+    if metric == MEAN:
+        return _mean_distances(sigs, pairs, threshold)
+    if metric != HAUSDORFF:
+        raise ValueError(f"Unknown metric: {metric}")
+
+    points = sigs.shape[1]
+    out = np.empty(len(pairs))
+    todo = np.arange(len(pairs))
+
+    # Every k-th point of a curve only sees part of it, so its directed
+    # distance is a lower bound; coarse bounds first, then the real thing
+    # for the pairs that are still within the threshold
+    strides = _HAUSDORFF_STRIDES if threshold is not None else ()
+    for stride in strides + (1,):
+        width = -(-points // stride)
+        per_batch = max(1, _BATCH_BYTES // (width * points * 8 * 3))
+        close = []
+        for lo in range(0, len(todo), per_batch):
+            k = todo[lo:lo + per_batch]
+            a, b = sigs[pairs[k, 0]], sigs[pairs[k, 1]]
+            sq = np.maximum(_directed_sq(a[:, ::stride], b), _directed_sq(b[:, ::stride], a))
+            if threshold is not None:
+                # Decide the pairs right at the threshold exactly
+                edge = np.flatnonzero(np.abs(sq - threshold ** 2) <= _SQ_EPS)
+                ae, be = a[edge, ::stride], b[edge]
+                sq[edge] = np.maximum(_directed_sq_exact(ae, be), _directed_sq_exact(be[:, ::stride], a[edge]))
+            out[k] = np.sqrt(sq)
+            if stride > 1:
+                close.append(k[sq <= threshold ** 2])
+        if stride > 1:
+            todo = np.concatenate(close) if close else todo[:0]
+
+    return out
+
+def near_pairs(
+    sigs: np.ndarray,
+    threshold: float,
+    metric: str = MEAN,
+    split: Optional[int] = None
+) -> List[Tuple[int, int, float]]:
+    """(i, j, distance) for every pair within `threshold`, sorted by i then j."""
+    pairs = candidate_pairs(sigs, threshold, metric, split)
+    if not len(pairs):
+        return []
+
+    dist = pair_distances(sigs, pairs, metric, threshold)
+    near = dist <= threshold
+    order = np.lexsort((pairs[near, 1], pairs[near, 0]))
+    return [
+        (int(i), int(j), float(d))
+        for (i, j), d in zip(pairs[near][order], dist[near][order])
+    ]
+
+def clusters(count: int, pairs: Sequence[Tuple[int, int, float]]) -> List[List[int]]:
+    """Connected groups (size > 1) of the near-pair graph, by smallest member."""
+    parent = list(range(count))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j, _ in pairs:
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[max(ri, rj)] = min(ri, rj)
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for i in range(count):
+        groups[find(i)].append(i)
+
+    return sorted((g for g in groups.values() if len(g) > 1), key=lambda g: g[0])
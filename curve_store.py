@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Packed binary store for saved curves.
+
+A store is a directory with two files:
+  coords.bin  - the rounded [x, y, z] points of every curve, back to back,
+                as little-endian int32 triples
+  index.json  - per curve name: row offset and count into coords.bin, the
+                verbatim .txt header and the (y_end, loops, A, B) params
+
+coords.bin is memory-mapped, so reading one curve or all of them is a slice
+instead of a text parse. export_txt writes the same .txt files the search
+scripts used to write, byte for byte.
+
+Usage:
+  python curve_store.py export STORE_DIR OUT_DIR [NAME ...]
+"""
+
+import json
+import os
+import sys
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from curve_files import format_txt, write_atomic
+
+COORDS_FILE = "coords.bin"
+INDEX_FILE = "index.json"
+DTYPE = np.dtype("<i4")
+
+class CurveStore:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index: Dict[str, dict] = {}
+        self._coords: Optional[np.ndarray] = None
+        self._by_params: Optional[Dict[tuple, str]] = None
+        self._dirty = False
+
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self._path(INDEX_FILE)) as f:
+                self.index = json.load(f)["curves"]
+        except (OSError, KeyError, ValueError):
+            pass
+
+    def __enter__(self) -> "CurveStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def names(self) -> List[str]:
+        return list(self.index)
+
+    def put(self, name: str, header: str, points: np.ndarray, params: dict):
+        """
+        Appends a curve. Saving a name again points the index at the new
+        rows; the old ones stay in coords.bin as dead space.
+        """
+        points = np.ascontiguousarray(points, dtype=DTYPE).reshape(-1, 3)
+        path = self._path(COORDS_FILE)
+        offset = os.path.getsize(path) // (3 * DTYPE.itemsize) if os.path.exists(path) else 0
+
+        with open(path, "ab") as f:
+            f.write(points.tobytes())
+
+        self.index[name] = {
+            "offset": offset,
+            "count": len(points),
+            "header": header,
+            "params": params,
+        }
+        self._coords = None
+        self._by_params = None
+        self._dirty = True
+
+    def points(self, name: str) -> np.ndarray:
+        """(n, 3) int32 view of one curve's points."""
+        entry = self.index[name]
+        return self.coords()[entry["offset"]:entry["offset"] + entry["count"]]
+
+    def header(self, name: str) -> str:
+        return self.index[name]["header"]
+
+    def find(self, y_end: float, loops: int, A: float, B: float) -> Optional[str]:
+        """Name of the curve saved with these params, if any."""
+        if self._by_params is None:
+            self._by_params = {}
+            for name, entry in self.index.items():
+                p = entry["params"]
+                self._by_params[(p["y_end"], p["loops"], p["A"], p["B"])] = name
+        return self._by_params.get((y_end, loops, A, B))
+
+    def coords(self) -> np.ndarray:
+        """Every stored point as one memory-mapped (rows, 3) int32 array."""
+        if self._coords is None:
+            path = self._path(COORDS_FILE)
+            if not os.path.exists(path) or os.path.getsize(path) == 0:
+                return np.zeros((0, 3), dtype=DTYPE)
+            self._coords = np.memmap(path, dtype=DTYPE, mode="r").reshape(-1, 3)
+        return self._coords
+
+    def flush(self):
+        """Writes the index; puts are not visible to other readers before this."""
+        if not self._dirty:
+            return
+
+        write_atomic(self._path(INDEX_FILE), json.dumps({"curves": self.index}))
+        self._dirty = False
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+def export_txt(store: CurveStore, output_dir: str, names: Optional[Iterable[str]] = None) -> int:
+    """Writes stored curves back out as .txt files. Returns how many were written."""
+    os.makedirs(output_dir, exist_ok=True)
+    count = 0
+
+    for name in (store.names() if names is None else names):
+        write_atomic(os.path.join(output_dir, name), format_txt(store.header(name), store.points(name)))
+        count += 1
+
+    return count
+
+def main():
+    if len(sys.argv) < 4 or sys.argv[1] != "export":
+        print("Usage: python curve_store.py export STORE_DIR OUT_DIR [NAME ...]")
+        sys.exit(1)
+
+    store = CurveStore(sys.argv[2])
+    names = sys.argv[4:] or None
+    written = export_txt(store, sys.argv[3], names)
+    print(f"Exported {written} curves to '{sys.argv[3]}/'")
+
+if __name__ == "__main__":
+    main()
@@ -2,48 +2,91 @@
 """
 Find and delete duplicate curve files.
 Two files are duplicates if they have identical coordinate sequences.
+With --near, report clusters of near-duplicate curves instead (nothing is moved).
 """
 
 import os
-import re
-import hashlib
+import argparse
 from pathlib import Path
 from collections import defaultdict
 
+import numpy as np
+
+from curve_files import map_curve_files, read_curve_file
+from curve_index import INDEX_FILE, DigestIndex
+from curve_similarity import HAUSDORFF, MEAN, clusters, load_signatures, near_pairs
+
 def extract_coordinates(filepath):
     """
     Extract all coordinates from a curve file.
-    Returns a tuple of (x, y, z) tuples, or None if no coordinates found.
+    Returns an (n, 3) int array, or None if no coordinates found.
     """
-    coords = []
+    coords = read_curve_file(filepath).coords
+    if not len(coords):
+        return None
+
+    return coords
 
-    with open(filepath, 'r') as f:
-        for line in f:
-            line = line.strip()
+def digest_curve_file(filepath):
+    """Digest of a file's coordinates, or None if no coordinates found."""
+    curve = read_curve_file(filepath)
+    if not len(curve.coords):
+        return None
 
-            # Skip comments and empty lines
-            if not line or line.startswith('#'):
-                continue
+    return curve.digest
 
-            # Parse coordinate line: [x, y, z]
-            match = re.match(r'\[(-?\d+),\s*(-?\d+),\s*(-?\d+)\]', line)
-            if match:
-                x = int(match.group(1))
-                y = int(match.group(2))
-                z = int(match.group(3))
-                coords.append((x, y, z))
+def report_near_duplicates(curve_files, threshold, metric, jobs):
+    """Prints clusters of curves within `threshold` blocks of each other."""
+    paths, sigs, empty = load_signatures(curve_files, jobs)
+    for filepath in empty:
+        print(f"⚠️  {filepath.name}: No coordinates found")
 
-    if not coords:
-        return None
+    pairs = near_pairs(sigs, threshold, metric)
+    groups = clusters(len(paths), pairs)
+
+    if not groups:
+        print(f"✅ No near-duplicate files found within {threshold} blocks ({metric}).")
+        return
 
-    return tuple(coords)
+    print(f"Found {len(groups)} clusters of near-duplicate files "
+          f"({metric} deviation <= {threshold} blocks):\n")
+
+    # Distance from each file to the first member it was linked with
+    link = {}
+    for i, j, dist in pairs:
+        link.setdefault(j, (i, dist))
+
+    for n, group in enumerate(groups, 1):
+        print(f"Cluster {n}: {len(group)} similar files")
+        for k in sorted(group, key=lambda k: paths[k].name):
+            if k in link:
+                other, dist = link[k]
+                print(f"  {paths[k].name} (~{dist:.2f} from {paths[other].name})")
+            else:
+                print(f"  {paths[k].name}")
+        print()
 
-def get_coord_hash(coords):
-    """Generate a hash from coordinate sequence for fast comparison."""
-    coord_str = str(coords)
-    return hashlib.md5(coord_str.encode()).hexdigest()
+    print("=" * 80)
+    print(f"\nSummary:")
+    print(f"  Total files: {len(curve_files)}")
+    print(f"  Near-duplicate clusters: {len(groups)}")
+    print(f"  Files in clusters: {sum(len(g) for g in groups)}")
+    print(f"  Near-duplicate mode only reports; no files were moved.")
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of processes to parse and hash files with (default: 1)")
+    parser.add_argument("--index", default=INDEX_FILE, metavar="PATH",
+                        help=f"digest index reused for unchanged files (default: {INDEX_FILE})")
+    parser.add_argument("--no-index", action="store_true",
+                        help="parse every file instead of using the digest index")
+    parser.add_argument("--near", type=float, metavar="BLOCKS",
+                        help="report clusters of curves within BLOCKS of each other instead")
+    parser.add_argument("--metric", choices=[MEAN, HAUSDORFF], default=MEAN,
+                        help="how --near measures the distance between two curves (default: mean)")
+    args = parser.parse_args()
+
     curves_dir = Path('curves')
 
     if not curves_dir.exists():
@@ -60,31 +103,45 @@ def main():
     print(f"Analyzing {len(curve_files)} curve files for duplicates...")
     print("=" * 80)
 
-    # Map: coord_hash -> list of (filepath, coords)
+    if args.near is not None:
+        report_near_duplicates(curve_files, args.near, args.metric, args.jobs)
+        return
+
+    # Map: digest -> list of filepaths
     coord_map = defaultdict(list)
 
-    # First pass: extract coordinates and group by hash
-    for filepath in curve_files:
-        coords = extract_coordinates(filepath)
-        if coords is None:
+    # First pass: digest coordinates and group by digest
+    index = None
+    if args.no_index:
+        results = map_curve_files(digest_curve_file, curve_files, args.jobs)
+    else:
+        index = DigestIndex(args.index)
+        digests = index.refresh(curve_files, args.jobs)
+        index.save()
+        results = [digests[index.key(filepath)] for filepath in curve_files]
+        print(f"Digest index: {len(curve_files) - index.parsed} files unchanged, "
+              f"{index.parsed} parsed")
+
+    for filepath, digest in zip(curve_files, results):
+        if digest is None:
             print(f"⚠️  {filepath.name}: No coordinates found")
             continue
 
-        coord_hash = get_coord_hash(coords)
-        coord_map[coord_hash].append((filepath, coords))
+        coord_map[digest].append(filepath)
 
     # Find duplicates
     duplicates = []
     unique_groups = 0
 
-    for coord_hash, files_with_coords in coord_map.items():
-        if len(files_with_coords) > 1:
-            # Verify they're actually identical (hash collision check)
-            first_coords = files_with_coords[0][1]
-            group = []
+    for digest, filepaths in coord_map.items():
+        if len(filepaths) > 1:
+            # Verify they're actually identical (hash collision check);
+            # only these groups are read a second time
+            first_coords = extract_coordinates(filepaths[0])
+            group = [filepaths[0]]
 
-            for filepath, coords in files_with_coords:
-                if coords == first_coords:
+            for filepath in filepaths[1:]:
+                if np.array_equal(extract_coordinates(filepath), first_coords):
                     group.append(filepath)
 
             if len(group) > 1:
@@ -129,8 +186,13 @@ def main():
         for filepath in files_to_delete:
             dest = deleted_dir / filepath.name
             filepath.rename(dest)
+            if index is not None:
+                index.forget(filepath)
             print(f"  Moved: {filepath.name} -> curves_deleted/")
 
+        if index is not None:
+            index.save()
+
         print(f"\n✅ Done! Deleted {len(files_to_delete)} duplicate files.")
         print(f"   Remaining unique curves: {len(curve_files) - len(files_to_delete)}")
 
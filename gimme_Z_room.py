@@ -1,5 +1,12 @@
 #!/usr/bin/env python3
-from typing import List, Tuple
+import argparse
+import sys
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from path_validator import summarize, validate_path
+from u_turns import SHAPES, SINE, UTurn, best_u_turns, fits, u_turn_blocks
 
 Coord = Tuple[int, int, int]
 
@@ -175,7 +182,8 @@ COORDS_END: List[Coord] = [
 # ============================================================
 
 # Define the serpentine path anchor points
-# Format: (end of ramp, after curve) pairs
+# Format: start, (end of ramp, after curve) pairs, end - any number of ramps.
+# `python calculate_anchors.py` solves a list in this format.
 ANCHORS = [
     (-226, 130, 326),  # Start
     (-317, 146, 326),  # End of Ramp 1
@@ -189,7 +197,7 @@ ANCHORS = [
     (-324, 214, 318),  # End (Ramp 5)
 ]
 
-CURVE_RADIUS = 8  # Radius for flat curves
+CURVE_RADIUS = 8  # Largest radius --plan tries for the flat curves
 
 # ============================================================
 # 3. UTILITY FUNCTIONS
@@ -212,18 +220,11 @@ def is_south(dx: int, dz: int) -> bool:
 # 4. LOOP PATH GENERATION
 # ============================================================
 
-CURVE_RADIUS = 3  # 3-block radius for smooth corners
-
 def interpolate_segment(start: Coord, end: Coord, num_steps: int) -> List[Coord]:
     """Generate smooth interpolated coordinates between two points."""
-    coords = []
-    for i in range(num_steps + 1):
-        t = i / num_steps
-        x = int(start[0] + (end[0] - start[0]) * t)
-        y = int(start[1] + (end[1] - start[1]) * t)
-        z = int(start[2] + (end[2] - start[2]) * t)
-        coords.append((x, y, z))
-    return coords
+    coords = np.empty((num_steps + 1, 3), dtype=np.int64)
+    _fill_ramp(coords, start, end, num_steps)
+    return [tuple(c) for c in coords.tolist()]
 
 def create_curve(before: Coord, corner: Coord, after: Coord, radius: int, y_start: int, y_end: int) -> List[Coord]:
     """Create a smooth curve around a corner point.
@@ -279,147 +280,269 @@ def create_curve(before: Coord, corner: Coord, after: Coord, radius: int, y_star
     return coords
 
 
-def generate_serpentine_path() -> List[Coord]:
-    """Generate the complete serpentine path with 5 ramps and 4 flat curves."""
-    output: List[Coord] = []
-
-    # Add COORDS_BEGIN as-is
-    output.extend(COORDS_BEGIN)
-
-    # The pattern is: Ramp1, Curve1, Ramp2, Curve2, Ramp3, Curve3, Ramp4, Curve4, Ramp5
-    # Anchors: [0]=start, [1]=end_ramp1, [2]=after_curve1, [3]=end_ramp2, etc.
-
-    # Ramp 1: Start (anchor[0]) → End of Ramp 1 (anchor[1])
-    ramp1_dist = int(((ANCHORS[1][0] - ANCHORS[0][0])**2 + (ANCHORS[1][2] - ANCHORS[0][2])**2)**0.5)
-    ramp1 = interpolate_segment(ANCHORS[0], ANCHORS[1], ramp1_dist)
-    output.extend(ramp1[1:])  # Skip first point (already in output)
-
-    # Curve 1: 180° turn from west to east, moving north (curve opens EAST)
-    # The curve goes from anchor[1] to anchor[2]
-    curve1 = create_180_degree_curve(ANCHORS[1], ANCHORS[2], CURVE_RADIUS, ANCHORS[1][1], 'east')
-    output.extend(curve1[1:])
-
-    # Ramp 2: After Curve 1 (anchor[2]) → End of Ramp 2 (anchor[3])
-    ramp2_dist = abs(ANCHORS[3][0] - ANCHORS[2][0])  # Eastward movement
-    ramp2 = interpolate_segment(ANCHORS[2], ANCHORS[3], ramp2_dist)
-    output.extend(ramp2[1:])
-
-    # Curve 2: 180° turn from east to west, moving south (curve opens WEST)
-    curve2 = create_180_degree_curve(ANCHORS[3], ANCHORS[4], CURVE_RADIUS, ANCHORS[3][1], 'west')
-    output.extend(curve2[1:])
-
-    # Ramp 3: After Curve 2 (anchor[4]) → End of Ramp 3 (anchor[5])
-    ramp3_dist = abs(ANCHORS[5][0] - ANCHORS[4][0])  # Westward movement
-    ramp3 = interpolate_segment(ANCHORS[4], ANCHORS[5], ramp3_dist)
-    output.extend(ramp3[1:])
-
-    # Curve 3: 180° turn from west to east, moving south (curve opens EAST)
-    curve3 = create_180_degree_curve(ANCHORS[5], ANCHORS[6], CURVE_RADIUS, ANCHORS[5][1], 'east')
-    output.extend(curve3[1:])
-
-    # Ramp 4: After Curve 3 (anchor[6]) → End of Ramp 4 (anchor[7])
-    ramp4_dist = abs(ANCHORS[7][0] - ANCHORS[6][0])  # Eastward movement
-    ramp4 = interpolate_segment(ANCHORS[6], ANCHORS[7], ramp4_dist)
-    output.extend(ramp4[1:])
-
-    # Curve 4: 180° turn from east to west, moving north (curve opens WEST)
-    curve4 = create_180_degree_curve(ANCHORS[7], ANCHORS[8], CURVE_RADIUS, ANCHORS[7][1], 'west')
-    output.extend(curve4[1:])
-
-    # Ramp 5: After Curve 4 (anchor[8]) → End (anchor[9])
-    ramp5_dist = int(((ANCHORS[9][0] - ANCHORS[8][0])**2 + (ANCHORS[9][2] - ANCHORS[8][2])**2)**0.5)
-    ramp5 = interpolate_segment(ANCHORS[8], ANCHORS[9], ramp5_dist)
-    output.extend(ramp5[1:])
-
-    # Add COORDS_END as-is
-    output.extend(COORDS_END[1:])
-
-    return output
-
-def create_180_degree_curve(start: Coord, end: Coord, radius: int, y: int, curve_direction: str) -> List[Coord]:
+def turn_directions(anchors: Sequence[Coord]) -> List[str]:
+    """
+    Which way each U-turn opens: the way the next ramp goes, which is back
+    against the ramp that led into it ('east' after a westward ramp).
+    """
+    directions = []
+    for k in range(1, len(anchors) - 1, 2):
+        dx = anchors[k][0] - anchors[k - 1][0]
+        if dx == 0:
+            # A ramp along Z: go by the ramp after the turn instead
+            dx = -(anchors[k + 2][0] - anchors[k + 1][0]) if k + 2 < len(anchors) else 0
+        if dx == 0:
+            raise ValueError(f"Can't tell which way the turn at {anchors[k]} opens")
+        directions.append('east' if dx < 0 else 'west')
+    return directions
+
+def ramp_steps(start: Coord, end: Coord) -> int:
+    """Steps of a ramp: its horizontal length, truncated."""
+    return int(((end[0] - start[0])**2 + (end[2] - start[2])**2)**0.5)
+
+def _fill_ramp(out: np.ndarray, start: Coord, end: Coord, steps: int):
+    """interpolate_segment into `out` (steps + 1 rows)."""
+    t = np.arange(steps + 1) / steps
+    for axis in range(3):
+        out[:, axis] = np.trunc(start[axis] + (end[axis] - start[axis]) * t)
+
+def u_turn_slots(anchors: Sequence[Coord]) -> List[Tuple[Coord, int, int]]:
+    """(start, X direction it bulges, Z shift) of every U-turn."""
+    return [
+        (anchors[k], -1 if direction == 'east' else 1, anchors[k + 1][2] - anchors[k][2])
+        for k, direction in zip(range(1, len(anchors) - 1, 2), turn_directions(anchors))
+    ]
+
+def plan_u_turns(
+    anchors: Sequence[Coord] = ANCHORS,
+    radii: Sequence[int] = range(2, CURVE_RADIUS + 1),
+    shapes: Sequence[str] = SHAPES,
+    z_slack: int = 0,
+    workers: int = 1
+) -> Tuple[List[UTurn], List[Coord], List[dict]]:
+    """
+    The best U-turn for every curve (see u_turns.best_u_turns), the anchors
+    moved to their shifts, and each turn's rails / corners / cost. Moving a
+    shift moves every anchor after it; the moves add up to zero, so the
+    last ramp still ends on the last anchor.
+    """
+    turns, scores = best_u_turns(u_turn_slots(anchors), radii, shapes, z_slack, workers)
+    moved = [tuple(a) for a in anchors]
+    for j, turn in enumerate(turns):
+        k = 2 * j + 1
+        delta = turn.shift - (anchors[k + 1][2] - anchors[k][2])
+        for i in range(k + 1, len(moved)):
+            moved[i] = (moved[i][0], moved[i][1], moved[i][2] + delta)
+    return turns, moved, scores
+
+def stock_u_turns(anchors: Sequence[Coord] = ANCHORS) -> List[UTurn]:
+    """
+    The U-turns drawn when none are planned: the sine lobe
+    create_180_degree_curve has always drawn, bulging half the Z shift
+    past the column.
+    """
+    return [UTurn(SINE, max(abs(shift) // 2, 1), shift) for _, _, shift in u_turn_slots(anchors)]
+
+def _turn_blocks(anchors: Sequence[Coord], turns: Optional[Sequence[UTurn]]) -> List[np.ndarray]:
+    """Each turn's blocks; the stock U-turns if none are given."""
+    slots = u_turn_slots(anchors)
+    if turns is None:
+        turns = stock_u_turns(anchors)
+    if len(turns) != len(slots):
+        raise ValueError(f"{len(turns)} turns given for {len(slots)} curves")
+    return [u_turn_blocks(start, out_dir, turn) for (start, out_dir, _), turn in zip(slots, turns)]
+
+def serpentine_piece(anchors: Sequence[Coord], k: int, turn: Optional[UTurn] = None) -> np.ndarray:
+    """
+    The points of one piece of generate_serpentine_path on their own,
+    first point included: ramp k // 2 + 1 for even k, otherwise the U-turn
+    after it (`turn`, or the stock one).
+    """
+    if k % 2 == 0:
+        piece = np.empty((ramp_steps(anchors[k], anchors[k + 1]) + 1, 3), dtype=np.int64)
+        _fill_ramp(piece, anchors[k], anchors[k + 1], len(piece) - 1)
+        return piece
+    start, out_dir, _ = u_turn_slots(anchors)[k // 2]
+    if turn is None:
+        turn = stock_u_turns(anchors)[k // 2]
+    return u_turn_blocks(start, out_dir, turn)
+
+def _piece_sizes(anchors: Sequence[Coord], curves: Sequence[np.ndarray]) -> List[int]:
+    """
+    Points each ramp (even k) and U-turn (odd k, blocks in `curves`) adds
+    to the path; its first point is the last one of the piece before.
+    """
+    return [
+        ramp_steps(anchors[k], anchors[k + 1]) if k % 2 == 0 else len(curves[k // 2]) - 1
+        for k in range(len(anchors) - 1)
+    ]
+
+def serpentine_pieces(
+    anchors: Sequence[Coord] = ANCHORS,
+    begin: Sequence[Coord] = COORDS_BEGIN,
+    end: Sequence[Coord] = COORDS_END,
+    turns: Optional[Sequence[UTurn]] = None
+) -> List[Tuple[str, int, int]]:
+    """
+    (name, first, last) point index ranges of the pieces of
+    generate_serpentine_path: "begin", "ramp 1", "curve 1", ..., "end".
+    Neighbouring pieces share their joining point.
+    """
+    pieces = [("begin", 0, len(begin) - 1)]
+    at = len(begin) - 1
+    for k, n in enumerate(_piece_sizes(anchors, _turn_blocks(anchors, turns))):
+        pieces.append((f"{'ramp' if k % 2 == 0 else 'curve'} {k // 2 + 1}", at, at + n))
+        at += n
+    pieces.append(("end", at, at + len(end) - 1))
+    return pieces
+
+def generate_serpentine_path(
+    anchors: Sequence[Coord] = ANCHORS,
+    begin: Sequence[Coord] = COORDS_BEGIN,
+    end: Sequence[Coord] = COORDS_END,
+    turns: Optional[Sequence[UTurn]] = None
+) -> np.ndarray:
+    """
+    The complete serpentine path as an (n, 3) int array: `begin` as-is,
+    then a ramp and a flat U-turn for every pair of anchors, a last ramp
+    into the final anchor, and `end` as-is.
+
+    `anchors` is start, (end of ramp, after curve) pairs, end, as in
+    ANCHORS (calculate_anchors.py solves them), so any number of ramps
+    works. Every piece is sized first and written straight into one
+    preallocated array.
+
+    `turns` (from plan_u_turns) are the U-turns to draw; without it they
+    are stock_u_turns. Either way they are walked into rail blocks by
+    u_turns, so they have no gaps or repeated blocks.
+    """
+    if len(anchors) % 2:
+        raise ValueError("Anchors must be start, (end of ramp, after curve) pairs, end")
+    begin = np.asarray(begin, dtype=np.int64).reshape(-1, 3)
+    end = np.asarray(end, dtype=np.int64).reshape(-1, 3)
+
+    curves = _turn_blocks(anchors, turns)
+    sizes = _piece_sizes(anchors, curves)
+
+    out = np.empty((len(begin) + sum(sizes) + len(end) - 1, 3), dtype=np.int64)
+    out[:len(begin)] = begin
+    at = len(begin)
+    for k, n in enumerate(sizes):
+        if n == 0:
+            continue  # anchors on top of each other
+        piece = out[at - 1:at + n]
+        first = piece[0].copy()
+        if k % 2 == 0:
+            _fill_ramp(piece, anchors[k], anchors[k + 1], n)
+        else:
+            piece[:] = curves[k // 2]
+        # The piece's own first point is dropped, like extend(piece[1:])
+        piece[0] = first
+        at += n
+    out[at:] = end[1:]
+    return out
+
+def create_180_degree_curve(
+    start: Coord,
+    end: Coord,
+    radius: int,
+    y: int,
+    curve_direction: str,
+    shape: str = "semicircle"
+) -> List[Coord]:
     """Create a flat 180-degree U-turn curve for minecart rails.
 
-    Creates a semicircular path that:
+    Creates a path that:
     - Reverses the X direction (west→east or east→west)
     - Moves in the Z direction (north or south)
     - Keeps Y constant (flat curve)
+    - Is rail-connected (every step one block north/south/east/west)
 
     Args:
         start: Starting point (end of previous ramp)
-        end: Ending point (start of next ramp)
-        radius: Curve radius
+        end: Ending point (start of next ramp, in start's X column)
+        radius: How far the curve bulges past the column, in blocks
         y: Y coordinate (constant)
         curve_direction: 'east' or 'west' - which way the curve opens
-    """
-    import math
-    coords = []
-
-    # Analyze the turn
-    x_start = start[0]
-    x_end = end[0]
-    z_start = start[2]
-    z_end = end[2]
-
-    # Determine the turn parameters
-    z_distance = abs(z_end - z_start)  # How far north/south we move
-    going_north = z_end < z_start
-
-    # For a U-turn, we create a semicircle
-    # The semicircle curves in the X direction (perpendicular to travel)
-    # while progressing in the Z direction (direction of travel)
+        shape: one of u_turns.SHAPES; a semicircle needs a Z distance of
+            at least 2 * radius
 
-    # The radius of the turn in X direction
-    turn_radius = z_distance / 2
-
-    # Center of the semicircle
-    center_x = (x_start + x_end) / 2
-    center_z = (z_start + z_end) / 2
-
-    # Generate points along the semicircle
-    num_points = max(int(z_distance * 1.5), 24)  # Smooth curve
-
-    for i in range(num_points + 1):
-        t = i / num_points
-
-        # Angle from 0 to π (180 degrees)
-        angle = t * math.pi
-
-        # Z progresses linearly from start to end (direction of travel)
-        if going_north:
-            z = int(z_start - t * z_distance)
-        else:
-            z = int(z_start + t * z_distance)
-
-        # X follows a semicircular path (perpendicular to travel)
-        # This creates the U-turn
-        x_offset = turn_radius * math.sin(angle)
-
-        if curve_direction == 'east':
-            # Curve opens to the east (goes west then back east)
-            x = int(center_x - x_offset)
-        else:  # 'west'
-            # Curve opens to the west (goes east then back west)
-            x = int(center_x + x_offset)
-
-        coords.append((x, y, z))
-
-    return coords
+    Raises ValueError if `end` is not in start's X column or the shape
+    can't be drawn at this radius and Z distance.
+    """
+    if end[0] != start[0]:
+        raise ValueError(f"A U-turn ends in its start's X column: start X={start[0]}, end X={end[0]}")
+    turn = UTurn(shape, radius, end[2] - start[2])
+    if not fits(turn):
+        raise ValueError(f"No {shape} U-turn of radius {radius} shifts Z by {turn.shift}")
+    out_dir = -1 if curve_direction == 'east' else 1
+    return [tuple(c) for c in u_turn_blocks((start[0], y, start[2]), out_dir, turn).tolist()]
 
 # ============================================================
 # 5. RUN + PRINT RESULT
 # ============================================================
 
 def main():
-    new_coords = generate_serpentine_path()
+    parser = argparse.ArgumentParser(description="Generate the serpentine path between COORDS_BEGIN and COORDS_END.")
+    parser.add_argument("--force", action="store_true",
+                        help="print the path even if the path checks find problems")
+    parser.add_argument("--plan", action="store_true",
+                        help="search U-turn shape, radius and Z shift per curve instead of the default U-turns")
+    parser.add_argument("--shapes", default=",".join(SHAPES),
+                        help=f"U-turn shapes --plan tries (default: {','.join(SHAPES)})")
+    parser.add_argument("--min-radius", type=int, default=2,
+                        help="smallest U-turn radius --plan tries (default: 2)")
+    parser.add_argument("--max-radius", type=int, default=CURVE_RADIUS,
+                        help=f"largest U-turn radius --plan tries (default: {CURVE_RADIUS})")
+    parser.add_argument("--z-slack", type=int, default=0,
+                        help="blocks --plan may move each U-turn's Z shift; the moves add up to zero (default: 0)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes to score U-turn options with (default: 1)")
+    args = parser.parse_args()
+
+    anchors, turns, scores = ANCHORS, None, []
+    if args.plan:
+        shapes = [s.strip() for s in args.shapes.split(",") if s.strip()]
+        unknown = sorted(set(shapes) - set(SHAPES))
+        if unknown:
+            parser.error(f"unknown shape(s): {', '.join(unknown)} (choose from {', '.join(SHAPES)})")
+        radii = range(args.min_radius, args.max_radius + 1)
+        try:
+            turns, anchors, scores = plan_u_turns(ANCHORS, radii, shapes, args.z_slack, args.workers)
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+
+    new_coords = generate_serpentine_path(anchors, turns=turns)
+
+    # Curves have to stay flat; everything has to be connected and climbable.
+    # COORDS_BEGIN / COORDS_END are pasted in as they are, so their problems
+    # are only warnings; the serpentine between them has to pass.
+    pieces = serpentine_pieces(anchors, turns=turns)
+    enforced = [(a, b) for name, a, b in pieces if name not in ("begin", "end")]
+    violations = validate_path(new_coords, flat=[(a, b) for name, a, b in pieces if name.startswith("curve")])
+    broken = [v for v in violations if any(a < v.last and v.first < b for a, b in enforced)]
+    if violations:
+        print(f"Path check: {summarize(violations)}", file=sys.stderr)
+        for v in violations:
+            where = ", ".join(name for name, a, b in pieces if a < v.last and v.first < b)
+            print(f"  {v.describe()} in {where}{'' if v in broken else ' (warning)'}", file=sys.stderr)
+        if len(broken) < len(violations):
+            print("Warnings are in the pasted COORDS_BEGIN / COORDS_END curves.", file=sys.stderr)
+        if broken and not args.force:
+            print("Refusing to print a broken path (use --force to print it anyway).", file=sys.stderr)
+            sys.exit(1)
 
     print("New coordinate list:\n")
-    for c in new_coords:
-        print(f"[{c[0]}, {c[1]}, {c[2]}]")
+    print(("[%d, %d, %d]\n" * len(new_coords)) % tuple(new_coords.ravel().tolist()), end="")
 
     print("\nSummary:")
     print(f"COORDS_BEGIN count: {len(COORDS_BEGIN)}")
     print(f"COORDS_END count:   {len(COORDS_END)}")
     print(f"Total new count:    {len(new_coords)}")
+    for j, (turn, score) in enumerate(zip(turns or [], scores)):
+        print(f"Curve {j + 1}: {turn.shape}, radius {turn.radius}, shift {turn.shift:+d}"
+              f" -> {score['rails']} rails, {score['corners']} corners")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Checks a finished block path (an (n, 3) int array) before it is built.
+
+One pass over the step arrays flags:
+  grade      a step steeper than the grade limit (45° by default) or
+             straight up/down, with the same segment math and MaxGrade
+             rule as analyze_curve
+  curve_y    a step that changes Y inside a stretch that has to be flat
+             (the U-turns: minecarts can't curve upward)
+  gap        a step to a block that doesn't touch the previous one
+  duplicate  the same block twice in a row
+  chunk      a step into or out of a block in an 'unavailable' chunk,
+             given a ForbiddenChunks constraint (see chunk_claims)
+
+Consecutive steps with the same problem are reported as one Violation with
+the range of point indices they cover, so a caller can point at (or refuse
+to print) exactly the broken stretch.
+
+Usage:
+  python path_validator.py output_coords.txt [more files...]
+  python path_validator.py output_coords.txt --claims chunks.json
+"""
+
+import argparse
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from curve_constraints import ForbiddenChunks, MaxGrade
+from curve_engine import segment_arrays
+
+GRADE = "grade"
+CURVE_Y = "curve_y"
+GAP = "gap"
+DUPLICATE = "duplicate"
+CHUNK = "chunk"
+KINDS = (GRADE, CURVE_Y, GAP, DUPLICATE, CHUNK)
+
+@dataclass
+class Violation:
+    kind: str
+    first: int     # index of the first point of the broken stretch
+    last: int      # index of its last point
+    steps: int     # broken steps in the stretch
+
+    def describe(self) -> str:
+        return f"{self.kind:<9} points {self.first}-{self.last} ({self.steps} step{'s' if self.steps != 1 else ''})"
+
+def _segment_mask(n_segments: int, ranges: Sequence[Tuple[int, int]]) -> np.ndarray:
+    """Mask of the segments inside (first, last) point ranges."""
+    marks = np.zeros(n_segments + 1, dtype=np.int64)
+    for first, last in ranges:
+        if last > first:
+            marks[first] += 1
+            marks[last] -= 1
+    return np.cumsum(marks)[:-1] > 0
+
+def _runs(kind: str, mask: np.ndarray) -> List[Violation]:
+    """One Violation per run of consecutive flagged segments."""
+    edges = np.diff(np.concatenate([[0], mask.view(np.int8), [0]]))
+    starts, stops = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    return [Violation(kind, int(a), int(b), int(b - a)) for a, b in zip(starts, stops)]
+
+def validate_path(
+    coords: np.ndarray,
+    flat: Sequence[Tuple[int, int]] = (),
+    max_grade: float = 1.0,
+    forbidden: Optional[ForbiddenChunks] = None
+) -> List[Violation]:
+    """
+    Every violation in `coords`, ordered by position. `flat` lists the
+    (first, last) point index ranges whose Y must not change, and
+    `forbidden` the chunks the path must stay out of.
+    """
+    coords = np.asarray(coords).reshape(-1, 3)
+    if len(coords) < 2:
+        return []
+
+    step = np.abs(np.diff(coords, axis=0))
+    x, y, z = coords.T.astype(float)
+    dy, horiz, _ = segment_arrays(x, y, z)
+
+    masks = {
+        GRADE: MaxGrade(max_grade).violations(x, z, dy, horiz) | ((horiz == 0) & (dy > 0)),
+        CURVE_Y: _segment_mask(len(step), flat) & (step[:, 1] != 0),
+        GAP: step.max(axis=1) > 1,
+        DUPLICATE: ~step.any(axis=1),
+    }
+    if forbidden is not None:
+        hits = forbidden.hits(x, z)
+        masks[CHUNK] = hits[:-1] | hits[1:]
+    violations = [v for kind in KINDS if kind in masks for v in _runs(kind, masks[kind])]
+    violations.sort(key=lambda v: (v.first, KINDS.index(v.kind)))
+    return violations
+
+def summarize(violations: Sequence[Violation]) -> str:
+    counts = {kind: sum(v.steps for v in violations if v.kind == kind) for kind in KINDS}
+    return ", ".join(f"{counts[kind]} {kind}" for kind in KINDS if counts[kind]) or "no problems"
+
+def main():
+    from chunk_claims import parse_claims
+    from curve_files import read_curve_file
+
+    parser = argparse.ArgumentParser(description="Check block paths for steep steps, gaps and duplicates.")
+    parser.add_argument("files", nargs="+", help="files with one [x, y, z] line per block")
+    parser.add_argument("--max-grade", type=float, default=1.0,
+                        help="steepest allowed step, rise over run (default: 1.0)")
+    parser.add_argument("--claims", metavar="SOURCE",
+                        help="chunk claims export or SQLite file (see chunk_claims.py); "
+                             "steps through an 'unavailable' chunk are flagged")
+    parser.add_argument("--claims-set", type=int, metavar="ID",
+                        help="only use claims of this coordinate_set_id")
+    args = parser.parse_args()
+    forbidden = parse_claims(parser, args.claims, args.claims_set).constraint() if args.claims else None
+
+    for path in args.files:
+        violations = validate_path(read_curve_file(path).coords, max_grade=args.max_grade, forbidden=forbidden)
+        print(f"{path}: {summarize(violations)}")
+        for v in violations:
+            print(f"  {v.describe()}")
+
+if __name__ == "__main__":
+    main()
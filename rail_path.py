@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Turning a rounded curve into blocks rails can actually be placed on.
+
+Rounding every sample on its own (round_arrays) repeats blocks where the
+samples are denser than one per block, and jumps diagonally where they are
+sparser. rail_path fixes both in one vectorized pass:
+  1. consecutive points that land on the same block are merged,
+  2. each remaining step is walked with integer Bresenham stepping, so no
+     step moves more than one block along any axis,
+  3. diagonal steps are split into single-axis moves,
+  4. for rails, the climb is spread along the walk (see _carry_y).
+
+With connectivity RAIL (4) every step moves one block north/south/east/west,
+and may rise or fall one block on the way, which is what a straight or
+ascending rail connects. A curve that climbs more blocks than it has
+horizontal steps can't be spread that way; it keeps its steep steps, and
+count_rails reports them. With connectivity VOXEL (6) every step changes
+exactly one of x, y, z.
+
+Everything works on flat arrays with a row id per point, so a whole batch
+of candidate curves is processed at once in time linear in the number of
+points (rail_counts is what curve_ranking uses for the rails objective).
+
+Usage:
+  python rail_path.py curves/*.txt      # rail / powered rail counts per file
+"""
+
+import argparse
+from typing import Tuple
+
+import numpy as np
+
+RAIL = 4
+VOXEL = 6
+
+# One powered rail per this many level (or descending) blocks keeps an
+# occupied cart at full speed; every ascending block needs its own.
+POWERED_SPACING = 34
+
+def _row_starts(row: np.ndarray) -> np.ndarray:
+    starts = np.ones(len(row), dtype=bool)
+    starts[1:] = row[1:] != row[:-1]
+    return starts
+
+def _merge_repeats(blocks: np.ndarray, row: np.ndarray, axes: list) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Keeps one point of every run that repeats the block on `axes`: the
+    first one, except in a row's last run, where it is the last one so the
+    curve still ends where it did.
+    """
+    starts = _row_starts(row)
+    row_last = np.append(starts[1:], True)
+    run_start = starts.copy()
+    run_start[1:] |= (blocks[1:, axes] != blocks[:-1, axes]).any(axis=1)
+
+    run = np.cumsum(run_start) - 1
+    run_end = np.append(np.flatnonzero(run_start)[1:] - 1, len(row) - 1)
+    last_run = row_last[run_end][run]
+    keep = (run_start & ~(last_run & ~starts)) | row_last
+    blocks, row = blocks[keep], row[keep]
+
+    # A row that never leaves its first block keeps it once
+    repeat = ~_row_starts(row)
+    repeat[1:] &= (blocks[1:] == blocks[:-1]).all(axis=1)
+    repeat[0] = False
+    return blocks[~repeat], row[~repeat]
+
+def _bresenham(blocks: np.ndarray, row: np.ndarray, axes: list) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Replaces each step by max |delta| over `axes` steps of at most one block
+    along each of those axes, rounding the others along (integer math, so
+    the walk ends exactly on the next point).
+    """
+    starts = _row_starts(row)
+    prev = np.empty_like(blocks)
+    prev[0] = blocks[0]
+    prev[1:] = blocks[:-1]
+    prev[starts] = blocks[starts]
+
+    d = blocks - prev
+    m = np.maximum(np.abs(d[:, axes]).max(axis=1), 1)
+
+    # Step k = 1..m of point i's incoming step: prev + d * k / m, rounded
+    # half away from zero
+    owner = np.repeat(np.arange(len(blocks)), m)
+    k = np.arange(len(owner)) - np.repeat(np.cumsum(m) - m, m) + 1
+    dm, mm = d[owner], m[owner][:, None]
+    walked = prev[owner] + np.sign(dm) * ((2 * np.abs(dm) * k[:, None] + mm) // (2 * mm))
+    return walked, row[owner]
+
+def _split_diagonals(
+    blocks: np.ndarray,
+    row: np.ndarray,
+    connectivity: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Inserts the blocks that turn each diagonal step into single-axis moves."""
+    starts = _row_starts(row)
+    prev = np.empty_like(blocks)
+    prev[0] = blocks[0]
+    prev[1:] = blocks[:-1]
+    prev[starts] = blocks[starts]
+
+    sx, sy, sz = (blocks - prev).T
+    dx = np.zeros_like(blocks)
+    dx[:, 0] = sx
+    # Moves happen x first, then z, then y; for rails a rise rides on the
+    # last horizontal move
+    if connectivity == RAIL:
+        candidates = np.stack([prev + dx, blocks], axis=1)
+        keep = np.stack([(sx != 0) & (sz != 0), np.ones(len(blocks), dtype=bool)], axis=1)
+    elif connectivity == VOXEL:
+        dxz = dx.copy()
+        dxz[:, 2] = sz
+        candidates = np.stack([prev + dx, prev + dxz, blocks], axis=1)
+        keep = np.stack([
+            (sx != 0) & ((sy != 0) | (sz != 0)),
+            (sz != 0) & (sy != 0),
+            np.ones(len(blocks), dtype=bool),
+        ], axis=1)
+    else:
+        raise ValueError(f"connectivity must be {RAIL} or {VOXEL}, not {connectivity}")
+
+    return candidates[keep], np.repeat(row, keep.sum(axis=1))
+
+def _segment_accumulate(ufunc, values: np.ndarray, row: np.ndarray, reverse: bool = False) -> np.ndarray:
+    """ufunc.accumulate within each row (forwards or backwards), in one pass."""
+    # Offsetting every row past the range of the values keeps the running
+    # max / min from carrying over from the row before
+    span = int(values.max() - values.min()) + 1 if len(values) else 1
+    rank = row.max() - row if reverse else row
+    offset = (rank if ufunc is np.maximum else -rank).astype(np.int64) * span
+    ordered = slice(None, None, -1) if reverse else slice(None)
+    return ufunc.accumulate((values + offset)[ordered])[ordered] - offset
+
+def _carry_y(blocks: np.ndarray, row: np.ndarray) -> np.ndarray:
+    """
+    Spreads each row's y over its walk so no step rises or falls more than
+    one block, keeping its first and last block. The walk's y is clipped
+    into what both ends can reach, then set halfway between its smallest
+    1-Lipschitz majorant and largest minorant; that leaves y where it
+    already climbed gently and only moves the blocks around steep steps.
+    Rows climbing more than they move are left as they are.
+    """
+    starts = _row_starts(row)
+    first = np.flatnonzero(starts)
+    last = np.append(first[1:] - 1, len(row) - 1)
+    seg = np.cumsum(starts) - 1
+    i = np.arange(len(row)) - first[seg]
+    n = (last - first)[seg]
+    y0, y1 = blocks[first, 1][seg], blocks[last, 1][seg]
+    y = blocks[:, 1]
+
+    fits = np.abs(y1 - y0) <= n
+    low = np.maximum(y0 - i, y1 - (n - i))
+    high = np.maximum(low, np.minimum(y0 + i, y1 + (n - i)))
+    t = np.clip(y, low, high)
+
+    above = np.maximum(
+        _segment_accumulate(np.maximum, t + i, row) - i,
+        _segment_accumulate(np.maximum, t - i, row, reverse=True) + i,
+    )
+    below = np.minimum(
+        _segment_accumulate(np.minimum, t - i, row) + i,
+        _segment_accumulate(np.minimum, t + i, row, reverse=True) - i,
+    )
+    blocks = blocks.copy()
+    blocks[:, 1] = np.where(fits, (above + below) // 2, y)
+    return blocks
+
+def rail_blocks(
+    blocks: np.ndarray,
+    row: np.ndarray,
+    connectivity: int = RAIL
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The block path of every row of a flat (n, 3) int array of rounded
+    points, `row` giving each point's curve (rows must be contiguous).
+    Returns the path blocks and their row ids.
+    """
+    blocks = np.asarray(blocks, dtype=np.int64).reshape(-1, 3)
+    row = np.asarray(row)
+    if not len(blocks):
+        return blocks, row
+
+    # RAIL walks the ground plan and lets y ride along; VOXEL walks all axes
+    axes = [0, 2] if connectivity == RAIL else [0, 1, 2]
+    blocks, row = _merge_repeats(blocks, row, axes)
+    blocks, row = _bresenham(blocks, row, axes)
+    blocks, row = _split_diagonals(blocks, row, connectivity)
+    if connectivity == RAIL:
+        blocks = _carry_y(blocks, row)
+    return blocks, row
+
+def rail_path(points: np.ndarray, connectivity: int = RAIL) -> np.ndarray:
+    """The block path of one curve's rounded (n, 3) points."""
+    points = np.asarray(points, dtype=np.int64).reshape(-1, 3)
+    blocks, _ = rail_blocks(points, np.zeros(len(points), dtype=np.intp), connectivity)
+    return blocks
+
+def count_rails(
+    blocks: np.ndarray,
+    row: np.ndarray,
+    rows: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per-row (rails, powered rails, steep steps) of a RAIL path from
+    rail_blocks. A steep step rises or falls more than one block, or
+    changes y without moving sideways; rails can't be placed there.
+    """
+    rails = np.bincount(row, minlength=rows)
+
+    inside = ~_row_starts(row)[1:]
+    d = np.diff(blocks, axis=0)
+    dy = d[:, 1]
+    flat = (d[:, 0] == 0) & (d[:, 2] == 0)
+    step_row = row[1:]
+
+    ascending = np.bincount(step_row, weights=inside & (dy > 0), minlength=rows).astype(np.int64)
+    steep = np.bincount(
+        step_row, weights=inside & ((np.abs(dy) > 1) | (flat & (dy != 0))), minlength=rows
+    ).astype(np.int64)
+    powered = ascending + (rails - ascending) // POWERED_SPACING
+    return rails, powered, steep
+
+def rail_counts(x: np.ndarray, y: np.ndarray, z: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    (rails, powered rails, steep steps) for every row of (rows, samples)
+    curve arrays, as the curves would be saved (rounded to blocks).
+    """
+    rows, samples = np.shape(x)
+    blocks = np.rint(np.stack([x, y, z], axis=2)).astype(np.int64).reshape(-1, 3)
+    row = np.repeat(np.arange(rows), samples)
+    blocks, row = rail_blocks(blocks, row, RAIL)
+    return count_rails(blocks, row, rows)
+
+def main():
+    from curve_files import read_curve_file
+
+    parser = argparse.ArgumentParser(description="Rail and powered rail counts of curve files.")
+    parser.add_argument("files", nargs="+", help="curve .txt files")
+    args = parser.parse_args()
+
+    for path in args.files:
+        coords = read_curve_file(path).coords
+        if not len(coords):
+            print(f"{path}: no coordinates")
+            continue
+        path_blocks = rail_path(coords)
+        rails, powered, steep = count_rails(path_blocks, np.zeros(len(path_blocks), dtype=np.intp), 1)
+        extra = f", {steep[0]} steep steps" if steep[0] else ""
+        print(f"{path}: {len(coords)} points -> {rails[0]} rails, {powered[0]} powered{extra}")
+
+if __name__ == "__main__":
+    main()
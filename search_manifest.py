@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Persisted record of which search cells have already been evaluated.
+
+A manifest is a JSON file bound to one search setup (start, end_xz, samples,
+bulge, grade solver, constraints, whether cells were pruned and a
+fingerprint of the evaluation code). It stores the outcome of every
+(y_end, loops, A, B) cell evaluated under that setup, so a re-run with a
+wider grid only evaluates the cells it has not seen before and merges them
+with the stored ones. If the setup or the code changes, the old
+cells no longer apply and the manifest starts over.
+"""
+
+import hashlib
+import inspect
+import json
+import math
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import AbstractSet, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import curve_constraints
+import curve_engine
+from curve_cache import CODE_VERSION
+from curve_constraints import DEFAULT_CONSTRAINTS, Constraint, describe_all
+from curve_engine import (
+    DEFAULT_BATCH_BYTES, SAMPLED, GridRow, SearchStats, Vec3, batch_rows, evaluate_candidates
+)
+
+def _manifest_version() -> str:
+    """CODE_VERSION plus the batch evaluators whose results are recorded."""
+    source = CODE_VERSION + "".join(
+        inspect.getsource(fn) for fn in (
+            curve_engine.constraint_violations,
+            curve_engine.evaluate_batch,
+            curve_engine.evaluate_candidates,
+            curve_engine._grade_factor_at,
+            curve_engine.grade_factor,
+            curve_constraints,
+        )
+    )
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+MANIFEST_VERSION = _manifest_version()
+
+# Stored per cell: [ok, max_grade, length3d, length2d, min_horiz_step, min_z].
+# Cells skipped because a lower y_end failed are stored with no metrics.
+PRUNED = [False, None, None, None, None, None]
+
+class SearchManifest:
+    def __init__(self, path: str):
+        self.path = path
+        self.settings: Optional[dict] = None
+        self.cells: Dict[str, list] = {}
+        self.added: set = set()
+
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            self.settings = data["settings"]
+            self.cells = data["cells"]
+        except (OSError, KeyError, ValueError):
+            pass
+
+    @staticmethod
+    def cell_key(y_end: float, loops: int, A: float, B: float) -> str:
+        return json.dumps([float(y_end), int(loops), float(A), float(B)])
+
+    def bind(
+        self,
+        start: Vec3,
+        end_xz: Tuple[float, float],
+        samples: int,
+        bulge: float,
+        grade_solver: str,
+        constraints: Sequence[Constraint] = DEFAULT_CONSTRAINTS,
+        prune: bool = True
+    ):
+        """
+        Ties the manifest to a search setup, dropping cells from any other.
+        Pruned cells were never evaluated, so a manifest recorded with
+        pruning doesn't serve a search without it.
+        """
+        settings = {
+            "version": MANIFEST_VERSION,
+            "start": [float(v) for v in start],
+            "end_xz": [float(v) for v in end_xz],
+            "samples": int(samples),
+            "bulge": float(bulge),
+            "grade_solver": grade_solver,
+            "constraints": describe_all(constraints),
+            "prune": bool(prune),
+        }
+        if settings != self.settings:
+            self.settings = settings
+            self.cells = {}
+            self.added = set()
+
+    def get(self, key: str) -> Optional[list]:
+        return self.cells.get(key)
+
+    def record(self, key: str, row: list):
+        self.cells[key] = row
+        self.added.add(key)
+
+    def is_new(self, y_end: float, loops: int, A: float, B: float) -> bool:
+        """True if the cell was evaluated during this run."""
+        return self.cell_key(y_end, loops, A, B) in self.added
+
+    def save(self):
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+
+        # Write to a temp file first so a crash never leaves a torn manifest
+        fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump({"settings": self.settings, "cells": self.cells}, f)
+        os.replace(tmp, self.path)
+
+def _evaluate_task(args) -> Tuple[List[list], int]:
+    """Worker entry point: one chunk of cells, returned as manifest rows."""
+    start, end_xz, y_end, loops, A, B, samples, bulge, grade_solver, constraints = args
+    res = evaluate_candidates(
+        start, end_xz, y_end, loops, A, B, samples, bulge, grade_solver, constraints
+    )
+    rows = [
+        [bool(res.ok[row]), float(res.max_grade[row]), float(res.length3d[row]),
+         float(res.length2d[row]), float(res.min_horiz_step[row]), float(res.min_z[row])]
+        for row in range(len(y_end))
+    ]
+    return rows, int(res.segments_used)
+
+def search_incremental(
+    manifest: SearchManifest,
+    start: Vec3,
+    end_xz: Tuple[float, float],
+    y_ends: Sequence[float],
+    loops_values: Sequence[int],
+    A_values: Sequence[float],
+    B_values: Sequence[float],
+    samples: int,
+    bulge: float = curve_engine.SOUTH,
+    max_bytes: int = DEFAULT_BATCH_BYTES,
+    workers: int = 1,
+    prune: bool = True,
+    stats: Optional[SearchStats] = None,
+    grade_solver: str = SAMPLED,
+    skip_shapes: AbstractSet[Tuple[int, int]] = frozenset(),
+    constraints: Sequence[Constraint] = DEFAULT_CONSTRAINTS,
+    ranking=None
+) -> List[GridRow]:
+    """
+    search_grid that only evaluates cells missing from `manifest`.
+
+    New cells are visited in order of |y_end - y0| like _search_block does,
+    and with prune=True a cell is skipped when the manifest already holds a
+    failure of the same (loops, A, B) at a y_end no further from the start
+    height. Every outcome is recorded in the manifest (call save() to keep
+    it). Returns a GridRow for every feasible cell of the grid, new or
+    stored, in grid order. Cells whose (loops, B) index pair is in
+    skip_shapes are left out, as in search_grid. With a ranking, the rows
+    are streamed into it one y_end at a time and only the ones it keeps
+    are returned, best first.
+    """
+    manifest.bind(start, end_xz, samples, bulge, grade_solver, constraints, prune)
+    y0 = start[1]
+    stats = stats if stats is not None else SearchStats()
+    per_batch = batch_rows(samples, max_bytes)
+
+    # Smallest |y_end - y0| at which each (loops, A, B) is known to fail
+    fail_at: Dict[Tuple[int, float, float], float] = {}
+
+    def note_failure(y_end: float, loops: int, A: float, B: float):
+        combo = (int(loops), float(A), float(B))
+        fail_at[combo] = min(fail_at.get(combo, math.inf), abs(y_end - y0))
+
+    for key, row in manifest.cells.items():
+        if not row[0]:
+            note_failure(*json.loads(key))
+
+    inner = [
+        (loops, float(A), float(B))
+        for il, loops in enumerate(loops_values)
+        for A in A_values
+        for ib, B in enumerate(B_values)
+        if (il, ib) not in skip_shapes
+    ]
+    stats.candidates += len(y_ends) * len(loops_values) * len(A_values) * len(B_values)
+    stats.merged += len(y_ends) * len(A_values) * len(skip_shapes)
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for y_end in sorted(y_ends, key=lambda y: abs(y - y0)):
+            dy = abs(y_end - y0)
+            todo = []
+            for loops, A, B in inner:
+                key = manifest.cell_key(y_end, loops, A, B)
+                if manifest.get(key) is not None:
+                    stats.reused += 1
+                elif prune and fail_at.get((int(loops), A, B), math.inf) <= dy:
+                    manifest.record(key, PRUNED)
+                    stats.pruned += 1
+                else:
+                    todo.append((key, loops, A, B))
+
+            if not todo:
+                continue
+
+            # Keep every worker busy even when only a few cells are new
+            chunk = min(per_batch, -(-len(todo) // max(workers, 1)))
+            chunks = [todo[lo:lo + chunk] for lo in range(0, len(todo), chunk)]
+            tasks = [
+                (start, end_xz, np.full(len(c), float(y_end)),
+                 np.asarray([cell[1] for cell in c]),
+                 np.asarray([cell[2] for cell in c]),
+                 np.asarray([cell[3] for cell in c]),
+                 samples, bulge, grade_solver, tuple(constraints))
+                for c in chunks
+            ]
+            results = pool.map(_evaluate_task, tasks) if pool else map(_evaluate_task, tasks)
+
+            for c, (rows, segments_used) in zip(chunks, results):
+                stats.evaluated += len(c)
+                stats.segments_total += len(c) * (samples - 1)
+                stats.segments_used += segments_used
+                for (key, loops, A, B), row in zip(c, rows):
+                    manifest.record(key, row)
+                    if row[0]:
+                        stats.feasible += 1
+                    else:
+                        note_failure(y_end, loops, A, B)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    grid_rows: List[GridRow] = []
+    for iy, y_end in enumerate(y_ends):
+        plane: List[GridRow] = []
+        for il, loops in enumerate(loops_values):
+            for ia, A in enumerate(A_values):
+                for ib, B in enumerate(B_values):
+                    if (il, ib) in skip_shapes:
+                        continue
+                    row = manifest.get(manifest.cell_key(y_end, loops, A, B))
+                    if row[0]:
+                        plane.append((iy, il, ia, ib, *row[1:]))
+
+        if ranking is None:
+            grid_rows.extend(plane)
+        elif plane:
+            ranking.add(
+                plane, start, end_xz, bulge, np.full(len(plane), float(y_end)),
+                np.asarray([loops_values[r[1]] for r in plane]),
+                np.asarray([A_values[r[2]] for r in plane], dtype=float),
+                np.asarray([B_values[r[3]] for r in plane], dtype=float)
+            )
+
+    return grid_rows if ranking is None else ranking.rows()
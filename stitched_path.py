@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+The whole track as one path: a lead-in cut from a coaster curve, the
+serpentine, and a lead-out cut from the same curve.
+
+By hand this is three steps: coaster_coordination.py finds a curve from
+the start to the end, its first and last stretches are pasted into
+COORDS_BEGIN / COORDS_END of gimme_Z_room.py, and a serpentine is solved
+(calculate_anchors.py) and built between them. Here the curve, where it is
+cut, and how many ramps the serpentine gets are searched together:
+  1. the best coaster curves come from coaster_search.search,
+  2. each is cut at every CUTS_IN / CUTS_OUT fraction of its points, and
+     the lead-in and lead-out are walked into rail paths (rail_path),
+  3. anchors between the two cut points are solved for every ramp count
+     (calculate_anchors.solve_anchors) and the U-turns planned
+     (gimme_Z_room.plan_u_turns),
+  4. every part is checked with path_validator: the 45° grade, flat
+     U-turns, gaps, duplicates, and with --claims the 'unavailable' chunks.
+The stitch with the fewest broken steps, then the fewest blocks, wins.
+
+Every part (lead-in, lead-out, each ramp, each U-turn) is built and
+checked once and kept in a PartCache keyed by what it depends on, so a
+stitch that differs from an earlier one in one ramp only builds and checks
+that ramp; the whole-path check is the parts' checks put end to end.
+
+Usage:
+  python stitched_path.py                          # print the best stitch
+  python stitched_path.py --north --curves 10 --ramps 5 7
+  python stitched_path.py --claims chunks.json --output stitched.txt
+"""
+
+import argparse
+import sys
+import time
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from calculate_anchors import CURVE_RADIUS, MAX_GRADE, solve_anchors
+from chunk_claims import parse_claims
+from coaster_search import CoasterConfig, CurveParams, search
+from curve_cache import CurveCache
+from curve_constraints import ForbiddenChunks
+from curve_engine import round_arrays
+from curve_files import format_txt, write_atomic
+from curve_ranking import Ranking
+from gimme_Z_room import plan_u_turns, serpentine_piece, u_turn_slots
+from path_validator import Violation, summarize, validate_path
+from rail_path import rail_path
+from u_turns import SHAPES, UTurn
+
+Coord = Tuple[int, int, int]
+
+# Where the lead-in ends and the lead-out starts, as fractions of the curve
+CUTS_IN = (0.2, 0.25, 0.3, 0.35)
+CUTS_OUT = (0.85, 0.9)
+RAMP_COUNTS = (3, 5, 7)
+TOP_CURVES = 5
+
+@dataclass
+class Part:
+    name: str
+    blocks: np.ndarray            # (n, 3); the first is the last block of the part before
+    violations: List[Violation]   # point indices within blocks
+
+class PartCache:
+    """Built and checked parts, keyed by everything a part depends on."""
+
+    def __init__(self):
+        self._parts: Dict[Hashable, Part] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, build: Callable[[], Part]) -> Part:
+        part = self._parts.get(key)
+        if part is not None:
+            self.hits += 1
+            return part
+        self.misses += 1
+        part = self._parts[key] = build()
+        return part
+
+    def summary(self) -> str:
+        return f"Part cache: {self.hits} hits, {self.misses} misses"
+
+@dataclass
+class Stitch:
+    params: CurveParams
+    cut_in: float
+    cut_out: float
+    anchors: List[Coord]
+    turns: List[UTurn]
+    parts: List[Part]
+    coords: np.ndarray = field(repr=False)
+    violations: List[Violation]
+
+    @property
+    def ramps(self) -> int:
+        return len(self.anchors) // 2
+
+    @property
+    def broken_steps(self) -> int:
+        return sum(v.steps for v in self.violations)
+
+    def cost(self) -> Tuple[int, int]:
+        return (self.broken_steps, len(self.coords))
+
+    def pieces(self) -> List[Tuple[str, int, int]]:
+        """(name, first, last) point index range of every part."""
+        pieces, at = [], 0
+        for part in self.parts:
+            pieces.append((part.name, at, at + len(part.blocks) - 1))
+            at += len(part.blocks) - 1
+        return pieces
+
+@dataclass
+class StitchStats:
+    combinations: int = 0  # (curve, cut in, cut out, ramps) combinations tried
+    solved: int = 0        # ones with an anchor layout
+    clean: int = 0         # ones without a broken step
+    seconds: float = 0.0
+
+    def summary(self) -> str:
+        return (
+            f"Stitched {self.combinations} combinations in {self.seconds:.2f}s: "
+            f"{self.solved} with a serpentine, {self.clean} without problems"
+        )
+
+def _join(parts: Sequence[Part]) -> Tuple[np.ndarray, List[Violation]]:
+    """The parts end to end, and their violations as one path's."""
+    coords = np.concatenate([parts[0].blocks] + [p.blocks[1:] for p in parts[1:]])
+    violations: List[Violation] = []
+    at = 0
+    for part in parts:
+        for v in part.violations:
+            v = Violation(v.kind, v.first + at, v.last + at, v.steps)
+            # A run that carries on across the join is one run
+            prev = next((p for p in reversed(violations) if p.kind == v.kind), None)
+            if prev is not None and prev.last == v.first:
+                violations.remove(prev)
+                v = Violation(v.kind, prev.first, v.last, prev.steps + v.steps)
+            violations.append(v)
+        at += len(part.blocks) - 1
+    violations.sort(key=lambda v: v.first)
+    return coords, violations
+
+class StitchPipeline:
+    """
+    Builds stitches for one CoasterConfig. `radius` and `max_grade` go to
+    solve_anchors, `shapes` to plan_u_turns, and `forbidden` (from chunk
+    claims) to every part's check.
+    """
+
+    def __init__(
+        self,
+        config: CoasterConfig,
+        radius: int = CURVE_RADIUS,
+        max_grade: float = MAX_GRADE,
+        shapes: Sequence[str] = SHAPES,
+        forbidden: Optional[ForbiddenChunks] = None,
+        curve_cache: Optional[CurveCache] = None
+    ):
+        self.config = config
+        self.radius = radius
+        self.max_grade = max_grade
+        self.shapes = tuple(shapes)
+        self.forbidden = forbidden
+        self.curves = curve_cache or CurveCache()
+        self.parts = PartCache()
+        self._serpentines: Dict[Hashable, Optional[Tuple[List[Coord], List[UTurn]]]] = {}
+
+    def _part(self, name: str, blocks: np.ndarray, flat: bool = False) -> Part:
+        flat_range = [(0, len(blocks) - 1)] if flat else []
+        return Part(name, blocks, validate_path(blocks, flat_range, self.max_grade, self.forbidden))
+
+    def curve_points(self, params: CurveParams) -> np.ndarray:
+        """The curve as it would be saved: rounded coord_samples points."""
+        c = self.config
+        curve = self.curves.get(
+            c.start, c.end_xz, params, samples=c.coord_samples, bulge=c.bulge, constraints=c.constraints
+        )
+        return round_arrays(curve.x, curve.y, curve.z)
+
+    def _curve_key(self, params: CurveParams) -> str:
+        c = self.config
+        return self.curves.key(c.start, c.end_xz, params, c.coord_samples, c.bulge, c.constraints)
+
+    def _cut(self, cut: float) -> int:
+        return int(round(cut * (self.config.coord_samples - 1)))
+
+    def lead_in(self, params: CurveParams, cut: float) -> Part:
+        """The curve up to the cut, as a rail path."""
+        i = self._cut(cut)
+        return self.parts.get(
+            ("lead-in", self._curve_key(params), i),
+            lambda: self._part("lead-in", rail_path(self.curve_points(params)[:i + 1]))
+        )
+
+    def lead_out(self, params: CurveParams, cut: float) -> Part:
+        """The curve from the cut on, as a rail path."""
+        j = self._cut(cut)
+        return self.parts.get(
+            ("lead-out", self._curve_key(params), j),
+            lambda: self._part("lead-out", rail_path(self.curve_points(params)[j:]))
+        )
+
+    def serpentine(self, start: Coord, end: Coord, ramps: int) -> Optional[Tuple[List[Coord], List[UTurn]]]:
+        """Solved anchors and planned U-turns from start to end, or None."""
+        key = (tuple(start), tuple(end), ramps)
+        if key not in self._serpentines:
+            layout, _ = solve_anchors(start, end, ramps=ramps, radius=self.radius, max_grade=self.max_grade)
+            if layout is None:
+                self._serpentines[key] = None
+            else:
+                turns, anchors, _ = plan_u_turns(layout.anchors, range(2, self.radius + 1), self.shapes)
+                self._serpentines[key] = (anchors, turns)
+        return self._serpentines[key]
+
+    def serpentine_parts(self, anchors: Sequence[Coord], turns: Sequence[UTurn]) -> List[Part]:
+        """Every ramp and U-turn of the serpentine, each built and checked once."""
+        slots = u_turn_slots(anchors)
+        parts = []
+        for k in range(len(anchors) - 1):
+            if k % 2 == 0:
+                key = ("ramp", tuple(anchors[k]), tuple(anchors[k + 1]))
+                build = lambda k=k: self._part(f"ramp {k // 2 + 1}", serpentine_piece(anchors, k))
+            else:
+                start, out_dir, _ = slots[k // 2]
+                turn = turns[k // 2]
+                key = ("curve", tuple(start), out_dir, turn)
+                build = lambda k=k, turn=turn: self._part(
+                    f"curve {k // 2 + 1}", serpentine_piece(anchors, k, turn), flat=True
+                )
+            part = self.parts.get(key, build)
+            parts.append(replace(part, name=f"{'ramp' if k % 2 == 0 else 'curve'} {k // 2 + 1}"))
+        return parts
+
+    def stitch_anchors(
+        self,
+        params: CurveParams,
+        cut_in: float,
+        cut_out: float,
+        anchors: Sequence[Coord],
+        turns: Sequence[UTurn]
+    ) -> Stitch:
+        """The stitch through given anchors (start and end at the cuts)."""
+        parts = [self.lead_in(params, cut_in)] + self.serpentine_parts(anchors, turns) + [self.lead_out(params, cut_out)]
+        coords, violations = _join(parts)
+        return Stitch(params, cut_in, cut_out, list(anchors), list(turns), parts, coords, violations)
+
+    def stitch(self, params: CurveParams, cut_in: float, cut_out: float, ramps: int) -> Optional[Stitch]:
+        """The stitch with a solved serpentine, or None if none closes."""
+        if cut_out <= cut_in:
+            return None
+        start = tuple(int(v) for v in self.lead_in(params, cut_in).blocks[-1])
+        end = tuple(int(v) for v in self.lead_out(params, cut_out).blocks[0])
+        solved = self.serpentine(start, end, ramps)
+        if solved is None:
+            return None
+        return self.stitch_anchors(params, cut_in, cut_out, *solved)
+
+    def optimize(
+        self,
+        candidates: Sequence[CurveParams],
+        cuts_in: Sequence[float] = CUTS_IN,
+        cuts_out: Sequence[float] = CUTS_OUT,
+        ramp_counts: Sequence[int] = RAMP_COUNTS
+    ) -> Tuple[Optional[Stitch], StitchStats]:
+        """The best stitch over every combination, and how the search went."""
+        stats = StitchStats()
+        began = time.perf_counter()
+        best = None
+        for params in candidates:
+            for cut_in in cuts_in:
+                for cut_out in cuts_out:
+                    for ramps in ramp_counts:
+                        stats.combinations += 1
+                        stitched = self.stitch(params, cut_in, cut_out, ramps)
+                        if stitched is None:
+                            continue
+                        stats.solved += 1
+                        stats.clean += not stitched.violations
+                        if best is None or stitched.cost() < best.cost():
+                            best = stitched
+        stats.seconds = time.perf_counter() - began
+        return best, stats
+
+def stitch_header(stitched: Stitch, config: CoasterConfig) -> str:
+    p = stitched.params
+    lines = [
+        "# Stitched Path",
+        f"# curve: y_end={p.y_end} loops={p.loops} A={p.A} B={p.B} ({config.bulge_name} first)",
+        f"# cuts: {stitched.cut_in:g} / {stitched.cut_out:g}",
+        f"# ramps: {stitched.ramps}",
+        f"# anchors: {stitched.anchors}",
+    ]
+    lines += [f"# {name}: points {a}-{b}" for name, a, b in stitched.pieces()]
+    lines += [f"# status: {summarize(stitched.violations)}", "#", "# Coordinates (x, y, z)", "#" + "=" * 50, "", ""]
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Search lead-in, serpentine and lead-out together.")
+    parser.add_argument("--north", action="store_true",
+                        help="cut north-first curves (coaster_coordination_north.py) instead of south-first")
+    parser.add_argument("--curves", type=int, default=TOP_CURVES,
+                        help=f"how many of the best coaster curves to try (default: {TOP_CURVES})")
+    parser.add_argument("--cuts-in", type=float, nargs="+", default=CUTS_IN, metavar="FRACTION",
+                        help="where the lead-in may end, as fractions of the curve")
+    parser.add_argument("--cuts-out", type=float, nargs="+", default=CUTS_OUT, metavar="FRACTION",
+                        help="where the lead-out may start, as fractions of the curve")
+    parser.add_argument("--ramps", type=int, nargs="+", default=RAMP_COUNTS, metavar="N",
+                        help="serpentine ramp counts to try")
+    parser.add_argument("--radius", type=int, default=CURVE_RADIUS,
+                        help=f"serpentine curve radius (default: {CURVE_RADIUS})")
+    parser.add_argument("--max-grade", type=float, default=MAX_GRADE,
+                        help=f"steepest allowed step, rise over run (default: {MAX_GRADE})")
+    parser.add_argument("--claims", metavar="SOURCE",
+                        help="chunk claims export or SQLite file (see chunk_claims.py); "
+                             "the path has to stay out of 'unavailable' chunks")
+    parser.add_argument("--claims-set", type=int, metavar="ID",
+                        help="only use claims of this coordinate_set_id")
+    parser.add_argument("--cache-dir",
+                        help="keep generated curves in this directory between runs")
+    parser.add_argument("--output", metavar="PATH",
+                        help="write the path with a header to PATH instead of printing it")
+    parser.add_argument("--force", action="store_true",
+                        help="output the best path even if the path checks find problems")
+    args = parser.parse_args()
+
+    if args.north:
+        from coaster_coordination_north import CONFIG
+    else:
+        from coaster_coordination import CONFIG
+    config, forbidden = CONFIG, None
+    if args.claims:
+        claims = parse_claims(parser, args.claims, args.claims_set)
+        forbidden = claims.constraint()
+        config = replace(config, constraints=tuple(config.constraints) + (forbidden,))
+        print(f"Avoiding {len(claims.unavailable)} unavailable chunks from {args.claims}")
+
+    curve_cache = CurveCache(directory=args.cache_dir)
+    candidates = [
+        r.params for r in search(
+            config.start, config.end_xz, config.y_end_min, config.y_end_max, config.loops_range,
+            config.A_values, config.B_values, samples=config.samples, bulge=config.bulge,
+            constraints=config.constraints, ranking=Ranking(k=args.curves)
+        )
+    ]
+    if not candidates:
+        print("No feasible coaster curves to cut. Try increasing loops/A/B or samples.")
+        sys.exit(1)
+    curve_cache.fill(
+        config.start, config.end_xz, candidates, config.coord_samples, config.bulge, config.constraints
+    )
+
+    pipeline = StitchPipeline(config, args.radius, args.max_grade, forbidden=forbidden, curve_cache=curve_cache)
+    best, stats = pipeline.optimize(candidates, args.cuts_in, args.cuts_out, args.ramps)
+    print(stats.summary())
+    print(pipeline.parts.summary())
+    if best is None:
+        print("No serpentine closes between any of the cuts. Try more ramps, a smaller radius or other cuts.")
+        sys.exit(1)
+
+    p = best.params
+    print(f"\nBest: y_end={p.y_end} loops={p.loops} A={p.A} B={p.B}, cuts {best.cut_in:g} / {best.cut_out:g}, "
+          f"{best.ramps} ramps, {len(best.coords)} blocks")
+    for name, a, b in best.pieces():
+        print(f"  {name:<9} points {a}-{b}")
+
+    if best.violations:
+        print(f"Path check: {summarize(best.violations)}", file=sys.stderr)
+        pieces = best.pieces()
+        for v in best.violations:
+            where = ", ".join(name for name, a, b in pieces if a < v.last and v.first < b)
+            print(f"  {v.describe()} in {where}", file=sys.stderr)
+        if not args.force:
+            print("Refusing to output a broken path (use --force to output it anyway).", file=sys.stderr)
+            sys.exit(1)
+
+    if args.output:
+        write_atomic(args.output, format_txt(stitch_header(best, config), best.coords))
+        print(f"\nSaved {len(best.coords)} blocks to {args.output}")
+    else:
+        print("\nNew coordinate list:\n")
+        print(format_txt("", best.coords), end="")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Checks that the fast paths give the results of the slow ones they replaced:
+near_pairs against comparing every pair, the rail walk against its
+invariants, and the pruned anchor search against counting through every
+curve layout.
+
+Usage:
+  python -m pytest -q test_solvers.py
+"""
+
+import numpy as np
+import pytest
+
+import calculate_anchors
+from calculate_anchors import solve_anchors
+from curve_similarity import HAUSDORFF, MEAN, SIGNATURE_POINTS, near_pairs
+from rail_path import RAIL, VOXEL, rail_blocks
+
+def _brute_distances(sigs: np.ndarray, metric: str) -> np.ndarray:
+    """(n, n) exact distance of every pair of signatures."""
+    dist = np.zeros((len(sigs), len(sigs)))
+    for i, a in enumerate(sigs):
+        if metric == MEAN:
+            dist[i] = np.linalg.norm(sigs - a, axis=2).mean(axis=1)
+        else:
+            sq = ((a[None, :, None, :] - sigs[:, None, :, :]) ** 2).sum(axis=3)
+            dist[i] = np.sqrt(np.maximum(sq.min(axis=2).max(axis=1), sq.min(axis=1).max(axis=1)))
+    return dist
+
+def _brute_pairs(dist: np.ndarray, threshold: float, split=None):
+    """near_pairs the O(n^2) way, from _brute_distances."""
+    i, j = np.nonzero(np.triu(dist <= threshold, k=1))
+    keep = (i < split) & (j >= split) if split is not None else np.ones(len(i), dtype=bool)
+    return [(int(a), int(b), float(dist[a, b])) for a, b in zip(i[keep], j[keep])]
+
+def _curve_family(rng: np.random.Generator, count: int) -> np.ndarray:
+    """Signatures of a few random walks, each copied with small jitter."""
+    base = np.cumsum(rng.integers(-3, 4, (count // 8, SIGNATURE_POINTS, 3)), axis=1).astype(float)
+    copies = base[rng.integers(0, len(base), count)]
+    return copies + rng.normal(0, 0.8, copies.shape)
+
+def _at_threshold(threshold: int) -> np.ndarray:
+    """
+    Curves on an integer lattice, spaced far wider than `threshold`, and
+    their copies moved by (3, 4, 0) * threshold / 5: every copy is exactly
+    `threshold` from its curve under both metrics.
+    """
+    x = np.arange(SIGNATURE_POINTS) * 10 * threshold
+    curves = np.stack([
+        np.stack([x, np.full_like(x, k * 7), np.full_like(x, -k * 3)], axis=1) for k in range(4)
+    ])
+    moved = curves + np.array([3, 4, 0]) * threshold // 5
+    return np.concatenate([curves, moved]).astype(float)
+
+# Thresholds that split the jittered copies, take all of them, and take
+# some of the unrelated curves too
+@pytest.mark.parametrize("metric, thresholds", [(MEAN, (1.8, 3.0, 15.0)), (HAUSDORFF, (3.0, 4.0, 15.0))])
+def test_near_pairs_matches_brute_force(metric, thresholds):
+    sigs = _curve_family(np.random.default_rng(7), 160)
+    dist = _brute_distances(sigs, metric)
+    for threshold in thresholds:
+        expected = _brute_pairs(dist, threshold)
+        assert expected
+        got = near_pairs(sigs, threshold, metric)
+        assert [(i, j) for i, j, _ in got] == [(i, j) for i, j, _ in expected]
+        np.testing.assert_allclose([d for *_, d in got], [d for *_, d in expected], atol=1e-6)
+
+@pytest.mark.parametrize("metric", [MEAN, HAUSDORFF])
+def test_near_pairs_split_matches_brute_force(metric):
+    sigs = _curve_family(np.random.default_rng(11), 160)
+    expected = _brute_pairs(_brute_distances(sigs, metric), 4.0, split=70)
+    assert expected
+    assert [(i, j) for i, j, _ in near_pairs(sigs, 4.0, metric, split=70)] == [(i, j) for i, j, _ in expected]
+
+@pytest.mark.parametrize("metric", [MEAN, HAUSDORFF])
+def test_near_pairs_keeps_pairs_at_the_threshold(metric):
+    sigs = _at_threshold(5)
+    assert _brute_pairs(_brute_distances(sigs, metric), 5) == [(k, k + 4, 5.0) for k in range(4)]
+    assert [(i, j) for i, j, _ in near_pairs(sigs, 5, metric)] == [(k, k + 4) for k in range(4)]
+    assert near_pairs(sigs, 4.999, metric) == []
+
+def _random_rows(rng: np.random.Generator, rows: int):
+    """Rounded points of random curves: sparse, dense, steep and flat ones."""
+    blocks, row = [], []
+    for r in range(rows):
+        n = int(rng.integers(2, 30))
+        step = rng.choice([0.3, 1.0, 4.0])
+        climb = rng.choice([0.0, 0.5, 1.0, 3.0])
+        walk = np.cumsum(rng.normal(0, step, (n, 3)) * [1, climb, 1], axis=0)
+        blocks.append(np.round(walk + rng.integers(-50, 50, 3)).astype(np.int64))
+        row.append(np.full(n, r))
+    return np.concatenate(blocks), np.concatenate(row)
+
+def _row_bounds(row: np.ndarray):
+    first = np.flatnonzero(np.r_[True, row[1:] != row[:-1]])
+    return first, np.append(first[1:] - 1, len(row) - 1)
+
+@pytest.mark.parametrize("connectivity", [RAIL, VOXEL])
+def test_rail_blocks_invariants(connectivity):
+    points, point_row = _random_rows(np.random.default_rng(3), 400)
+    blocks, row = rail_blocks(points, point_row, connectivity)
+    first, last = _row_bounds(row)
+    point_first, point_last = _row_bounds(point_row)
+
+    # Every row is still there, in order, starting and ending where it did
+    assert (row[first] == np.arange(400)).all()
+    assert (blocks[first] == points[point_first]).all()
+    assert (blocks[last] == points[point_last]).all()
+
+    step = np.abs(np.diff(blocks, axis=0))
+    inside = row[1:] == row[:-1]
+    if connectivity == VOXEL:
+        assert (step[inside].sum(axis=1) == 1).all()
+        return
+
+    # One block north/south/east/west per step, unless the row only moves
+    # up or down (then there is no horizontal step to carry the climb)
+    flat = (points[point_first][:, [0, 2]] == points[point_last][:, [0, 2]]).all(axis=1)
+    vertical = np.array([
+        flat[r] and (points[point_row == r][:, [0, 2]] == points[point_first[r]][[0, 2]]).all()
+        for r in range(400)
+    ])
+    sideways = inside & ~vertical[row[1:]]
+    assert (step[sideways][:, [0, 2]].sum(axis=1) == 1).all()
+
+    # Rows that don't climb more than they move never step more than one
+    # block up or down
+    fits = np.abs(blocks[last, 1] - blocks[first, 1]) <= last - first
+    assert fits.sum() > 300
+    assert (step[inside & fits[row[1:]], 1] <= 1).all()
+
+def _every_curve_shift(start, end, turns, radius, slack, min_row_gap):
+    """_curve_shifts without pruning: every combination, counted through in order."""
+    base = 2 * (slack + 1)
+    target = end[2] - start[2]
+    a, b = np.triu_indices(turns + 1, k=1)
+    for lo in range(0, base ** turns, calculate_anchors._CHUNK):
+        idx = np.arange(lo, min(lo + calculate_anchors._CHUNK, base ** turns), dtype=np.int64)
+        digits = (idx[:, None] // base ** np.arange(turns, dtype=np.int64)) % base
+        widths = 2 * radius + digits // 2
+        shifts = np.where(digits % 2 == 0, -widths, widths)
+        shifts = shifts[shifts.sum(axis=1) == target]
+        rows = calculate_anchors._rows(start, shifts)
+        yield shifts[(np.abs(rows[:, a] - rows[:, b]) >= min_row_gap).all(axis=1)]
+
+def _every_curve(curve_length, far_width, near_width, overlap):
+    """_distinct_curves without pruning: every curve layout stands for itself."""
+    return np.arange(len(curve_length)), np.ones(len(curve_length), dtype=np.int64)
+
+@pytest.mark.parametrize("ramps, options", [
+    (3, {}),
+    (5, {}),
+    (5, {"objective": calculate_anchors.GRADE}),
+    (5, {"x_range": (-340, -215)}),
+    (5, {"radius": 6, "max_grade": 0.8}),
+    (7, {"margin": 8}),
+])
+def test_solve_anchors_pruning_keeps_the_layout(monkeypatch, ramps, options):
+    start, end = calculate_anchors.start, calculate_anchors.end
+    pruned, pruned_stats = solve_anchors(start, end, ramps=ramps, **options)
+
+    monkeypatch.setattr(calculate_anchors, "_curve_shifts", _every_curve_shift)
+    monkeypatch.setattr(calculate_anchors, "_distinct_curves", _every_curve)
+    full, full_stats = solve_anchors(start, end, ramps=ramps, **options)
+
+    assert full is not None
+    assert pruned == full
+    assert pruned_stats.curves == full_stats.curves
+    assert pruned_stats.feasible == full_stats.feasible
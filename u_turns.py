@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Flat 180° U-turns for the serpentine, and a search for the best one per
+curve slot.
+
+A U-turn starts at the end of a ramp heading along X, bulges `radius`
+blocks further that way, comes back, and ends `shift` blocks north
+(negative) or south of where it started, heading the other way. Shapes:
+  semicircle  quarter circles of the given radius, joined by a straight
+              along Z when the shift is wider than 2 * radius
+  ellipse     half an ellipse with semi-axes radius (X) and shift / 2 (Z)
+  clothoid    two mirrored Euler spirals: curvature grows linearly from
+              zero and back, so the turn eases in and out; stretched to
+              the radius and shift
+  sine        the old create_180_degree_curve lobe: Z moves linearly
+              while X swings out on a sine
+
+Every shape is sampled densely, rounded to blocks and walked into a rail
+path (see rail_path), so a turn never has gaps or repeated blocks. A turn
+is scored by its rail count plus CORNER_WEIGHT per corner rail.
+
+best_u_turns scores every (shape, radius, shift) option of every slot as
+one batch of arrays, optionally split over worker processes, then picks
+one option per slot. If shifts may vary (z_slack), the choice keeps their
+sum, so the path still ends where it did.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from rail_path import RAIL, rail_blocks
+
+Coord = Tuple[int, int, int]
+
+SEMICIRCLE = "semicircle"
+ELLIPSE = "ellipse"
+CLOTHOID = "clothoid"
+SINE = "sine"
+SHAPES = (SEMICIRCLE, ELLIPSE, CLOTHOID, SINE)
+
+# A corner rail costs this much on top of being a rail
+CORNER_WEIGHT = 0.5
+
+# Samples of the clothoid heading integral
+_CLOTHOID_STEPS = 2048
+
+@dataclass(frozen=True)
+class UTurn:
+    shape: str
+    radius: int   # blocks the turn bulges past its column, along X
+    shift: int    # Z change from start to end (negative is north)
+
+def fits(turn: UTurn) -> bool:
+    """Whether the shape can be drawn at this radius and shift."""
+    if turn.radius < 1 or turn.shift == 0:
+        return False
+    # Two quarter circles need the room
+    return turn.shape != SEMICIRCLE or 2 * turn.radius <= abs(turn.shift)
+
+def _clothoid_template(u: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Unit clothoid pair: bulge 0..1..0 and progress 0..1 at u."""
+    s = np.linspace(0, 1, _CLOTHOID_STEPS + 1)
+    # Heading from 0 to pi, curvature rising linearly to the middle and back
+    heading = np.pi * np.where(s < 0.5, 2 * s * s, 1 - 2 * (1 - s) ** 2)
+    mid = (heading[1:] + heading[:-1]) / 2
+    bulge = np.concatenate([[0], np.cumsum(np.cos(mid))])
+    progress = np.concatenate([[0], np.cumsum(np.sin(mid))])
+    bulge, progress = bulge / bulge.max(), progress / progress[-1]
+    return np.interp(u, s, bulge), np.interp(u, s, progress)
+
+def _stadium_template(u: np.ndarray, radius: np.ndarray, width: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Quarter circle, straight, quarter circle, by arc length, in blocks."""
+    straight = width - 2 * radius
+    quarter = np.pi * radius / 2
+    s = u * (2 * quarter + straight)
+
+    first = np.minimum(s, quarter) / radius
+    along = np.clip(s - quarter, 0, straight)
+    last = np.clip(s - quarter - straight, 0, quarter) / radius
+    bulge = np.where(s <= quarter, radius * np.sin(first), np.where(along < straight, radius, radius * np.cos(last)))
+    progress = radius * (1 - np.cos(first)) + along + radius * np.sin(last)
+    return bulge, progress
+
+def u_turn_offsets(turns: Sequence[UTurn], samples: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (rows, samples) bulge and progress (blocks along the shift) of every
+    turn, float, from (0, 0) to (0, |shift|).
+    """
+    u = np.linspace(0, 1, samples)
+    radius = np.array([t.radius for t in turns], dtype=float)[:, None]
+    width = np.array([abs(t.shift) for t in turns], dtype=float)[:, None]
+    shape = np.array([t.shape for t in turns])[:, None]
+
+    theta = np.pi * u
+    bulge = np.broadcast_to(np.sin(theta), (len(turns), samples)).copy()
+    progress = np.broadcast_to((1 - np.cos(theta)) / 2, (len(turns), samples)) * width
+
+    sine = shape[:, 0] == SINE
+    progress[sine] = (u * width)[sine]
+
+    clothoid = shape[:, 0] == CLOTHOID
+    if clothoid.any():
+        cb, cp = _clothoid_template(u)
+        bulge[clothoid] = cb
+        progress[clothoid] = (cp * width)[clothoid]
+    bulge *= radius
+
+    stadium = shape[:, 0] == SEMICIRCLE
+    if stadium.any():
+        sb, sp = _stadium_template(u, radius[stadium], width[stadium])
+        bulge[stadium], progress[stadium] = sb, sp
+    return bulge, progress
+
+def _samples(turns: Sequence[UTurn]) -> int:
+    # Several samples per block of the longest turn; the rail pass merges repeats
+    return 4 * max(abs(t.shift) + 2 * t.radius for t in turns) + 16
+
+def u_turn_blocks_batch(
+    starts: np.ndarray,
+    out_dirs: np.ndarray,
+    turns: Sequence[UTurn]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Rail blocks of every turn, as flat (n, 3) blocks and row ids. `starts`
+    is the (rows, 3) start block of each turn and `out_dirs` the X
+    direction (-1 or 1) its ramp was heading.
+    """
+    bulge, progress = u_turn_offsets(turns, _samples(turns))
+    starts = np.asarray(starts, dtype=np.int64).reshape(-1, 3)
+    sign = np.sign([t.shift for t in turns])[:, None]
+
+    x = starts[:, :1] + np.asarray(out_dirs)[:, None] * bulge
+    z = starts[:, 2:] + sign * progress
+    y = np.broadcast_to(starts[:, 1:2], x.shape)
+    blocks = np.rint(np.stack([x, y, z], axis=2)).astype(np.int64).reshape(-1, 3)
+    row = np.repeat(np.arange(len(turns)), x.shape[1])
+    return rail_blocks(blocks, row, RAIL)
+
+def u_turn_blocks(start: Coord, out_dir: int, turn: UTurn) -> np.ndarray:
+    """The (n, 3) rail blocks of one U-turn, from start to start + shift."""
+    blocks, _ = u_turn_blocks_batch(np.array([start]), np.array([out_dir]), [turn])
+    return blocks
+
+def score_u_turns(args) -> Tuple[np.ndarray, np.ndarray]:
+    """(rails, corner rails) of every turn in an (starts, out_dirs, turns) batch."""
+    starts, out_dirs, turns = args
+    if not len(turns):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    blocks, row = u_turn_blocks_batch(starts, out_dirs, turns)
+    rails = np.bincount(row, minlength=len(turns))
+
+    # A corner is a rail whose way in and way out differ
+    step = np.diff(blocks[:, [0, 2]], axis=0)
+    same_row = row[1:] == row[:-1]
+    turned = same_row[1:] & same_row[:-1] & (step[1:] != step[:-1]).any(axis=1)
+    corners = np.bincount(row[1:-1], weights=turned, minlength=len(turns)).astype(np.int64)
+    return rails, corners
+
+def turn_cost(rails: np.ndarray, corners: np.ndarray) -> np.ndarray:
+    return rails + CORNER_WEIGHT * corners
+
+def best_u_turns(
+    slots: Sequence[Tuple[Coord, int, int]],
+    radii: Sequence[int],
+    shapes: Sequence[str] = SHAPES,
+    z_slack: int = 0,
+    workers: int = 1
+) -> Tuple[List[UTurn], List[Dict[str, float]]]:
+    """
+    The cheapest U-turn for each (start, out_dir, shift) slot, and its
+    rails / corners / cost. With z_slack, a slot's shift may move by up to
+    that many blocks as long as all the moves add up to zero.
+    """
+    options: List[UTurn] = []
+    owner: List[int] = []
+    for k, (start, out_dir, shift) in enumerate(slots):
+        for delta in range(-z_slack, z_slack + 1):
+            for shape in shapes:
+                for radius in radii:
+                    turn = UTurn(shape, int(radius), int(shift + np.sign(shift) * delta))
+                    if fits(turn) and np.sign(turn.shift) == np.sign(shift):
+                        options.append(turn)
+                        owner.append(k)
+    owner_arr = np.array(owner, dtype=np.intp)
+    starts = np.array([slots[k][0] for k in owner], dtype=np.int64).reshape(-1, 3)
+    out_dirs = np.array([slots[k][1] for k in owner], dtype=np.int64)
+
+    # Split the batch across processes like search_grid splits its grid
+    chunks = np.array_split(np.arange(len(options)), max(1, min(workers, len(options))))
+    tasks = [(starts[c], out_dirs[c], [options[i] for i in c]) for c in chunks]
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            scored = list(pool.map(score_u_turns, tasks))
+    else:
+        scored = [score_u_turns(task) for task in tasks]
+    rails = np.concatenate([r for r, _ in scored])
+    corners = np.concatenate([c for _, c in scored])
+    cost = turn_cost(rails, corners)
+
+    # Cheapest option per slot and shift change, then the cheapest changes
+    # that cancel out (a small DP over the running total)
+    best: List[Dict[int, int]] = [{} for _ in slots]
+    for i in np.argsort(cost, kind="stable"):
+        k = owner_arr[i]
+        delta = abs(options[i].shift) - abs(slots[k][2])
+        delta *= int(np.sign(slots[k][2]))
+        best[k].setdefault(delta, int(i))
+
+    paths: Dict[int, Tuple[float, List[int]]] = {0: (0.0, [])}
+    for k in range(len(slots)):
+        step: Dict[int, Tuple[float, List[int]]] = {}
+        for total, (so_far, picked) in paths.items():
+            for delta, i in best[k].items():
+                candidate = (so_far + cost[i], picked + [i])
+                if total + delta not in step or candidate[0] < step[total + delta][0]:
+                    step[total + delta] = candidate
+        paths = step
+    if 0 not in paths:
+        raise ValueError("No U-turn fits one of the curve slots")
+
+    picked = paths[0][1]
+    return (
+        [options[i] for i in picked],
+        [{"rails": int(rails[i]), "corners": int(corners[i]), "cost": float(cost[i])} for i in picked],
+    )
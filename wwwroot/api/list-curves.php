@@ -2,6 +2,10 @@
 /**
  * List all curve files from curves/ and curves_north/ directories
  * Returns JSON array of curve options with filename and display name
+ *
+ * If curve_index.json (written by the Python duplicate checkers) has an
+ * up-to-date entry for a file, its coordinate digest and point count are
+ * included too; curves with the same digest have identical coordinates.
  */
 
 header('Content-Type: application/json');
@@ -10,6 +14,21 @@ header('Content-Type: application/json');
 $projectRoot = dirname(__DIR__, 2);
 $curvesDir = $projectRoot . '/curves';
 $curvesNorthDir = $projectRoot . '/curves_north';
+$indexFile = $projectRoot . '/curve_index.json';
+
+/**
+ * Digest index entry for a curve file, or null if the file changed since
+ * it was indexed (same size and mtime check as curve_index.py).
+ */
+function indexEntry(array $index, string $directory, string $file, string $path): ?array {
+    $entry = $index[$directory . '/' . $file] ?? null;
+    if ($entry === null
+        || $entry['size'] !== filesize($path)
+        || intdiv($entry['mtime_ns'], 1000000000) !== filemtime($path)) {
+        return null;
+    }
+    return $entry;
+}
 
 $response = [
     'success' => false,
@@ -20,6 +39,12 @@ $response = [
 try {
     $allCurves = [];
 
+    $index = [];
+    if (is_file($indexFile)) {
+        $data = json_decode(file_get_contents($indexFile), true);
+        $index = $data['files'] ?? [];
+    }
+
     // Scan south-first curves directory
     if (is_dir($curvesDir)) {
         $files = scandir($curvesDir);
@@ -39,10 +64,14 @@ try {
                 $display = substr($display, 0, -4); // Remove ".txt"
             }
 
+            $entry = indexEntry($index, 'curves', $file, $curvesDir . '/' . $file);
+
             $allCurves[] = [
                 'filename' => $file,
                 'display' => 'SOUTH: ' . $display,
-                'directory' => 'curves'
+                'directory' => 'curves',
+                'digest' => $entry['digest'] ?? null,
+                'points' => $entry['points'] ?? null
             ];
         }
     }
@@ -66,10 +95,14 @@ try {
                 $display = substr($display, 0, -4); // Remove ".txt"
             }
 
+            $entry = indexEntry($index, 'curves_north', $file, $curvesNorthDir . '/' . $file);
+
             $allCurves[] = [
                 'filename' => $file,
                 'display' => 'NORTH: ' . $display,
-                'directory' => 'curves_north'
+                'directory' => 'curves_north',
+                'digest' => $entry['digest'] ?? null,
+                'points' => $entry['points'] ?? null
             ];
         }
     }